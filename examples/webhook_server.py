@@ -0,0 +1,37 @@
+from __future__ import unicode_literals
+
+import argparse
+import shelve
+
+from kloudless.util import logger
+from kloudless.webhooks import serve_webhooks
+
+logger.setLevel('DEBUG')
+
+
+def handle_events(account_id, events):
+    for event in events:
+        print('Account {}: {} {}'.format(
+            account_id, event.data.get('type'),
+            (event.data.get('metadata') or {}).get('name')))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('app_id', type=str,
+                        help='You can access app_id via https://developers.klo'
+                             'udless.com/applications/*/details')
+    parser.add_argument('api_key', type=str,
+                        help='You can access api_key via https://developers.klo'
+                             'udless.com/applications/*/details')
+    parser.add_argument('--port', type=int, default=8030,
+                        help='Port number to run the server, default to 8030')
+    parser.add_argument('--cursors', type=str, default='webhook_cursors',
+                        help='Path of the shelf to store the events cursors')
+
+    args = parser.parse_args()
+
+    print('Listening on localhost:%s' % args.port)
+    serve_webhooks(args.app_id, args.api_key, handle_events, port=args.port,
+                   cursors=shelve.open(args.cursors))
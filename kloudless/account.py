@@ -2,8 +2,16 @@ from __future__ import unicode_literals
 
 from . import exceptions
 from .application import verify_token
+from .bulk import run_bulk
+from .calendars import merge_calendar_events
 from .client import Client
+from .concurrency import (RATE_LIMIT_EXCEPTIONS, RateLimiter, bounded_map,
+                          call_with_retry)
+from .endpoints import CalendarEndpoint, FileEndpoint, FolderEndpoint
+from .resources import Response
+from .transfer import transfer_files
 from .util import url_join
+from .walk import TreeWalker
 
 
 class Account(Client):
@@ -15,7 +23,7 @@ class Account(Client):
     :ivar str url: Base url which would be used as prefix for all http method
         calls
     """
-    def __init__(self, token=None, api_key=None, account_id=None):
+    def __init__(self, token=None, api_key=None, account_id=None, **kwargs):
         """
         Either ``token`` or ``api_key`` is needed for instantiation.
         ``account_id`` is needed if ``api_key`` is specified.
@@ -23,6 +31,8 @@ class Account(Client):
         :param token: Bearer token
         :param api_key: API key
         :param account_id: Account ID
+        :param kwargs: kwargs passed to :class:`kloudless.client.Session`,
+            e.g. ``transport`` and ``thread_safe``
         """
         if api_key and not account_id:
             raise exceptions.InvalidParameter(
@@ -30,30 +40,276 @@ class Account(Client):
                 " to create an account instance"
             )
 
-        super(Account, self).__init__(api_key=api_key, token=token)
+        super(Account, self).__init__(api_key=api_key, token=token,
+                                      **kwargs)
 
         self.account_id = account_id or 'me'
         self.url = url_join(self.url, 'accounts/{}'.format(self.account_id))
 
+    def __getstate__(self):
+        state = super(Account, self).__getstate__()
+        state['kwargs']['account_id'] = self.account_id
+        return state
+
     def raw(self, raw_method, raw_uri, **kwargs):
         """
         Method for `Pass-Through API <https://developers.kloudless.com/docs/
         latest/core#header-pass-through-api-1>`_
 
+        The request body could be streamed by passing a file object or an
+        iterable of bytes as ``data``; bodies of unknown length are sent with
+        chunked transfer encoding. Set ``stream=True`` to read the response
+        incrementally, or use :func:`raw_stream`.
+
         :param str raw_method: The value stand for ``X-Kloudless-Raw-Method``
             header
 
         :param raw_uri:  The value stand for ``X-Kloudless-Raw-URI`` header
 
-        :param kwargs:  kwargs passed to :func:`kloudless.client.Client.post`
+        :param kwargs:  kwargs passed to :func:`kloudless.client.Client.post`,
+            e.g. ``data``, ``json`` and ``stream``
 
         :return: :class:`requests.Response`
         """
-        headers = kwargs.setdefault('headers', {})
+        headers = kwargs['headers'] = dict(kwargs.get('headers') or {})
         headers['X-Kloudless-Raw-Method'] = raw_method
         headers['X-Kloudless-Raw-URI'] = raw_uri
         return self.post('raw', get_raw_response=True, **kwargs)
 
+    def raw_stream(self, raw_method, raw_uri, data=None, **kwargs):
+        """
+        Send a pass-through request and stream the response, so neither the
+        request body nor the response body is held in memory at once.
+
+        .. code:: python
+
+            with open(path, 'rb') as f:
+                response = account.raw_stream('PUT', '/upload', data=f)
+            for chunk in response.iter_content(64 * 1024):
+                forward(chunk)
+
+        The body of the returned response could be read through
+        ``iter_content`` or ``raw`` of :class:`requests.Response`, or into
+        buffers through ``readinto`` and ``copy_to``. Close it if the body is
+        not read to the end.
+
+        :param str raw_method: See :func:`raw`
+        :param str raw_uri: See :func:`raw`
+        :param data: Request body, e.g. bytes, a file object or an iterable
+            of bytes
+        :param kwargs: kwargs passed to :func:`raw`
+
+        :return: :class:`kloudless.resources.base.Response`
+        """
+        kwargs['stream'] = True
+        response = self.raw(raw_method, raw_uri, data=data, **kwargs)
+        return Response(self, response.url, response)
+
+    def raw_batch(self, calls, handler=None, concurrency=8, ordered=False,
+                  retries=0, rate_limit=None):
+        """
+        Send pass-through requests with bounded concurrency.
+
+        :param calls: Iterable of ``(raw_method, raw_uri)`` or
+            ``(raw_method, raw_uri, kwargs)`` tuples, where ``kwargs`` is
+            passed to :func:`raw`. Consumed lazily.
+        :param handler: Function that accepts the streamed
+            :class:`requests.Response` of a call and returns the result of
+            the call, e.g. to write the body onward. It is called in the
+            worker threads and the response is closed afterwards. The
+            responses are read into memory and returned if not given.
+        :param int concurrency: The maximum quantity of requests at the same
+            time
+        :param bool ordered: Set to ``True`` to yield the results in the
+            order of ``calls``
+        :param int retries: Times to retry a call on rate limiting, server
+            and connection errors. Only calls whose ``data`` could be read
+            again should be retried.
+        :param rate_limit: The maximum quantity of requests per second, or a
+            :class:`kloudless.concurrency.RateLimiter` instance
+
+        :return: generator that yields ``(call, result, error)`` tuples,
+            see :func:`kloudless.concurrency.bounded_map`
+        """
+        rate_limiter = rate_limit
+        if rate_limit and not isinstance(rate_limit, RateLimiter):
+            rate_limiter = RateLimiter(rate_limit)
+
+        def send(call):
+            raw_method, raw_uri = call[:2]
+            kwargs = dict(call[2]) if len(call) > 2 else {}
+            if handler is None:
+                return self.raw(raw_method, raw_uri, **kwargs)
+            kwargs['stream'] = True
+            response = self.raw(raw_method, raw_uri, **kwargs)
+            try:
+                return handler(response)
+            finally:
+                response.close()
+
+        return bounded_map(
+            lambda call: call_with_retry(lambda: send(call), retries=retries,
+                                         rate_limiter=rate_limiter),
+            calls, concurrency=concurrency, ordered=ordered)
+
+    def files(self, file_id, api_version=None):
+        """
+        :return: :class:`kloudless.endpoints.FileEndpoint` of
+            ``storage/files/{file_id}``, e.g.
+            ``account.files(file_id).contents.get()``
+        """
+        return self.endpoint('storage/files/{}'.format(file_id),
+                             api_version=api_version,
+                             endpoint_class=FileEndpoint)
+
+    def folders(self, folder_id='root', api_version=None):
+        """
+        :return: :class:`kloudless.endpoints.FolderEndpoint` of
+            ``storage/folders/{folder_id}``, e.g.
+            ``account.folders('root').contents.get()``
+        """
+        return self.endpoint('storage/folders/{}'.format(folder_id),
+                             api_version=api_version,
+                             endpoint_class=FolderEndpoint)
+
+    def calendars(self, calendar_id='primary', api_version=None):
+        """
+        :return: :class:`kloudless.endpoints.CalendarEndpoint` of
+            ``cal/calendars/{calendar_id}``, e.g.
+            ``account.calendars().events().get()``
+        """
+        return self.endpoint('cal/calendars/{}'.format(calendar_id),
+                             api_version=api_version,
+                             endpoint_class=CalendarEndpoint)
+
+    def get_calendar_events(self, start, end, calendar_ids=None, **kwargs):
+        """
+        Retrieve the events of several calendars between ``start`` and
+        ``end`` in parallel, merged into one stream ordered by start time.
+        See :func:`kloudless.calendars.merge_calendar_events`.
+
+        :param start: :class:`datetime.datetime` or ISO 8601 timestamp
+        :param end: :class:`datetime.datetime` or ISO 8601 timestamp
+        :param calendar_ids: IDs of the calendars, e.g. ``['primary']``.
+            Defaults to all calendars of the account.
+        :param kwargs: kwargs passed to
+            :func:`kloudless.calendars.merge_calendar_events`, e.g.
+            ``concurrency`` and ``page_size``
+
+        :return: generator that yields
+            :class:`kloudless.calendars.CalendarEvent`
+        """
+        if calendar_ids is None:
+            calendars = [self]
+        else:
+            calendars = [(self, calendar_id) for calendar_id in calendar_ids]
+        return merge_calendar_events(calendars, start, end, **kwargs)
+
+    def walk(self, folder_id='root', **kwargs):
+        """
+        Traverse the folder tree under ``folder_id`` breadth-first with
+        bounded concurrency. Pagination of each folder is followed.
+
+        .. code:: python
+
+            walker = account.walk(max_depth=3, concurrency=8)
+            for path, resource in walker:
+                print(path, resource.data['size'])
+
+        :param str folder_id: ID of the folder to start with
+
+        :param kwargs: kwargs passed to
+            :class:`kloudless.walk.TreeWalker`, e.g. ``max_depth``,
+            ``filter``, ``concurrency`` and ``checkpoint``
+
+        :return: :class:`kloudless.walk.TreeWalker` that yields
+            ``(path, resource)`` tuples
+        """
+        return TreeWalker(self, folder_id=folder_id, **kwargs)
+
+    def bulk_delete(self, items, recursive=False, **kwargs):
+        """
+        Delete files or folders with bounded concurrency.
+
+        :param items: Iterable of :class:`kloudless.resources.base.Resource`
+            instances or resource IDs
+        :param bool recursive: Set to ``True`` to delete non-empty folders
+        :param kwargs: kwargs passed to :func:`kloudless.bulk.run_bulk`, e.g.
+            ``resource_type``, ``concurrency``, ``rate_limit``, ``progress``
+            and ``journal``
+
+        :return: list of :class:`kloudless.bulk.BulkResult`
+        """
+        params = {'recursive': 'true'} if recursive else None
+        return run_bulk(self, 'delete', items,
+                        lambda url: self.delete(url, params=params), **kwargs)
+
+    def bulk_copy(self, items, parent_id, **kwargs):
+        """
+        Copy files or folders into the folder ``parent_id`` with bounded
+        concurrency.
+
+        A copy is only retried on rate limiting by default, since a copy
+        that failed with a server or connection error might have been made
+        and retrying it could create a duplicate. Pass
+        ``retry_exceptions=kloudless.concurrency.RETRY_EXCEPTIONS`` to retry
+        on those errors as well.
+
+        :param items: Iterable of :class:`kloudless.resources.base.Resource`
+            instances or resource IDs
+        :param str parent_id: ID of the destination folder
+        :param kwargs: kwargs passed to :func:`kloudless.bulk.run_bulk`
+
+        :return: list of :class:`kloudless.bulk.BulkResult`
+        """
+        data = {'parent_id': parent_id}
+        kwargs.setdefault('retry_exceptions', RATE_LIMIT_EXCEPTIONS)
+        return run_bulk(self, 'copy:{}'.format(parent_id), items,
+                        lambda url: self.post(url_join(url, 'copy'),
+                                              json=data),
+                        **kwargs)
+
+    def bulk_move(self, items, parent_id, **kwargs):
+        """
+        Move files or folders into the folder ``parent_id`` with bounded
+        concurrency.
+
+        :param items: Iterable of :class:`kloudless.resources.base.Resource`
+            instances or resource IDs
+        :param str parent_id: ID of the destination folder
+        :param kwargs: kwargs passed to :func:`kloudless.bulk.run_bulk`
+
+        :return: list of :class:`kloudless.bulk.BulkResult`
+        """
+        data = {'parent_id': parent_id}
+        return run_bulk(self, 'move:{}'.format(parent_id), items,
+                        lambda url: self.patch(url, json=data), **kwargs)
+
+    def bulk_transfer(self, items, destination, parent_id, **kwargs):
+        """
+        Stream files of this account into the folder ``parent_id`` of
+        another account with bounded concurrency, without writing to disk.
+
+        .. code:: python
+
+            contents = source.get('storage/folders/root/contents')
+            files = (resource for resource in contents.get_paging_iterator()
+                     if resource.data['type'] == 'file')
+            results = source.bulk_transfer(files, destination, 'root',
+                                           concurrency=8)
+
+        :param items: Iterable of :class:`kloudless.resources.base.Resource`
+            instances or file IDs
+        :param destination: :class:`kloudless.account.Account` to upload to
+        :param str parent_id: ID of the destination folder
+        :param kwargs: kwargs passed to
+            :func:`kloudless.transfer.transfer_files`, e.g. ``overwrite``,
+            ``buffer_chunks`` and ``concurrency``
+
+        :return: list of :class:`kloudless.bulk.BulkResult`
+        """
+        return transfer_files(self, destination, items, parent_id, **kwargs)
+
 
 def get_verified_account(app_id, token):
     """
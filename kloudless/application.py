@@ -1,13 +1,19 @@
 from __future__ import unicode_literals
 
 import base64
+import collections
+import copy
+import hashlib
 import os
+import threading
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from . import exceptions
-from .client import Client
-from .util import construct_kloudless_endpoint
+from .auth import APIKeyAuth, BearerTokenAuth
+from .client import Client, Session
+from .util import construct_kloudless_endpoint, monotonic
 
 try:
     import simplejson as json
@@ -35,8 +41,10 @@ def verify_token(app_id, token):
 
     client = Client(token=token)
     response = client.get('oauth/token', api_version=OAUTH_API_VERSION)
+    return _check_token_info(app_id, response.data)
 
-    data = response.json()
+
+def _check_token_info(app_id, data):
     check_app_id = data['client_id']
     if check_app_id != app_id:
         raise exceptions.TokenVerificationFailed(
@@ -120,6 +128,19 @@ def get_token_from_code(
     :raise: :class:`kloudless.exceptions.OauthFlowFailed`
     """
 
+    data = _get_token_request_data(app_id, api_key, orig_state,
+                                   orig_redirect_uri, params)
+    client = Client(api_key=api_key)
+    response = client.post(
+        'oauth/token', data=data, api_version=OAUTH_API_VERSION,
+        headers={'Content-Type': 'application/form-urlencoded'}
+    )
+    token = response.data['access_token']
+    return token
+
+
+def _get_token_request_data(app_id, api_key, orig_state, orig_redirect_uri,
+                            params):
     if params.get('error'):
         auth_exc = exceptions.OauthFlowFailed(
             "{}: {}".format(params['error'], params['error_description']))
@@ -141,11 +162,180 @@ def get_token_from_code(
         'client_id': app_id,
         'client_secret': api_key,
     }
+    return data
 
-    client = Client(api_key=api_key)
-    response = client.post(
-        'oauth/token', data=data, api_version=OAUTH_API_VERSION,
-        headers={'Content-Type': 'application/form-urlencoded'}
-    )
-    token = response.json()['access_token']
-    return token
+
+class TokenCache(object):
+    """
+    Thread-safe LRU cache of token information with expiration. Tokens are
+    stored by their SHA-256 digest. Entries are copied when stored and
+    returned, so callers could modify them without affecting each other.
+    """
+    def __init__(self, ttl=300, maxsize=1024):
+        """
+        :param float ttl: Seconds a cached entry is valid
+        :param int maxsize: The maximum quantity of cached entries
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= monotonic():
+                del self._entries[key]
+                return None
+            # Move to the end as the most recently used.
+            del self._entries[key]
+            self._entries[key] = entry
+        return copy.deepcopy(data)
+
+    def set(self, token, data):
+        key = self._key(token)
+        data = copy.deepcopy(data)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (monotonic() + self.ttl, data)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token):
+        with self._lock:
+            self._entries.pop(self._key(token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class Application(object):
+    """
+    Application level helper that sends OAuth requests through one pooled
+    session and caches the results of :func:`verify_token`.
+
+    :class:`kloudless.account.Account` instances created through
+    :func:`get_account` share the connection pools of the application. A
+    cached token is invalidated once a request of such account fails with
+    ``401``.
+
+    **Instance attributes**
+
+    :ivar str app_id: Application ID
+    :ivar str api_key: API Key
+    :ivar session: :class:`kloudless.client.Session` for OAuth requests
+    :ivar token_cache: :class:`TokenCache` of verified tokens
+    """
+    def __init__(self, app_id, api_key=None, cache_ttl=300,
+                 cache_size=1024, transport=None):
+        """
+        :param str app_id: Application ID
+        :param str api_key: API Key, needed by :func:`get_token_from_code`
+        :param float cache_ttl: Seconds the result of :func:`verify_token` is
+            cached
+        :param int cache_size: The maximum quantity of tokens cached
+        :param transport: Transport shared by the session and the accounts,
+            see :class:`kloudless.client.Session`. Default to a
+            :class:`requests.adapters.HTTPAdapter` instance.
+        """
+        self.app_id = app_id
+        self.api_key = api_key
+        self.transport = transport or HTTPAdapter()
+        self.session = Session(transport=self.transport)
+        self.token_cache = TokenCache(ttl=cache_ttl, maxsize=cache_size)
+        self._token_url = construct_kloudless_endpoint(
+            'oauth/token', api_version=OAUTH_API_VERSION)
+
+    def verify_token(self, token, use_cache=True):
+        """
+        Same as :func:`kloudless.application.verify_token`, with the result
+        cached.
+
+        :param str token: Account's Bearer token
+        :param bool use_cache: Set to ``False`` to skip the cached result
+
+        :return: (dict) Token information
+        :raise: :class:`kloudless.exceptions.TokenVerificationFailed`
+        """
+        if use_cache:
+            data = self.token_cache.get(token)
+            if data is not None:
+                return data
+
+        try:
+            response = self.session.get(self._token_url,
+                                        auth=BearerTokenAuth(token))
+        except exceptions.AuthorizationException:
+            self.token_cache.invalidate(token)
+            raise
+
+        data = _check_token_info(self.app_id, response.json())
+        self.token_cache.set(token, data)
+        return data
+
+    def invalidate_token(self, token):
+        """
+        Remove the cached result of :func:`verify_token` for ``token``.
+        """
+        self.token_cache.invalidate(token)
+
+    def get_account(self, token, verify=True, **kwargs):
+        """
+        Create an :class:`kloudless.account.Account` sharing the connection
+        pools of the application.
+
+        :param str token: Account's Bearer token
+        :param bool verify: Whether to verify the token first
+        :param kwargs: kwargs passed to :class:`kloudless.account.Account`
+
+        :return: :class:`kloudless.account.Account`
+        :raise: :class:`kloudless.exceptions.TokenVerificationFailed`
+        """
+        from .account import Account
+
+        if verify:
+            self.verify_token(token)
+
+        account = Account(token=token, transport=self.transport, **kwargs)
+
+        def invalidate_on_unauthorized(response, **_):
+            if response.status_code == 401:
+                self.invalidate_token(token)
+
+        account.hooks['response'].append(invalidate_on_unauthorized)
+        return account
+
+    def get_authorization_url(self, redirect_uri, **kwargs):
+        """
+        See :func:`kloudless.application.get_authorization_url`.
+        """
+        return get_authorization_url(self.app_id, redirect_uri, **kwargs)
+
+    def get_token_from_code(self, orig_state, orig_redirect_uri, **params):
+        """
+        Same as :func:`kloudless.application.get_token_from_code`, through
+        the pooled session.
+        """
+        if not self.api_key:
+            raise exceptions.InvalidParameter(
+                "An API Key is required to retrieve tokens.")
+
+        data = _get_token_request_data(self.app_id, self.api_key, orig_state,
+                                       orig_redirect_uri, params)
+        response = self.session.post(
+            self._token_url, data=data, auth=APIKeyAuth(self.api_key),
+            headers={'Content-Type': 'application/form-urlencoded'}
+        )
+        return response.json()['access_token']
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,155 @@
+from __future__ import unicode_literals
+
+import collections
+import io
+import threading
+
+import six
+
+from . import exceptions
+from .concurrency import (RETRY_EXCEPTIONS, RateLimiter, bounded_map,
+                          call_with_retry)
+from .resources import Resource
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+BulkResult = collections.namedtuple(
+    'BulkResult', ['id', 'ok', 'response', 'error', 'skipped'])
+BulkResult.__doc__ = """
+Result of one item of a bulk operation.
+
+:ivar str id: ID of the resource
+:ivar bool ok: Whether the operation succeeded or was skipped
+:ivar response: :class:`kloudless.resources.base.Response` or its subclass
+    if the operation succeeded
+:ivar error: The raised exception if the operation failed
+:ivar bool skipped: ``True`` if the item was completed according to the
+    journal, or the ``request`` returned :data:`SKIPPED`
+"""
+
+#: Returned by the ``request`` of :func:`run_bulk` if the item didn't need
+#: to be sent.
+SKIPPED = object()
+
+
+class Journal(object):
+    """
+    Append-only file recording the items completed by bulk operations, one
+    JSON object per line. Operations started with the same journal skip the
+    items it has recorded as completed.
+    """
+    def __init__(self, path):
+        """
+        :param str path: Path of the journal file. Created if not existing.
+        """
+        self.path = path
+        self._completed = set()
+        self._lock = threading.Lock()
+        try:
+            with io.open(path, 'r', encoding='utf8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # partially written line
+                    if entry.get('ok'):
+                        self._completed.add((entry['op'], entry['id']))
+        except IOError:
+            pass
+        self._file = io.open(path, 'a', encoding='utf8')
+
+    def is_completed(self, op, resource_id):
+        return (op, resource_id) in self._completed
+
+    def record(self, op, resource_id, ok):
+        line = json.dumps({'op': op, 'id': resource_id, 'ok': ok})
+        with self._lock:
+            if ok:
+                self._completed.add((op, resource_id))
+            self._file.write(six.text_type(line) + '\n')
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _get_target(account, item, resource_type):
+    """
+    Returns ``(resource_id, url)`` of ``item``, which is either a
+    :class:`kloudless.resources.base.Resource` or an ID.
+    """
+    if isinstance(item, Resource):
+        return str(item.data['id']), item.url
+    return str(item), account._compose_url(
+        'storage/{}s/{}'.format(resource_type, item))
+
+
+def run_bulk(account, op, items, request, resource_type='file',
+             concurrency=8, rate_limit=None, retries=3, progress=None,
+             journal=None, retry_exceptions=RETRY_EXCEPTIONS):
+    """
+    Run ``request`` for each item with bounded concurrency.
+
+    :param account: :class:`kloudless.account.Account` instance
+    :param str op: Name of the operation recorded in the journal
+    :param items: Iterable of :class:`kloudless.resources.base.Resource`
+        instances or resource IDs
+    :param request: Function that accepts the resource url and sends the
+        request, or returns :data:`SKIPPED`
+    :param str resource_type: ``file`` or ``folder``, the type of the items
+        given as IDs
+    :param int concurrency: The maximum quantity of requests at the same time
+    :param rate_limit: The maximum quantity of requests per second, or a
+        :class:`kloudless.concurrency.RateLimiter` instance shared between
+        operations
+    :param int retries: Times to retry an item on rate limiting, server and
+        connection errors
+    :param progress: Function that accepts ``(completed_count, result)``,
+        called after each item is done
+    :param journal: :class:`Journal` instance or the path of a journal file
+    :param tuple retry_exceptions: See
+        :func:`kloudless.concurrency.call_with_retry`
+
+    :return: list of :class:`BulkResult` in completion order
+    """
+    if resource_type not in ('file', 'folder'):
+        raise exceptions.InvalidParameter(
+            "resource_type must be 'file' or 'folder'.")
+
+    rate_limiter = rate_limit
+    if rate_limit and not isinstance(rate_limit, RateLimiter):
+        rate_limiter = RateLimiter(rate_limit)
+
+    owns_journal = isinstance(journal, six.string_types)
+    if owns_journal:
+        journal = Journal(journal)
+
+    def run(target):
+        resource_id, url = target
+        if journal is not None and journal.is_completed(op, resource_id):
+            return BulkResult(resource_id, True, None, None, True)
+        response = call_with_retry(lambda: request(url), retries=retries,
+                                   rate_limiter=rate_limiter,
+                                   retry_exceptions=retry_exceptions)
+        if response is SKIPPED:
+            return BulkResult(resource_id, True, None, None, True)
+        return BulkResult(resource_id, True, response, None, False)
+
+    targets = (_get_target(account, item, resource_type) for item in items)
+    results = []
+    try:
+        for target, result, error in bounded_map(run, targets, concurrency):
+            if error is not None:
+                result = BulkResult(target[0], False, None, error, False)
+            if journal is not None and not result.skipped:
+                journal.record(op, result.id, result.ok)
+            results.append(result)
+            if progress is not None:
+                progress(len(results), result)
+    finally:
+        if owns_journal:
+            journal.close()
+    return results
@@ -0,0 +1,268 @@
+from __future__ import unicode_literals
+
+import errno
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+import threading
+
+from six.moves.urllib.parse import urlencode
+
+from . import exceptions
+from .re_patterns import is_download_path
+from .resources import Resource
+
+#: Default upper bound of the cache size in bytes.
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+
+#: Bytes read from a download at a time while writing it to the cache.
+CHUNK_SIZE = 64 * 1024
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+class ContentCache(object):
+    """
+    Size bounded least-recently-used cache of downloaded contents on disk,
+    e.g. file contents and thumbnails.
+
+    Each entry is a file keyed by the account, the request url and a
+    version, like the ``modified`` time of the file, so a changed file is
+    downloaded again. Contents without a version are not cached.
+    Entries are written to a temporary file and renamed into place, and hits
+    are read through :mod:`mmap`. The recency of an entry is its modified
+    time, which is updated on each hit, so the cache could be shared by
+    processes using the same directory.
+    """
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        """
+        :param str directory: Directory of the cache. Created if not
+            existing.
+        :param int max_size: The maximum total size of the entries in bytes.
+            The least recently used entries are removed beyond it.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._scopes = {}
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        self._size = sum(size for _, size, _ in self._scan())
+
+    def _get_path(self, key, version):
+        digest = hashlib.sha256(
+            '{}\n{}'.format(key, version).encode('utf8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _scan(self):
+        """
+        Yields ``(path, size, mtime)`` of the entries.
+        """
+        for name in os.listdir(self.directory):
+            subdirectory = os.path.join(self.directory, name)
+            if not os.path.isdir(subdirectory):
+                continue
+            for entry in os.listdir(subdirectory):
+                if entry.startswith('.'):
+                    continue  # being written
+                path = os.path.join(subdirectory, entry)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # removed by another process
+                yield path, stat.st_size, stat.st_mtime
+
+    @staticmethod
+    def _map(path):
+        with io.open(path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                return b''  # empty files could not be mapped
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, key, version):
+        """
+        :param str key: Key of the entry, e.g. the request url
+        :param version: Version of the content, e.g. the ``modified`` time
+            of the file
+
+        :return: :class:`mmap.mmap` of the content opened for reading, or
+            ``None`` if not cached. An empty content is returned as ``b''``.
+        """
+        path = self._get_path(key, version)
+        try:
+            content = self._map(path)
+        except (IOError, OSError):
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return content
+
+    def put(self, key, version, chunks):
+        """
+        Write the content of an entry atomically.
+
+        :param str key: See :func:`get`
+        :param version: See :func:`get`
+        :param chunks: Iterable of bytes of the content
+
+        :return: :class:`mmap.mmap` or ``b''`` of the written content, which
+            stays readable even if the entry is evicted right away
+        """
+        path = self._get_path(key, version)
+        subdirectory = os.path.dirname(path)
+        try:
+            os.makedirs(subdirectory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        fd, temp_path = tempfile.mkstemp(prefix='.', dir=subdirectory)
+        size = 0
+        try:
+            with io.open(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            _replace(temp_path, path)
+            content = self._map(path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            self._size += size
+            evict = self._size > self.max_size
+        if evict:
+            self.evict()
+        return content
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the total size is
+        within ``max_size``.
+        """
+        with self._lock:
+            entries = sorted(self._scan(), key=lambda entry: entry[2])
+            size = sum(entry[1] for entry in entries)
+            for path, entry_size, _ in entries:
+                if size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # removed by another process, or mapped on Windows
+                size -= entry_size
+            self._size = size
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        with self._lock:
+            for path, _, _ in self._scan():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size = 0
+
+    def _get_scope(self, client):
+        """
+        Returns the part of the keys of ``client`` identifying whose content
+        it is: the ID of the account, resolved once per credential through a
+        request that checks the credential has access to it, or a hash of
+        the credential for clients of no account.
+        """
+        credential = (getattr(client, 'token', None)
+                      or getattr(client, 'api_key', None) or '')
+        credential = hashlib.sha256(credential.encode('utf8')).hexdigest()
+        if getattr(client, 'account_id', None) is None:
+            return 'credential:{}'.format(credential)
+
+        key = (client.url, credential)
+        with self._lock:
+            scope = self._scopes.get(key)
+        if scope is None:
+            scope = 'account:{}'.format(client.get('').data['id'])
+            with self._lock:
+                self._scopes[key] = scope
+        return scope
+
+    def fetch(self, client, path, version, params=None, **kwargs):
+        """
+        Return the content of a download url from the cache, or download and
+        cache it.
+
+        :param client: :class:`kloudless.client.Client` or
+            :class:`kloudless.account.Account`
+        :param str path: Request path of the download, e.g.
+            ``storage/files/{id}/contents``. See
+            :data:`kloudless.re_patterns.download_file_patterns`.
+        :param version: See :func:`get`. The content is downloaded without
+            being cached if ``None``.
+        :param dict params: Query parameters, e.g. ``size`` of thumbnails
+        :param kwargs: kwargs passed to :func:`kloudless.client.Client.get`
+
+        :return: :class:`mmap.mmap` or ``b''``, see :func:`get`, or bytes if
+            ``version`` is ``None``
+        """
+        if not is_download_path(path):
+            raise exceptions.InvalidParameter(
+                "{} is not a download url.".format(path))
+
+        content = None
+        if version is not None:
+            # Keyed by the account too, since urls like accounts/me/... are
+            # the same for all accounts and hits are served without a
+            # request.
+            key = '{}\n{}'.format(self._get_scope(client),
+                                  client._compose_url(path))
+            if params:
+                key = '{}?{}'.format(key, urlencode(sorted(params.items())))
+            content = self.get(key, version)
+
+        if content is None:
+            response = client.get(path, params=params, stream=True, **kwargs)
+            try:
+                chunks = response.iter_content(CHUNK_SIZE)
+                if version is None:
+                    return b''.join(chunks)
+                content = self.put(key, version, chunks)
+            finally:
+                response.close()
+        return content
+
+    def fetch_file(self, account, resource, thumbnail=False, params=None,
+                   **kwargs):
+        """
+        Return the contents or thumbnail of a file from the cache, or
+        download and cache it. The ``modified`` time of the file is used as
+        the version, and files without it are downloaded without being
+        cached.
+
+        :param account: :class:`kloudless.account.Account`
+        :param resource: :class:`kloudless.resources.base.Resource` of the
+            file, or its ID. The metadata is retrieved if an ID is given.
+        :param bool thumbnail: Set to ``True`` for the thumbnail
+        :param params: See :func:`fetch`
+        :param kwargs: kwargs passed to :func:`kloudless.client.Client.get`
+
+        :return: :class:`mmap.mmap` or ``b''``, see :func:`get`, or bytes if
+            not cached
+        """
+        if not isinstance(resource, Resource):
+            resource = account.get('storage/files/{}'.format(resource))
+        path = 'storage/files/{}/{}'.format(
+            resource.data['id'], 'thumbnail' if thumbnail else 'contents')
+        version = resource.data.get('modified')
+        return self.fetch(account, path, version, params=params, **kwargs)
@@ -0,0 +1,109 @@
+from __future__ import unicode_literals
+
+import collections
+
+from .concurrency import DEFAULT_PREFETCH_SIZE, bounded_map, merge_sorted
+from .util import to_iso, to_utc
+
+CalendarEvent = collections.namedtuple(
+    'CalendarEvent', ['account', 'calendar_id', 'event'])
+CalendarEvent.__doc__ = """
+An event yielded by :func:`merge_calendar_events`.
+
+:ivar account: :class:`kloudless.account.Account` of the calendar
+:ivar str calendar_id: ID of the calendar, as given or listed
+:ivar event: :class:`kloudless.resources.base.Resource` of the event
+"""
+
+
+def get_start_key(data):
+    """
+    Sort key of an event by its ``start`` time. Times without time zone, like
+    those of all-day events, are considered as UTC, and events without
+    ``start`` come first.
+
+    :param dict data: ``data`` of the event resource
+    :return: naive :class:`datetime.datetime` in UTC
+    """
+    return to_utc(data.get('start'))
+
+
+def get_calendar_ids(account, **params):
+    """
+    :param account: :class:`kloudless.account.Account` instance
+    :param params: Additional query parameters, e.g. ``page_size``
+    :return: list of the IDs of all calendars of ``account``
+    """
+    calendars = account.get('cal/calendars', params=params)
+    return [str(calendar.data['id'])
+            for calendar in calendars.get_paging_iterator()]
+
+
+def _iter_events(account, calendar_id, params):
+    events = account.get('cal/calendars/{}/events'.format(calendar_id),
+                         params=params)
+    for event in events.get_paging_iterator():
+        yield CalendarEvent(account, calendar_id, event)
+
+
+def merge_calendar_events(calendars, start, end, concurrency=8,
+                          page_size=None, buffer_size=DEFAULT_PREFETCH_SIZE,
+                          **params):
+    """
+    Retrieve the events of several calendars, possibly of several accounts,
+    between ``start`` and ``end`` and merge them into one stream ordered by
+    start time.
+
+    The calendars are retrieved in parallel, each through its pages, and
+    merged through a heap as their events arrive, so memory stays bounded
+    by a page and ``buffer_size`` events per calendar. The events of each
+    calendar are expected in the order of their start time, which is how
+    the API returns them.
+
+    :param calendars: Iterable of ``(account, calendar_id)`` tuples, or
+        :class:`kloudless.account.Account` instances to merge all calendars
+        of. ``calendar_id`` could be the ``primary`` alias.
+    :param start: :class:`datetime.datetime` or ISO 8601 timestamp of the
+        beginning of the time window
+    :param end: :class:`datetime.datetime` or ISO 8601 timestamp of the end
+        of the time window
+    :param int concurrency: The maximum quantity of requests in progress at
+        the same time
+    :param int page_size: ``page_size`` of the events requests
+    :param int buffer_size: Events buffered per calendar ahead of the merge
+    :param params: Additional query parameters of the events requests
+
+    :return: generator that yields :class:`CalendarEvent`, or raises the
+        first error of retrieving a calendar
+    """
+    params['start'] = to_iso(start)
+    params['end'] = to_iso(end)
+    if page_size:
+        params['page_size'] = page_size
+
+    pairs = []
+    accounts = []
+    for item in calendars:
+        if isinstance(item, tuple):
+            pairs.append(item)
+        else:
+            accounts.append(item)
+    for account, calendar_ids, error in bounded_map(
+            get_calendar_ids, accounts, concurrency=concurrency,
+            ordered=True):
+        if error is not None:
+            raise error
+        pairs.extend((account, calendar_id) for calendar_id in calendar_ids)
+
+    streams = []
+    seen = set()
+    for account, calendar_id in pairs:
+        calendar_id = str(calendar_id)
+        if (id(account), calendar_id) in seen:
+            continue
+        seen.add((id(account), calendar_id))
+        streams.append(_iter_events(account, calendar_id, dict(params)))
+
+    return merge_sorted(
+        streams, key=lambda item: get_start_key(item.event.data),
+        concurrency=concurrency, buffer_size=buffer_size)
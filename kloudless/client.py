@@ -1,14 +1,23 @@
 from __future__ import unicode_literals
 
-import re
+import functools
+import os
 
 import requests
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE, HTTPAdapter
+from six.moves.http_cookiejar import DefaultCookiePolicy
 
 from . import exceptions
 from .auth import APIKeyAuth, BearerTokenAuth
-from .re_patterns import download_file_patterns
+from .compression import (ACCEPT_ENCODING, DEFAULT_MIN_SIZE, CompressionStats,
+                          accepts_gzip, gzip_compress)
+from .endpoints import Endpoint
+from .re_patterns import is_download_path
 from .resources import ResourceList, Resource, Response, ResponseJson
-from .util import logger, url_join, construct_kloudless_endpoint
+from .resources.base import get_projection, project
+from .transport import reset_transport
+from .util import (logger, url_join, construct_kloudless_endpoint,
+                   get_config, replace_api_version)
 from .version import VERSION
 
 try:
@@ -20,37 +29,149 @@ except ImportError:
 def handle_response(response):
 
     if not response.ok:
-        logger.error("Request to '{}' failed: {} - {}".format(
-            response.url, response.status_code, response.text))
         if response.status_code == 401:
-            raise exceptions.AuthorizationException(response=response)
+            error_class = exceptions.AuthorizationException
         elif response.status_code == 403:
-            raise exceptions.ForbiddenException(response=response)
+            error_class = exceptions.ForbiddenException
         elif response.status_code == 404:
-            raise exceptions.NotFoundException(response=response)
+            error_class = exceptions.NotFoundException
         elif response.status_code == 429:
             # TODO: retry mechanism for 429 response
             # Might be able to make use of response.request object
-            raise exceptions.RateLimitException(response=response)
+            error_class = exceptions.RateLimitException
         elif response.status_code >= 500:
-            raise exceptions.ServerException(response=response)
+            error_class = exceptions.ServerException
         else:
-            raise exceptions.APIException(response=response)
+            error_class = exceptions.APIException
+        error = error_class(response=response)
+        # The body is truncated by the exception
+        logger.error("Request to '{}' failed: {} - {}".format(
+            response.url, response.status_code, error.body_text))
+        raise error
 
     logger.debug("Request to '{}' succeeded. Status code: {}".format(
         response.url, response.status_code))
     return response
 
 
+class RejectAllCookiePolicy(DefaultCookiePolicy):
+    """
+    Cookie policy that neither stores nor returns any cookie.
+    """
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
 class Session(requests.Session):
     """
     The Session class helps build Kloudless specific headers.
+
+    **Instance attributes**
+
+    :ivar transport: The transport mounted for all urls, if specified. See
+        :mod:`kloudless.transport`.
+
+    :ivar compression_stats: :class:`kloudless.compression.CompressionStats`
+        of the requests sent through this session
     """
-    def __init__(self):
+    def __init__(self, transport=None, compress_requests=None,
+                 compression_min_size=DEFAULT_MIN_SIZE, thread_safe=False,
+                 pool_maxsize=DEFAULT_POOLSIZE):
+        """
+        :param transport: :class:`kloudless.transport.BaseTransport` or any
+            :class:`requests.adapters.BaseAdapter` instance to send the
+            requests through. Default to
+            :class:`requests.adapters.HTTPAdapter`.
+
+        :param bool compress_requests: Whether to gzip the ``json`` bodies
+            of requests. By default, bodies are compressed once a response
+            advertises gzip support through its ``Accept-Encoding`` header.
+
+        :param int compression_min_size: ``json`` bodies smaller than this
+            many bytes are not compressed
+
+        :param bool thread_safe: Set to ``True`` to share the session between
+            threads. Cookies are neither stored nor sent, so that responses
+            don't mutate the session.
+
+        :param int pool_maxsize: The quantity of connections kept per host by
+            the default transport. Set it to the quantity of threads sharing
+            the session to avoid discarding connections.
+        """
         super(Session, self).__init__()
+        self._session_kwargs = {
+            'transport': transport,
+            'compress_requests': compress_requests,
+            'compression_min_size': compression_min_size,
+            'thread_safe': thread_safe,
+            'pool_maxsize': pool_maxsize,
+        }
+        self._pid = os.getpid()
         self.headers.update({
             'User-Agent': 'kloudless-python/{}'.format(VERSION),
+            'Accept-Encoding': ACCEPT_ENCODING,
         })
+        self.compress_requests = compress_requests
+        self.compression_min_size = compression_min_size
+        self.compression_stats = CompressionStats()
+        self._server_accepts_gzip = False
+        self.thread_safe = thread_safe
+        if thread_safe:
+            self.cookies.set_policy(RejectAllCookiePolicy())
+
+        # The settings of the default transport, to create its pools again
+        # after fork.
+        self._pool_settings = {
+            'pool_connections': DEFAULT_POOLSIZE,
+            'pool_maxsize': pool_maxsize,
+            'pool_block': DEFAULT_POOLBLOCK,
+        }
+        default_transport = transport is None
+        if default_transport and pool_maxsize != DEFAULT_POOLSIZE:
+            transport = HTTPAdapter(**self._pool_settings)
+        self.transport = transport
+        if transport is not None:
+            self.mount('https://', transport)
+            self.mount('http://', transport)
+        self._default_adapters = (set(self.adapters.values())
+                                  if default_transport else set())
+
+    def __getstate__(self):
+        """
+        Pickle the constructor arguments and headers only. Connection pools
+        are created again after unpickling.
+        """
+        return {'kwargs': dict(self._session_kwargs),
+                'headers': dict(self.headers)}
+
+    def __setstate__(self, state):
+        self.__init__(**state['kwargs'])
+        self.headers.clear()
+        self.headers.update(state['headers'])
+
+    def _reset_after_fork(self):
+        """
+        Drop the connection pools inherited from the parent process, which
+        must not be shared between processes.
+        """
+        self._pid = os.getpid()
+        settings = self._pool_settings
+        for adapter in set(self.adapters.values()):
+            if adapter in self._default_adapters:
+                adapter.proxy_manager = {}
+                adapter.init_poolmanager(settings['pool_connections'],
+                                         settings['pool_maxsize'],
+                                         block=settings['pool_block'])
+            else:
+                reset_transport(adapter)
+
+    def send(self, request, **kwargs):
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        return super(Session, self).send(request, **kwargs)
 
     @staticmethod
     def _update_kloudless_headers(headers, get_raw_data, raw_headers,
@@ -65,6 +186,30 @@ class Session(requests.Session):
         if impersonate_user_id:
             headers['X-Kloudless-As-User'] = str(impersonate_user_id)
 
+    def _compress_json_body(self, kwargs):
+        """
+        Replace the ``json`` kwarg with a gzip compressed ``data`` kwarg if
+        applicable.
+        """
+        if kwargs.get('json') is None or kwargs.get('data'):
+            return
+        if self.compress_requests is False or (
+                self.compress_requests is None
+                and not self._server_accepts_gzip):
+            return
+
+        body = json.dumps(kwargs['json']).encode('utf-8')
+        if len(body) < self.compression_min_size:
+            return
+
+        compressed = gzip_compress(body)
+        self.compression_stats.record_request(len(body), len(compressed))
+        headers = kwargs['headers']
+        headers.setdefault('Content-Type', 'application/json')
+        headers['Content-Encoding'] = 'gzip'
+        kwargs['data'] = compressed
+        del kwargs['json']
+
     def request(self, method, url, api_version=None, get_raw_data=None,
                 raw_headers=None, impersonate_user_id=None, **kwargs):
         """
@@ -97,16 +242,111 @@ class Session(requests.Session):
         :raises: :class:`kloudless.exceptions.APIException` or its subclasses
         """
         if api_version is not None:
-            url = re.sub(
-                r'(https?://.+?/)v\d', r'\1v{}'.format(api_version), url
-            )
+            url = replace_api_version(url, api_version)
+
+        # Copy the headers to leave the caller's one untouched, which might be
+        # shared between threads.
+        kwargs['headers'] = dict(kwargs.get('headers') or {})
+        self._update_kloudless_headers(kwargs['headers'], get_raw_data,
+                                       raw_headers, impersonate_user_id)
+        self._compress_json_body(kwargs)
+        response = super(Session, self).request(method, url, **kwargs)
+        return self._process_response(response, kwargs.get('stream'))
+
+    def _process_response(self, response, stream):
+
+        if not self._server_accepts_gzip and accepts_gzip(response.headers):
+            self._server_accepts_gzip = True
+        if not stream:
+            self.compression_stats.record_response(response)
+
+        return handle_response(response)
+
+    def prepare_template(self, method, url, api_version=None,
+                         get_raw_data=None, raw_headers=None,
+                         impersonate_user_id=None, params=None, headers=None,
+                         auth=None, timeout=None, allow_redirects=True,
+                         proxies=None, stream=None, verify=None, cert=None):
+        """
+        Prepare a request once to send it repeatedly through
+        :func:`RequestTemplate.send`. The url, headers and authentication are
+        only built here; each send only applies the changing query
+        parameters and body.
 
-        self._update_kloudless_headers(kwargs.setdefault('headers', dict()),
-                                       get_raw_data, raw_headers,
+        The parameters are the same as :func:`request`, except that ``data``
+        and ``json`` are given to :func:`RequestTemplate.send`.
+
+        :return: :class:`RequestTemplate`
+        """
+        if api_version is not None:
+            url = replace_api_version(url, api_version)
+
+        headers = dict(headers or {})
+        self._update_kloudless_headers(headers, get_raw_data, raw_headers,
                                        impersonate_user_id)
-        response = handle_response(
-            super(Session, self).request(method, url, **kwargs)
-        )
+        prepared = self.prepare_request(requests.Request(
+            method=method.upper(), url=url, headers=headers,
+            params=params or {}, auth=auth))
+
+        send_kwargs = {'timeout': timeout, 'allow_redirects': allow_redirects}
+        send_kwargs.update(self.merge_environment_settings(
+            prepared.url, proxies or {}, stream, verify, cert))
+        return RequestTemplate(self, prepared, send_kwargs)
+
+
+class RequestTemplate(object):
+    """
+    A request prepared by :func:`Session.prepare_template` or
+    :func:`Client.prepare`.
+
+    .. code:: python
+
+        template = account.prepare('GET', 'events')
+        response = template.send(params={'cursor': cursor})
+
+    **Instance attributes**
+
+    :ivar session: :class:`Session` sending the request
+    :ivar prepared: :class:`requests.PreparedRequest` being copied for each
+        send
+    :ivar response_handler: Function that converts each
+        :class:`requests.Response`, if any
+    """
+    def __init__(self, session, prepared, send_kwargs,
+                 response_handler=None):
+        self.session = session
+        self.prepared = prepared
+        self.send_kwargs = send_kwargs
+        self.response_handler = response_handler
+
+    def send(self, params=None, data=None, json=None, headers=None):
+        """
+        Send the request.
+
+        :param dict params: Query parameters appended to the prepared url
+        :param data: Request body, see :func:`requests.Session.request`
+        :param json: JSON request body
+        :param dict headers: Additional headers
+
+        :return: :class:`requests.Response`, or the value converted by
+            ``self.response_handler``
+        :raises: :class:`kloudless.exceptions.APIException` or its subclasses
+        """
+        request = self.prepared.copy()
+        if params:
+            request.prepare_url(self.prepared.url, params)
+        if headers:
+            request.headers.update(headers)
+        if data is not None or json is not None:
+            kwargs = {'data': data, 'json': json, 'headers': request.headers}
+            self.session._compress_json_body(kwargs)
+            request.prepare_body(kwargs.get('data'), None, kwargs.get('json'))
+
+        stream = self.send_kwargs.get('stream')
+        response = self.session._process_response(
+            self.session.send(request, **self.send_kwargs), stream)
+        if self.response_handler is not None:
+            return self.response_handler(response)
         return response
 
 
@@ -119,14 +359,16 @@ class Client(Session):
     :ivar str url: Base url that will be used as a prefix for all http method
         calls
     """
-    def __init__(self, api_key=None, token=None):
+    def __init__(self, api_key=None, token=None, **kwargs):
         """
         Either ``api_key`` or ``token`` is needed for instantiation.
 
         :param api_key: API key
         :param token: Bearer token
+        :param kwargs: kwargs passed to :class:`kloudless.client.Session`,
+            e.g. ``transport`` and ``thread_safe``
         """
-        super(Client, self).__init__()
+        super(Client, self).__init__(**kwargs)
 
         if token:
             self.token = token
@@ -141,11 +383,23 @@ class Client(Session):
             )
 
         self.url = construct_kloudless_endpoint()
+        self._url_prefixes = {}
+
+    def __getstate__(self):
+        state = super(Client, self).__getstate__()
+        state['kwargs'].update(api_key=getattr(self, 'api_key', None),
+                               token=getattr(self, 'token', None))
+        state['url'] = self.url
+        return state
+
+    def __setstate__(self, state):
+        super(Client, self).__setstate__(state)
+        self.url = state['url']
 
     def _compose_url(self, path):
         return url_join(self.url, path)
 
-    def _create_response_object(self, response):
+    def _create_response_object(self, response, fields=None):
 
         url = response.url
 
@@ -156,20 +410,31 @@ class Client(Session):
             response_data = response.json()
         except ValueError:
             logger.error("Request to {} failed to decode json: {} - {}".format(
-                response.url, response.status_code, response.text))
+                response.url, response.status_code,
+                response.text[:exceptions.MAX_ERROR_BODY_SIZE]))
             raise
 
         type_ = response_data.get('type')
         if type_ == 'object_list':
-            return ResourceList(data=response_data, url=url,
-                                client=self, response=response)
+            if fields is not None:
+                response_data['objects'] = [
+                    project(object_data, fields)
+                    for object_data in response_data.get('objects', [])]
+            response_object = ResourceList(
+                data=response_data, url=url, client=self, response=response,
+                fields=fields)
         elif 'id' in response_data or 'href' in response_data:
-            return Resource(
-                data=response_data, url=url, client=self, response=response
+            response_object = Resource(
+                data=project(response_data, fields), url=url, client=self,
+                response=response, fields=fields
             )
         else:
-            return ResponseJson(data=response_data, url=url,
-                                client=self, response=response)
+            response_object = ResponseJson(data=response_data, url=url,
+                                           client=self, response=response)
+
+        if get_config('lean_responses'):
+            response_object.release_response()
+        return response_object
 
     def request(self, method, path='', get_raw_response=False, **kwargs):
         """
@@ -181,6 +446,12 @@ class Client(Session):
         :param str get_raw_response: Set to ``True`` if the raw
             :class:`requests.Response` instance is in the returned value
 
+        :param fields: Keys to keep in the data of the returned resources,
+            e.g. ``['name', 'size']``. Other keys are dropped right after
+            the response is decoded. ``id``, ``href``, ``api`` and ``type``
+            are always kept. If ``configuration['fields_query_param']`` is
+            set, ``fields`` is also sent to the API as that query parameter.
+
         :param kwargs: kwargs passed to :func:`kloudless.client.Session.request`
 
         :return:
@@ -188,12 +459,96 @@ class Client(Session):
             - :class:`kloudless.resources.base.Response` or its subclass otherwise
         """
         url = self._compose_url(path)
+        return self._request_url(method, url,
+                                 get_raw_response=get_raw_response, **kwargs)
+
+    def prepare(self, method, path='', get_raw_response=False, fields=None,
+                **kwargs):
+        """
+        | Prepare a request to send it repeatedly, see
+          :func:`kloudless.client.Session.prepare_template`.
+        | Note that the actual request url will have ``self.url`` as a prefix.
+
+        :param str method: Http method
+        :param str path: Request path
+        :param str get_raw_response: Set to ``True`` if the raw
+            :class:`requests.Response` instance is returned by
+            :func:`kloudless.client.RequestTemplate.send`
+        :param fields: See :func:`request`
+
+        :param kwargs: kwargs passed to
+            :func:`kloudless.client.Session.prepare_template`
+
+        :return: :class:`kloudless.client.RequestTemplate`
+        """
+        if (method.upper() == 'GET' and 'stream' not in kwargs
+                and is_download_path(path)):
+            kwargs['stream'] = True
+        fields = self._add_fields_query_param(fields, kwargs)
+        template = self.prepare_template(method, self._compose_url(path),
+                                         **kwargs)
+        if not get_raw_response:
+            template.response_handler = functools.partial(
+                self._create_response_object, fields=fields)
+        return template
+
+    @staticmethod
+    def _add_fields_query_param(fields, kwargs):
+        """
+        Returns the projection of ``fields``, which is also added to the
+        query parameters in ``kwargs`` if the API field selection is
+        configured.
+        """
+        fields = get_projection(fields)
+        param = get_config('fields_query_param')
+        if fields is not None and param:
+            kwargs['params'] = dict(kwargs.get('params') or {})
+            kwargs['params'][param] = ','.join(fields)
+        return fields
+
+    def _request_url(self, method, url, get_raw_response=False, fields=None,
+                     **kwargs):
+        fields = self._add_fields_query_param(fields, kwargs)
         response = super(Client, self).request(method, url, **kwargs)
 
         if get_raw_response:
             return response
 
-        return self._create_response_object(response)
+        return self._create_response_object(response, fields=fields)
+
+    def _get_url_prefix(self, api_version=None):
+        """
+        Returns ``self.url`` with its API version replaced by
+        ``api_version``. The results are cached.
+        """
+        if api_version is None:
+            return self.url
+        key = (self.url, str(api_version))
+        prefix = self._url_prefixes.get(key)
+        if prefix is None:
+            prefix = replace_api_version(self.url, api_version)
+            self._url_prefixes[key] = prefix
+        return prefix
+
+    def endpoint(self, path, api_version=None, endpoint_class=Endpoint):
+        """
+        Build an endpoint for ``path`` once to send requests to it
+        repeatedly without composing the url again.
+
+        .. code:: python
+
+            latest = account.endpoint('events/latest')
+            cursor = latest.get().data['cursor']
+
+        :param str path: Request path relative to ``self.url``
+        :param int api_version: API version of the endpoint
+        :param endpoint_class: :class:`kloudless.endpoints.Endpoint` or its
+            subclass to create
+
+        :return: :class:`kloudless.endpoints.Endpoint`
+        """
+        return endpoint_class(self, '{}/{}'.format(
+            self._get_url_prefix(api_version), path.strip('/')))
 
     def get(self, path='', **kwargs):
         """
@@ -207,8 +562,8 @@ class Client(Session):
 
         :return: :class:`kloudless.resources.base.Response` or its subclass
         """
-        if download_file_patterns.search(path):
-            kwargs.setdefault('stream', True)
+        if 'stream' not in kwargs and is_download_path(path):
+            kwargs['stream'] = True
 
         return super(Client, self).get(path, **kwargs)
 
@@ -0,0 +1,101 @@
+from __future__ import unicode_literals
+
+import threading
+import zlib
+
+from urllib3.util import make_headers
+
+#: Content codings the responses could be decoded from. ``br`` and ``zstd``
+#: are included if ``brotli`` and ``zstandard`` are installed respectively.
+ACCEPT_ENCODING = ', '.join(
+    coding.strip() for coding in
+    make_headers(accept_encoding=True)['accept-encoding'].split(','))
+
+#: Request bodies smaller than this many bytes are not compressed.
+DEFAULT_MIN_SIZE = 1024
+
+
+def gzip_compress(data, level=6):
+    """
+    Compress bytes into the gzip format.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def accepts_gzip(headers):
+    """
+    Whether the ``Accept-Encoding`` response header advertises that gzip
+    request bodies are supported, see `RFC 7694 <https://tools.ietf.org/html/
+    rfc7694>`_.
+    """
+    value = headers.get('Accept-Encoding')
+    if not value:
+        return False
+    for coding in value.split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() != 'gzip':
+            continue
+        _, _, quality = params.partition('q=')
+        try:
+            return float(quality) > 0 if quality.strip() else True
+        except ValueError:
+            return True
+    return False
+
+
+class CompressionStats(object):
+    """
+    Thread-safe byte counters of compressed requests and responses.
+
+    Only responses whose body is not streamed are counted.
+
+    **Instance attributes**
+
+    :ivar int request_bytes: Size of the request bodies before compression
+    :ivar int request_bytes_sent: Size of the compressed request bodies
+    :ivar int response_bytes: Size of the decoded response bodies
+    :ivar int response_bytes_received: Size of the response bodies as
+        received
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.request_bytes = 0
+            self.request_bytes_sent = 0
+            self.response_bytes = 0
+            self.response_bytes_received = 0
+
+    @property
+    def request_bytes_saved(self):
+        return self.request_bytes - self.request_bytes_sent
+
+    @property
+    def response_bytes_saved(self):
+        return self.response_bytes - self.response_bytes_received
+
+    def record_request(self, size, sent):
+        with self._lock:
+            self.request_bytes += size
+            self.request_bytes_sent += sent
+
+    def record_response(self, response):
+        """
+        Count the body of a :class:`requests.Response` that is read already.
+        """
+        size = len(response.content or b'')
+        received = None
+        if response.headers.get('Content-Encoding'):
+            try:
+                # The bytes read from the connection, before decoding.
+                received = response.raw.tell()
+            except Exception:
+                received = response.headers.get('Content-Length')
+        received = size if received is None else int(received)
+
+        with self._lock:
+            self.response_bytes += size
+            self.response_bytes_received += received
@@ -0,0 +1,270 @@
+from __future__ import unicode_literals
+
+import collections
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from requests.exceptions import ConnectionError, Timeout
+from six.moves import queue
+
+from . import exceptions
+from .util import monotonic
+
+#: Items buffered by :func:`prefetch` by default.
+DEFAULT_PREFETCH_SIZE = 16
+
+#: Exceptions considered as transient failures of a single request.
+RETRY_EXCEPTIONS = (exceptions.RateLimitException,
+                    exceptions.ServerException, ConnectionError, Timeout)
+
+#: Errors after which the request is known not to have been processed, so
+#: retrying is safe for requests that aren't idempotent, e.g. copies.
+RATE_LIMIT_EXCEPTIONS = (exceptions.RateLimitException,)
+
+
+class RateLimiter(object):
+    """
+    Thread-safe token bucket that limits how often requests are sent.
+    """
+    def __init__(self, rate, burst=None):
+        """
+        :param float rate: The quantity of requests allowed per second
+        :param int burst: The quantity of requests allowed at once. Default
+            to ``rate``.
+        """
+        if rate <= 0:
+            raise exceptions.InvalidParameter("rate must be positive.")
+        self.rate = float(rate)
+        self.burst = max(1, burst or int(rate))
+        self._tokens = float(self.burst)
+        self._updated_at = monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a request is allowed.
+        """
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+def call_with_retry(func, retries=3, backoff=1.0, rate_limiter=None,
+                    retry_exceptions=RETRY_EXCEPTIONS):
+    """
+    Call ``func`` and retry on rate limiting, server and connection errors
+    with exponential backoff. ``Retry-After`` of rate limiting responses is
+    respected.
+
+    :param func: Function without arguments
+    :param int retries: Times to retry before raising the error
+    :param float backoff: Delay seconds before the first retry
+    :param rate_limiter: :class:`RateLimiter` acquired before each call
+    :param tuple retry_exceptions: Exception classes to retry on. Use
+        :data:`RATE_LIMIT_EXCEPTIONS` for requests that aren't idempotent.
+    """
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return func()
+        except retry_exceptions as e:
+            if attempt >= retries:
+                raise
+            delay = backoff * (2 ** attempt)
+            if getattr(e, 'retry_after', None):
+                delay = max(delay, e.retry_after)
+            attempt += 1
+            time.sleep(delay)
+
+
+def bounded_map(func, iterable, concurrency=4, ordered=False):
+    """
+    Apply ``func`` to each item of ``iterable`` in a thread pool. At most
+    ``concurrency`` items are processed and ``concurrency`` results buffered
+    at the same time, so ``iterable`` is consumed lazily.
+
+    :param func: Function that accepts one item
+    :param iterable: Iterable of items
+    :param int concurrency: The maximum quantity of items processed at the
+        same time
+    :param bool ordered: Set to ``True`` to yield results in the order of
+        ``iterable``, or they are yielded as soon as completed
+
+    :return: generator that yields ``(item, result, error)`` tuples where
+        ``error`` is the exception raised by ``func``, if any
+    """
+    if concurrency < 1:
+        raise exceptions.InvalidParameter(
+            "concurrency must be a positive integer.")
+
+    items = iter(iterable)
+    in_flight = collections.OrderedDict()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def fill():
+        while len(in_flight) < concurrency:
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            in_flight[executor.submit(func, item)] = item
+
+    try:
+        fill()
+        while in_flight:
+            if ordered:
+                done = [next(iter(in_flight))]
+                wait(done)
+            else:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                item = in_flight.pop(future)
+                error = future.exception()
+                result = None if error else future.result()
+                yield item, result, error
+            fill()
+    finally:
+        for future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def _drain(items, stopped, end):
+    try:
+        while True:
+            item, error = items.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
+def prefetch(iterable, buffer_size=DEFAULT_PREFETCH_SIZE):
+    """
+    Consume ``iterable`` in a background thread, at most ``buffer_size``
+    items ahead of the caller, so the requests made while producing the
+    items overlap with the processing of the items. The thread starts right
+    away, so the returned generator should be consumed or closed.
+
+    Errors raised by ``iterable`` are raised from the returned generator
+    after the items produced before them. The background thread stops and
+    closes ``iterable`` once the returned generator is closed.
+
+    :param iterable: Iterable of items
+    :param int buffer_size: The maximum quantity of items buffered
+
+    :return: generator that yields the items of ``iterable``
+    """
+    if buffer_size < 1:
+        raise exceptions.InvalidParameter(
+            "buffer_size must be a positive integer.")
+
+    items = queue.Queue(maxsize=buffer_size)
+    stopped = threading.Event()
+    end = object()
+
+    def put(entry):
+        while not stopped.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((end, None))
+        except Exception as e:
+            put((end, e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+    return _drain(items, stopped, end)
+
+
+def merge_sorted(iterables, key=None, concurrency=None,
+                 buffer_size=DEFAULT_PREFETCH_SIZE):
+    """
+    Merge iterables that are each sorted by ``key`` into one sorted stream
+    through a heap. Each iterable is consumed in its own thread through
+    :func:`prefetch`, so at most ``buffer_size`` items of each are held in
+    memory besides what they hold themselves, e.g. a page of resources.
+
+    :param iterables: Sequence of iterables sorted by ``key``
+    :param key: Function that returns the sort key of an item. Defaults to
+        the item itself.
+    :param int concurrency: The maximum quantity of iterables producing an
+        item at the same time, e.g. to bound the quantity of page requests
+        in progress. Not bounded by default.
+    :param int buffer_size: See :func:`prefetch`
+
+    :return: generator that yields the items of all ``iterables``. Items
+        with the same key are yielded in the order of ``iterables``.
+    """
+    if concurrency is not None and concurrency < 1:
+        raise exceptions.InvalidParameter(
+            "concurrency must be a positive integer.")
+    key = key or (lambda item: item)
+    semaphore = threading.Semaphore(concurrency) if concurrency else None
+    _end = object()
+
+    def limit(iterable):
+        iterator = iter(iterable)
+        while True:
+            if semaphore is None:
+                item = next(iterator, _end)
+            else:
+                with semaphore:
+                    item = next(iterator, _end)
+            if item is _end:
+                return
+            yield item
+
+    streams = [prefetch(limit(iterable), buffer_size)
+               for iterable in iterables]
+    try:
+        heap = []
+        for index, stream in enumerate(streams):
+            item = next(stream, _end)
+            if item is not _end:
+                heap.append((key(item), index, item))
+        heapq.heapify(heap)
+
+        while heap:
+            _, index, item = heap[0]
+            yield item
+            item = next(streams[index], _end)
+            if item is _end:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (key(item), index, item))
+    finally:
+        for stream in streams:
+            stream.close()
@@ -2,5 +2,11 @@ from __future__ import unicode_literals
 
 configuration = {
     'api_version': '1',
-    'base_url': 'https://api.kloudless.com'
+    'base_url': 'https://api.kloudless.com',
+    # Query parameter to send the ``fields`` projection to the API with, if
+    # the API supports selecting fields.
+    'fields_query_param': None,
+    # Keep only the metadata of the responses of JSON resources, see
+    # ``Response.release_response``.
+    'lean_responses': False,
 }
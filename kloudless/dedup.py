@@ -0,0 +1,105 @@
+from __future__ import unicode_literals
+
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS content_hashes (
+    account TEXT,
+    path TEXT,
+    size INTEGER,
+    modified TEXT,
+    hash TEXT,
+    PRIMARY KEY (account, path)
+);
+"""
+
+#: Name of the :mod:`hashlib` algorithm used to hash contents.
+HASH_NAME = 'sha256'
+
+#: Account key of the files on the local disk.
+LOCAL_ACCOUNT = 'local'
+
+
+class ContentHashIndex(object):
+    """
+    Local SQLite index of content hashes, keyed by account and path and
+    valid while the size and modified time of the file stay the same.
+
+    :func:`kloudless.transfer.transfer_files` and
+    :func:`kloudless.transfer.upload_file` look up the index to skip files
+    whose content was uploaded to the same destination already, and record
+    the hashes computed while streaming. Changes made to the destination
+    files by others are not detected.
+
+    The index could be shared between threads.
+    """
+    def __init__(self, database=':memory:'):
+        """
+        :param str database: Path of the SQLite database file. The index is
+            kept in memory by default.
+        """
+        self.connection = sqlite3.connect(database, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._account_keys = {}
+
+    def close(self):
+        self.connection.close()
+
+    def get_account_key(self, account):
+        """
+        Returns the ID identifying ``account`` in the index. The ID is
+        retrieved once if the account was created without ``account_id``.
+
+        :param account: :class:`kloudless.account.Account`
+        """
+        if account.account_id != 'me':
+            return str(account.account_id)
+        key = (account.url, getattr(account, 'token', None))
+        account_key = self._account_keys.get(key)
+        if account_key is None:
+            account_key = str(account.get('').data['id'])
+            self._account_keys[key] = account_key
+        return account_key
+
+    def get(self, account, path, size=None, modified=None):
+        """
+        :param str account: Account key, see :func:`get_account_key`
+        :param str path: Path or ID of the file
+        :param int size: Current size of the file, if known
+        :param str modified: Current modified time of the file, if known
+
+        :return: The recorded hash, or ``None`` if not recorded or the size or
+            modified time changed since then
+        """
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT size, modified, hash FROM content_hashes '
+                'WHERE account = ? AND path = ?',
+                (account, path)).fetchone()
+        if row is None:
+            return None
+        if ((size is not None and row[0] != size)
+                or (modified is not None and row[1] != modified)):
+            return None
+        return row[2]
+
+    def record(self, account, path, size, modified, content_hash):
+        """
+        Record the hash of the content of a file. See :func:`get` for the
+        parameters.
+        """
+        with self._lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO content_hashes '
+                '(account, path, size, modified, hash) VALUES (?, ?, ?, ?, ?)',
+                (account, path, size, modified, content_hash))
+
+    def is_uploaded(self, content_hash, account, path):
+        """
+        Whether a content with ``content_hash`` was recorded at ``path`` of
+        ``account``.
+        """
+        return (content_hash is not None
+                and self.get(account, path) == content_hash)
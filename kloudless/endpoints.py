@@ -0,0 +1,134 @@
+from __future__ import unicode_literals
+
+
+class Endpoint(object):
+    """
+    An API endpoint whose url is built once. Requests sent through it skip
+    the url composition and pattern matching of
+    :class:`kloudless.client.Client`.
+
+    Instances are usually created through the helpers of
+    :class:`kloudless.account.Account`, e.g.
+    ``account.files(file_id).contents.get()``.
+
+    **Instance attributes**
+
+    :ivar client: :class:`kloudless.client.Client` or
+        :class:`kloudless.account.Account`
+    :ivar str url: Request url
+    """
+    #: Whether GET responses are streamed by default
+    stream = False
+
+    def __init__(self, client, url):
+        self.client = client
+        self.url = url
+
+    def __repr__(self):
+        return '<{}: {}>'.format(type(self).__name__, self.url)
+
+    def child(self, path, endpoint_class=None):
+        """
+        :param str path: Path relative to ``self.url``, without leading slash
+        :param endpoint_class: :class:`Endpoint` or its subclass to create
+        :return: :class:`Endpoint` instance for ``self.url/path``
+        """
+        return (endpoint_class or Endpoint)(
+            self.client, '{}/{}'.format(self.url, path))
+
+    def request(self, method, **kwargs):
+        """
+        Send a request to ``self.url``.
+
+        :param kwargs: kwargs passed to
+            :func:`kloudless.client.Client.request`, except ``api_version``
+            which should be given while creating the endpoint
+        """
+        return self.client._request_url(method, self.url, **kwargs)
+
+    def prepare(self, method='GET', **kwargs):
+        """
+        Prepare a request to ``self.url`` to send it repeatedly.
+
+        :param kwargs: kwargs passed to :func:`kloudless.client.Client.prepare`
+        :return: :class:`kloudless.client.RequestTemplate`
+        """
+        if method.upper() == 'GET' and self.stream:
+            kwargs.setdefault('stream', True)
+        return self.client.prepare(method, self.url, **kwargs)
+
+    def get(self, **kwargs):
+        if self.stream:
+            kwargs.setdefault('stream', True)
+        return self.request('GET', **kwargs)
+
+    def post(self, data=None, json=None, **kwargs):
+        return self.request('POST', data=data, json=json, **kwargs)
+
+    def put(self, data=None, **kwargs):
+        return self.request('PUT', data=data, **kwargs)
+
+    def patch(self, data=None, **kwargs):
+        return self.request('PATCH', data=data, **kwargs)
+
+    def delete(self, **kwargs):
+        return self.request('DELETE', **kwargs)
+
+
+class ContentsEndpoint(Endpoint):
+    """
+    File contents or thumbnails, which are streamed by default.
+    """
+    stream = True
+
+
+class StorageObjectEndpoint(Endpoint):
+    """
+    Base endpoint of ``storage/files/{id}`` and ``storage/folders/{id}``.
+    """
+    @property
+    def copy(self):
+        return self.child('copy')
+
+    @property
+    def permissions(self):
+        return self.child('permissions')
+
+    @property
+    def properties(self):
+        return self.child('properties')
+
+
+class FileEndpoint(StorageObjectEndpoint):
+    """
+    ``storage/files/{id}``
+    """
+    @property
+    def contents(self):
+        return self.child('contents', ContentsEndpoint)
+
+    @property
+    def thumbnail(self):
+        return self.child('thumbnail', ContentsEndpoint)
+
+
+class FolderEndpoint(StorageObjectEndpoint):
+    """
+    ``storage/folders/{id}``
+    """
+    @property
+    def contents(self):
+        return self.child('contents')
+
+
+class CalendarEndpoint(Endpoint):
+    """
+    ``cal/calendars/{id}``
+    """
+    def events(self, event_id=None):
+        """
+        :return: :class:`Endpoint` of ``events`` or ``events/{event_id}``
+        """
+        if event_id is None:
+            return self.child('events')
+        return self.child('events/{}'.format(event_id))
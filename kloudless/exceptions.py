@@ -1,5 +1,16 @@
 from __future__ import unicode_literals
 
+import six
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+#: The maximum quantity of bytes of an error response body read into
+#: :class:`APIException` and logged.
+MAX_ERROR_BODY_SIZE = 4096
+
 
 class KloudlessException(Exception):
     """
@@ -44,15 +55,31 @@ class NoNextPage(KloudlessException):
         self.cursor = cursor  # cursor for next time event retrieving
 
 
+class NoRecordedResponse(KloudlessException):
+    """
+    :class:`kloudless.transport.ReplayTransport` has no recorded response for
+    the request.
+    """
+    default_message = "No recorded response for the request."
+
+
+@six.python_2_unicode_compatible
 class APIException(KloudlessException):
     """
     Base Exception class for API requests.
 
+    At most :data:`MAX_ERROR_BODY_SIZE` bytes of the response body are read,
+    so a large or streamed error body is not read entirely, and they are
+    only decoded when the message or ``error_data`` is accessed.
+
     **Instance attributes**
 
     :ivar response: :class:`requests.Response` instance if available
     :ivar int status: ``response.status_code``
-    :ivar dict error_data: ``response.json()``
+    :ivar dict error_data: The response body decoded as JSON, or an empty
+        dict if it isn't JSON or is truncated
+    :ivar str body_text: The response body decoded as text, truncated to
+        :data:`MAX_ERROR_BODY_SIZE` bytes
     """
     default_message = "Request failed."
 
@@ -60,20 +87,79 @@ class APIException(KloudlessException):
 
         self.response = response
         self.status = response.status_code
-        self.error_data = {}
-
-        message = message or self.default_message
-        message += ' Error data: ' + response.text
+        self._message = message or self.default_message
+        self._body, self._truncated = self._read_body(response)
+        self._body_text = None
+        self._error_data = None
+
+        super(APIException, self).__init__(self._message)
+
+    @staticmethod
+    def _read_body(response):
+        """
+        Returns ``(body, truncated)`` where ``body`` is at most
+        :data:`MAX_ERROR_BODY_SIZE` bytes of the response body.
+        """
+        content = getattr(response, '_content', None)
+        if content is not False:
+            content = response.content or b''
+            return (content[:MAX_ERROR_BODY_SIZE],
+                    len(content) > MAX_ERROR_BODY_SIZE)
+
+        # The body of a streamed response is not read yet
+        chunks = []
+        size = 0
         try:
-            self.error_data = response.json()
-        except ValueError:
-            pass
-        else:
-            if 'id' in self.error_data:
-                message += '[Request ID: {}] {}'.format(
-                    self.error_data['id'], message)
-
-        super(APIException, self).__init__(message)
+            for chunk in response.iter_content(MAX_ERROR_BODY_SIZE):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > MAX_ERROR_BODY_SIZE:
+                    break
+        except Exception:
+            pass  # the details are not worth failing for
+        finally:
+            response.close()
+        content = b''.join(chunks)
+        return (content[:MAX_ERROR_BODY_SIZE],
+                len(content) > MAX_ERROR_BODY_SIZE)
+
+    @property
+    def body_text(self):
+        if self._body_text is None:
+            encoding = getattr(self.response, 'encoding', None) or 'utf-8'
+            try:
+                text = self._body.decode(encoding, 'replace')
+            except LookupError:
+                text = self._body.decode('utf-8', 'replace')
+            if self._truncated:
+                text += '...'
+            self._body_text = text
+        return self._body_text
+
+    @property
+    def error_data(self):
+        if self._error_data is None:
+            self._error_data = {}
+            if self._body and not self._truncated:
+                try:
+                    data = json.loads(self.body_text)
+                except ValueError:
+                    pass
+                else:
+                    if isinstance(data, dict):
+                        self._error_data = data
+        return self._error_data
+
+    @error_data.setter
+    def error_data(self, value):
+        self._error_data = value
+
+    def __str__(self):
+        message = '{} Error data: {}'.format(self._message, self.body_text)
+        if 'id' in self.error_data:
+            message = '[Request ID: {}] {}'.format(
+                self.error_data['id'], message)
+        return message
 
 
 class AuthorizationException(APIException):
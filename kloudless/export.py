@@ -0,0 +1,271 @@
+from __future__ import unicode_literals
+
+import collections
+import io
+
+import six
+
+from . import exceptions
+from .util import to_datetime
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+Column = collections.namedtuple('Column', ['name', 'type', 'path'])
+Column.__doc__ = """
+A column of the exported table.
+
+:ivar str name: Column name
+:ivar str type: ``string``, ``int64``, ``bool`` or ``timestamp``
+:ivar tuple path: Keys to look up the value in the object data, e.g.
+    ``('parent', 'id')``
+"""
+
+#: Columns exported from files and folders.
+STORAGE_OBJECT_COLUMNS = (
+    Column('id', 'string', ('id',)),
+    Column('name', 'string', ('name',)),
+    Column('type', 'string', ('type',)),
+    Column('size', 'int64', ('size',)),
+    Column('created', 'timestamp', ('created',)),
+    Column('modified', 'timestamp', ('modified',)),
+    Column('mime_type', 'string', ('mime_type',)),
+    Column('path', 'string', ('path',)),
+    Column('parent_id', 'string', ('parent', 'id')),
+    Column('account', 'string', ('account',)),
+    Column('owner_id', 'string', ('owner', 'id')),
+    Column('downloadable', 'bool', ('downloadable',)),
+    Column('raw_id', 'string', ('raw_id',)),
+)
+
+#: Columns exported from events.
+EVENT_COLUMNS = (
+    Column('id', 'string', ('id',)),
+    Column('account', 'string', ('account',)),
+    Column('action', 'string', ('action',)),
+    Column('type', 'string', ('type',)),
+    Column('modified', 'timestamp', ('modified',)),
+    Column('user_id', 'string', ('user_id',)),
+    Column('ip', 'string', ('ip',)),
+    Column('metadata_id', 'string', ('metadata', 'id')),
+    Column('metadata_name', 'string', ('metadata', 'name')),
+    Column('metadata_type', 'string', ('metadata', 'type')),
+    Column('metadata_path', 'string', ('metadata', 'path')),
+    Column('metadata_parent_id', 'string', ('metadata', 'parent', 'id')),
+    Column('metadata_size', 'int64', ('metadata', 'size')),
+    Column('metadata_modified', 'timestamp', ('metadata', 'modified')),
+)
+
+#: Rows per Arrow record batch.
+DEFAULT_BATCH_SIZE = 10000
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise exceptions.InvalidParameter(
+            "pyarrow must be installed to export Arrow or Parquet.")
+    return pyarrow
+
+
+def get_default_columns(resource_list):
+    """
+    :return: :data:`EVENT_COLUMNS` if ``resource_list`` contains events,
+        otherwise :data:`STORAGE_OBJECT_COLUMNS`
+    """
+    if resource_list.is_retrieving_events:
+        return EVENT_COLUMNS
+    return STORAGE_OBJECT_COLUMNS
+
+
+def iter_objects(resource_list, max_resources=None, adaptive_page_size=None):
+    """
+    Generator to iterate thorough the object data of ``resource_list`` and
+    the following pages as dicts, see
+    :meth:`kloudless.resources.base.ResourceList.get_paging_iterator` for
+    the parameters.
+    """
+    counter = 0
+    for page in resource_list.get_page_iterator(adaptive_page_size):
+        for data in page.data.get('objects', []):
+            yield data
+            counter += 1
+            if max_resources is not None and counter == max_resources:
+                return
+
+
+def _get_value(data, path):
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _convert(value, column_type):
+    if value is None:
+        return None
+    if column_type == 'string':
+        return six.text_type(value)
+    if column_type == 'int64':
+        return int(value)
+    if column_type == 'bool':
+        return bool(value)
+    return value  # timestamps are converted by pyarrow per batch
+
+
+def export_ndjson(resource_list, fp, max_resources=None,
+                  adaptive_page_size=None):
+    """
+    Write each object of ``resource_list`` and the following pages as a
+    line of JSON, unchanged from the API response.
+
+    :param resource_list: :class:`kloudless.resources.base.ResourceList`
+    :param fp: Path of the output file, or a file object opened in text mode
+    :param max_resources: The maximum quantity of objects to write
+    :param adaptive_page_size: See
+        :meth:`kloudless.resources.base.ResourceList.get_paging_iterator`
+
+    :return: int, the quantity of objects written
+    """
+    owns_file = isinstance(fp, six.string_types)
+    if owns_file:
+        fp = io.open(fp, 'w', encoding='utf8')
+
+    count = 0
+    try:
+        for data in iter_objects(resource_list, max_resources,
+                                 adaptive_page_size):
+            fp.write(six.text_type(json.dumps(data)) + '\n')
+            count += 1
+    finally:
+        if owns_file:
+            fp.close()
+    return count
+
+
+def get_arrow_schema(columns):
+    """
+    :param columns: Sequence of :class:`Column`
+    :return: :class:`pyarrow.Schema`
+    """
+    pa = _import_pyarrow()
+    types = {
+        'string': pa.string(),
+        'int64': pa.int64(),
+        'bool': pa.bool_(),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+    }
+    return pa.schema([pa.field(column.name, types[column.type])
+                      for column in columns])
+
+
+def _to_timestamp_array(pa, values, arrow_type):
+    try:
+        return pa.array(values, pa.string()).cast(arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        # Older pyarrow could not parse ISO 8601 strings with offsets.
+        return pa.array([to_datetime(value) if value else None
+                         for value in values], arrow_type)
+
+
+def _build_record_batch(pa, schema, columns, values):
+    arrays = []
+    for column, field, column_values in zip(columns, schema, values):
+        if column.type == 'timestamp':
+            arrays.append(
+                _to_timestamp_array(pa, column_values, field.type))
+        else:
+            arrays.append(pa.array(column_values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_record_batches(resource_list, columns=None,
+                        batch_size=DEFAULT_BATCH_SIZE, max_resources=None,
+                        adaptive_page_size=None):
+    """
+    Generator to convert the objects of ``resource_list`` and the following
+    pages into :class:`pyarrow.RecordBatch` of at most ``batch_size`` rows.
+    Only one batch is kept in memory. Requires ``pyarrow`` to be installed.
+
+    :param resource_list: :class:`kloudless.resources.base.ResourceList`
+    :param columns: Sequence of :class:`Column`. Defaults to
+        :func:`get_default_columns`.
+    :param int batch_size: The maximum quantity of rows per batch
+    :param max_resources: The maximum quantity of objects to convert
+    :param adaptive_page_size: See
+        :meth:`kloudless.resources.base.ResourceList.get_paging_iterator`
+    """
+    pa = _import_pyarrow()
+    columns = tuple(columns or get_default_columns(resource_list))
+    schema = get_arrow_schema(columns)
+
+    values = [[] for _ in columns]
+    for data in iter_objects(resource_list, max_resources,
+                             adaptive_page_size):
+        for column, column_values in zip(columns, values):
+            column_values.append(
+                _convert(_get_value(data, column.path), column.type))
+        if len(values[0]) >= batch_size:
+            yield _build_record_batch(pa, schema, columns, values)
+            values = [[] for _ in columns]
+
+    if values[0]:
+        yield _build_record_batch(pa, schema, columns, values)
+
+
+def export_arrow(resource_list, sink, columns=None,
+                 batch_size=DEFAULT_BATCH_SIZE, max_resources=None,
+                 adaptive_page_size=None):
+    """
+    Write the objects of ``resource_list`` and the following pages in the
+    Arrow IPC stream format. See :func:`iter_record_batches` for the
+    parameters.
+
+    :param sink: Path of the output file, or a writable file object
+    :return: int, the quantity of objects written
+    """
+    pa = _import_pyarrow()
+    columns = tuple(columns or get_default_columns(resource_list))
+    count = 0
+    with pa.ipc.new_stream(sink, get_arrow_schema(columns)) as writer:
+        for batch in iter_record_batches(
+                resource_list, columns, batch_size, max_resources,
+                adaptive_page_size):
+            writer.write_batch(batch)
+            count += batch.num_rows
+    return count
+
+
+def export_parquet(resource_list, where, columns=None,
+                   batch_size=DEFAULT_BATCH_SIZE, max_resources=None,
+                   adaptive_page_size=None, **writer_kwargs):
+    """
+    Write the objects of ``resource_list`` and the following pages into a
+    Parquet file, one row group per batch. See :func:`iter_record_batches`
+    for the parameters.
+
+    :param where: Path of the output file, or a writable file object
+    :param writer_kwargs: kwargs passed to
+        :class:`pyarrow.parquet.ParquetWriter`, e.g. ``compression``
+    :return: int, the quantity of objects written
+    """
+    pa = _import_pyarrow()
+    import pyarrow.parquet as pq
+
+    columns = tuple(columns or get_default_columns(resource_list))
+    count = 0
+    writer = pq.ParquetWriter(where, get_arrow_schema(columns),
+                              **writer_kwargs)
+    try:
+        for batch in iter_record_batches(
+                resource_list, columns, batch_size, max_resources,
+                adaptive_page_size):
+            writer.write_table(pa.Table.from_batches([batch]))
+            count += batch.num_rows
+    finally:
+        writer.close()
+    return count
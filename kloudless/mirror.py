@@ -0,0 +1,324 @@
+from __future__ import unicode_literals
+
+import sqlite3
+
+from dateutil import tz
+
+from . import exceptions
+from .util import logger, to_datetime
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    id TEXT PRIMARY KEY,
+    parent_id TEXT,
+    name TEXT,
+    type TEXT,
+    path TEXT,
+    size INTEGER,
+    mime_type TEXT,
+    created TEXT,
+    modified TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS resources_parent_id ON resources (parent_id);
+CREATE INDEX IF NOT EXISTS resources_path ON resources (path);
+CREATE INDEX IF NOT EXISTS resources_modified ON resources (modified);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+COLUMNS = ('id', 'parent_id', 'name', 'type', 'path', 'size', 'mime_type',
+           'created', 'modified', 'data')
+
+DESCENDANTS_QUERY = """
+WITH RECURSIVE tree(id) AS (
+    SELECT id FROM resources WHERE parent_id = ?
+    UNION ALL
+    SELECT resources.id FROM resources JOIN tree
+        ON resources.parent_id = tree.id
+)
+"""
+
+
+def _normalize_timestamp(timestamp):
+    """
+    Converts an ISO 8601 timestamp to UTC in ``YYYY-MM-DDTHH:MM:SSZ`` form so
+    that timestamps could be compared as strings.
+    """
+    if not timestamp:
+        return None
+    value = to_datetime(timestamp)
+    if value.tzinfo is not None:
+        value = value.astimezone(tz.tzutc()).replace(tzinfo=None)
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class MirrorIndex(object):
+    """
+    Local SQLite index of the storage metadata of an account.
+
+    :func:`build` fills the index through
+    :func:`kloudless.account.Account.walk`, and :func:`sync` keeps it current
+    by applying the events retrieved from the Events API since the last build
+    or sync. Activity monitoring must be enabled for the application to use
+    :func:`sync`.
+
+    The index should be used from one thread at a time.
+    """
+    def __init__(self, account, database=':memory:'):
+        """
+        :param account: :class:`kloudless.account.Account` instance
+        :param str database: Path of the SQLite database file. The index is
+            kept in memory by default.
+        """
+        self.account = account
+        self.connection = sqlite3.connect(database)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+        self._alias_cache = None
+
+    def close(self):
+        self.connection.close()
+
+    def _get_state(self, key, default=None):
+        row = self.connection.execute(
+            'SELECT value FROM state WHERE key = ?', (key,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def _set_state(self, key, value):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)',
+            (key, json.dumps(value)))
+
+    @property
+    def cursor(self):
+        """
+        The events cursor the next :func:`sync` starts from.
+        """
+        return self._get_state('cursor')
+
+    @property
+    def _aliases(self):
+        if self._alias_cache is None:
+            self._alias_cache = self._get_state('aliases', {})
+        return self._alias_cache
+
+    @property
+    def root_id(self):
+        """
+        ID of the folder the index was built from.
+        """
+        return self._get_state('root_id')
+
+    @staticmethod
+    def _to_row(data, parent_id, path):
+        data = dict(data)
+        data.pop('raw', None)
+        return (
+            str(data['id']), parent_id, data.get('name'), data.get('type'),
+            path, data.get('size'), data.get('mime_type'),
+            _normalize_timestamp(data.get('created')),
+            _normalize_timestamp(data.get('modified')),
+            json.dumps(data),
+        )
+
+    def _upsert(self, rows):
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO resources ({}) VALUES ({})'.format(
+                ', '.join(COLUMNS), ', '.join('?' * len(COLUMNS))),
+            rows)
+
+    def build(self, folder_id='root', batch_size=1000, **kwargs):
+        """
+        Rebuild the index from the folder tree under ``folder_id``.
+
+        The events cursor is retrieved before the traversal so that changes
+        happened during the traversal are applied by the next :func:`sync`.
+
+        :param str folder_id: ID of the folder to index
+        :param int batch_size: Quantity of resources inserted per statement
+        :param kwargs: kwargs passed to :func:`kloudless.account.Account.walk`
+
+        :return: (int) quantity of resources indexed
+        """
+        cursor = self.account.get('events/latest').data['cursor']
+
+        folder_id = str(folder_id)
+        aliases = {}
+        rows = []
+        count = 0
+        with self.connection:
+            self.connection.execute('DELETE FROM resources')
+            walker = self.account.walk(folder_id, **kwargs)
+            for path, resource in walker:
+                # The folder being listed, since names could contain '/' and
+                # siblings could have the same name.
+                parent_id = walker.current_folder_id
+                parent = resource.data.get('parent') or {}
+                if (parent_id == folder_id and parent.get('id')
+                        and str(parent['id']) != folder_id):
+                    # e.g. the ID of the alias "root"
+                    aliases[str(parent['id'])] = folder_id
+
+                rows.append(self._to_row(resource.data, parent_id, path))
+                count += 1
+                if len(rows) >= batch_size:
+                    self._upsert(rows)
+                    rows = []
+            self._upsert(rows)
+
+            self._set_state('root_id', folder_id)
+            self._set_state('aliases', aliases)
+            self._alias_cache = aliases
+            self._set_state('cursor', cursor)
+        return count
+
+    def sync(self, **params):
+        """
+        Apply the events since the last :func:`build` or :func:`sync`.
+
+        :param params: Additional query parameters for the Events API, e.g.
+            ``page_size``
+
+        :return: (int) quantity of events applied
+        """
+        cursor = self.cursor
+        if cursor is None:
+            raise exceptions.InvalidParameter(
+                "The index must be built before synchronizing it.")
+
+        params['cursor'] = cursor
+        events = self.account.get('events', params=params)
+        count = 0
+        with self.connection:
+            for event in events.get_paging_iterator():
+                self.apply_event(event.data)
+                count += 1
+            if events.latest_cursor is not None:
+                self._set_state('cursor', events.latest_cursor)
+        return count
+
+    def _get_path(self, resource_id):
+        if resource_id == self.root_id:
+            return ''
+        row = self.connection.execute(
+            'SELECT path FROM resources WHERE id = ?',
+            (resource_id,)).fetchone()
+        return row['path'] if row else None
+
+    def _delete(self, resource_id):
+        self.connection.execute(
+            DESCENDANTS_QUERY +
+            'DELETE FROM resources WHERE id IN (SELECT id FROM tree)',
+            (resource_id,))
+        self.connection.execute(
+            'DELETE FROM resources WHERE id = ?', (resource_id,))
+
+    def apply_event(self, event):
+        """
+        Apply an event to the index.
+
+        :param dict event: ``data`` of an event resource
+        """
+        metadata = event.get('metadata') or {}
+        previous = event.get('previous_metadata') or {}
+        resource_id = metadata.get('id') or previous.get('id')
+        if (not resource_id or
+                metadata.get('api', 'storage') != 'storage' or
+                metadata.get('type', 'file') not in ('file', 'folder')):
+            return
+        resource_id = str(resource_id)
+
+        if event.get('type') == 'delete' or metadata.get('deleted'):
+            self._delete(resource_id)
+            return
+
+        parent_id = (metadata.get('parent') or {}).get('id')
+        if parent_id is not None:
+            parent_id = str(parent_id)
+        parent_id = self._aliases.get(parent_id, parent_id)
+        parent_path = self._get_path(parent_id) if parent_id else None
+        if parent_path is None:
+            # Moved out of, or created outside of the indexed tree
+            logger.debug("Drop {} from index, parent {} is not indexed".format(
+                resource_id, parent_id))
+            self._delete(resource_id)
+            return
+
+        path = '{}/{}'.format(parent_path, metadata.get('name', ''))
+        old_path = self._get_path(resource_id)
+        self._upsert([self._to_row(metadata, parent_id, path)])
+
+        if old_path is not None and old_path != path:
+            # Renamed or moved folder
+            self.connection.execute(
+                'UPDATE resources SET path = ? || substr(path, ?) '
+                'WHERE substr(path, 1, ?) = ?',
+                (path, len(old_path) + 1, len(old_path) + 1, old_path + '/'))
+
+    def get(self, resource_id):
+        """
+        :return: (dict) The metadata of the resource, or ``None`` if it's not
+            indexed
+        """
+        row = self.connection.execute(
+            'SELECT data FROM resources WHERE id = ?',
+            (str(resource_id),)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def get_by_path(self, path):
+        """
+        :return: (dict) The metadata of the resource at ``path`` relative to
+            the indexed folder, or ``None`` if it's not indexed
+        """
+        row = self.connection.execute(
+            'SELECT data FROM resources WHERE path = ?', (path,)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def modified_since(self, timestamp, type=None):
+        """
+        Get the resources modified at or after ``timestamp``.
+
+        :param timestamp: :class:`datetime.datetime` or ISO 8601 timestamp.
+            Timestamps without timezone are considered as UTC.
+        :param str type: ``file`` or ``folder`` to filter by type
+
+        :return: list of metadata dict ordered by modification time
+        """
+        query = 'SELECT data FROM resources WHERE modified >= ?'
+        args = [_normalize_timestamp(timestamp)]
+        if type:
+            query += ' AND type = ?'
+            args.append(type)
+        rows = self.connection.execute(query + ' ORDER BY modified', args)
+        return [json.loads(row['data']) for row in rows]
+
+    def total_size(self, folder_id=None):
+        """
+        Get the total size in bytes of the files under ``folder_id``,
+        recursively.
+
+        :param str folder_id: The indexed folder by default
+        """
+        folder_id = str(folder_id or self.root_id)
+        row = self.connection.execute(
+            DESCENDANTS_QUERY +
+            'SELECT COALESCE(SUM(size), 0) AS total FROM resources '
+            'WHERE type = ? AND id IN (SELECT id FROM tree)',
+            (folder_id, 'file')).fetchone()
+        return row['total']
+
+    def query(self, sql, parameters=()):
+        """
+        Run a SQL query against the ``resources`` table.
+
+        :return: list of :class:`sqlite3.Row`
+        """
+        return self.connection.execute(sql, parameters).fetchall()
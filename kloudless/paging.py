@@ -0,0 +1,122 @@
+from __future__ import unicode_literals
+
+import threading
+
+from requests.exceptions import ConnectionError, Timeout
+
+from . import exceptions
+from .util import logger
+
+#: Default lower and upper bounds of ``page_size`` accepted by the API.
+MIN_PAGE_SIZE = 1
+MAX_PAGE_SIZE = 1000
+
+
+class AdaptivePageSize(object):
+    """
+    Tunes the ``page_size`` query parameter between pages of a listing.
+
+    The size grows while pages return quickly and within the payload budget,
+    and shrinks when a page is slow, too large, or fails with a timeout or a
+    server error. A failed page is retried with the reduced size.
+
+    Note that the page size is only changed for listings paginated through
+    ``next_page`` tokens or event cursors. Listings paginated through page
+    numbers, as integers or numeric strings, keep their initial
+    ``page_size``, since changing it would shift the page offsets.
+
+    **Instance attributes**
+
+    :ivar int page_size: The page size to request for the next page
+    """
+    #: Exceptions considered as transient failures of a single page.
+    retry_exceptions = (exceptions.ServerException, ConnectionError, Timeout)
+
+    def __init__(self, initial=100, min_size=10, max_size=MAX_PAGE_SIZE,
+                 target_latency=2.0, max_payload_bytes=4 * 1024 * 1024,
+                 growth_factor=2.0, max_retries=3):
+        """
+        :param int initial: Page size used when neither the listing nor
+            its first page tell the page size
+        :param int min_size: Lower bound of the page size
+        :param int max_size: Upper bound of the page size. Capped to
+            :data:`MAX_PAGE_SIZE`.
+        :param float target_latency: Seconds a page is expected to take at
+            most
+        :param int max_payload_bytes: Largest response body in bytes a page
+            is expected to have
+        :param float growth_factor: Multiplier applied while the page size is
+            growing
+        :param int max_retries: Times a failed page is retried with a
+            smaller page size before the error is raised
+        """
+        if not (MIN_PAGE_SIZE <= min_size <= max_size):
+            raise exceptions.InvalidParameter(
+                "min_size and max_size must satisfy {} <= min_size <= "
+                "max_size.".format(MIN_PAGE_SIZE))
+
+        self.min_size = min_size
+        self.max_size = min(max_size, MAX_PAGE_SIZE)
+        self.target_latency = target_latency
+        self.max_payload_bytes = max_payload_bytes
+        self.growth_factor = growth_factor
+        self.max_retries = max_retries
+        self.page_size = self._clamp(initial)
+        self._lock = threading.Lock()
+
+    def _clamp(self, page_size):
+        return int(max(self.min_size, min(self.max_size, page_size)))
+
+    def start(self, page_size):
+        """
+        Initialize ``self.page_size`` from the effective ``page_size`` of
+        the first page, if known, so it's the baseline to adapt from.
+        """
+        if page_size:
+            with self._lock:
+                self.page_size = self._clamp(int(page_size))
+
+    def record(self, latency, num_objects, payload_bytes=None):
+        """
+        Adjust ``self.page_size`` after a page was retrieved successfully.
+
+        :param float latency: Seconds spent to retrieve the page
+        :param int num_objects: Quantity of resources in the page
+        :param int payload_bytes: Size of the response body, if known
+        """
+        with self._lock:
+            factors = []
+            if latency > 0:
+                factors.append(self.target_latency / latency)
+            if payload_bytes and self.max_payload_bytes:
+                factors.append(float(self.max_payload_bytes) / payload_bytes)
+
+            ratio = min(factors) if factors else self.growth_factor
+            if num_objects < self.page_size and ratio >= 1:
+                # A short page says nothing about a larger one.
+                return self.page_size
+
+            ratio = min(ratio, self.growth_factor)
+            if 0.8 <= ratio < 1:
+                # Close enough to the target, keep it stable.
+                return self.page_size
+            self.page_size = self._clamp(self.page_size * ratio)
+            return self.page_size
+
+    def record_error(self, error):
+        """
+        Halve ``self.page_size`` after a page failed.
+
+        :param error: The raised exception
+        :return: ``True`` if the page should be retried
+        """
+        if not isinstance(error, self.retry_exceptions):
+            return False
+
+        with self._lock:
+            if self.page_size <= self.min_size:
+                return False
+            self.page_size = self._clamp(self.page_size // 2)
+            logger.debug("Page failed with {!r}, retry with page_size "
+                         "{}".format(error, self.page_size))
+            return True
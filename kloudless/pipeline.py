@@ -0,0 +1,171 @@
+from __future__ import unicode_literals
+
+import collections
+
+from . import exceptions
+from .concurrency import (DEFAULT_PREFETCH_SIZE, RateLimiter, bounded_map,
+                          call_with_retry, prefetch)
+
+PipelineResult = collections.namedtuple(
+    'PipelineResult', ['item', 'result', 'error'])
+PipelineResult.__doc__ = """
+Result of one item of a :class:`Pipeline`.
+
+:ivar item: The item from the source, e.g. a
+    :class:`kloudless.resources.base.Resource`
+:ivar result: Return value of the last ``map`` stage, or ``item`` if there is
+    no ``map`` stage
+:ivar error: The exception raised by the stage the item failed at, if any.
+    The item skips the following stages.
+"""
+
+
+class Pipeline(object):
+    """
+    Streams items through a chain of ``filter`` and ``map`` stages, e.g. to
+    retrieve the permissions of each file of a listing.
+
+    The source and each ``map`` stage run in their own thread and pass items
+    on through queues of at most ``buffer_size`` items, so the requests of
+    different stages, including retrieving the next page of a listing,
+    overlap instead of running one after another. Each ``map`` stage calls
+    its function in a pool of ``concurrency`` threads.
+
+    An error raised by a stage for an item is recorded in its
+    :class:`PipelineResult` and the other items continue. Errors raised by
+    the source stop the pipeline and are raised to the caller.
+
+    Stages are added by chaining, and the pipeline is run by iterating
+    through it or calling :func:`run`::
+
+        pipeline = folder_contents.pipeline().filter(
+            lambda resource: resource.data['type'] == 'file'
+        ).map(lambda resource: resource.get('permissions'), concurrency=8)
+
+        for item, permissions, error in pipeline:
+            ...
+    """
+    def __init__(self, source, buffer_size=DEFAULT_PREFETCH_SIZE):
+        """
+        :param source: Iterable of items, e.g.
+            :func:`kloudless.resources.base.ResourceList.get_paging_iterator`
+        :param int buffer_size: The maximum quantity of items queued between
+            two stages
+        """
+        self.source = source
+        self.buffer_size = buffer_size
+        self._stages = []
+
+    def filter(self, predicate):
+        """
+        Add a stage that drops the items for which ``predicate`` returns a
+        false value. It has no thread of its own, so ``predicate`` is called
+        in the thread pulling items from it: the thread of the next ``map``
+        stage, or the thread iterating through the pipeline if no ``map``
+        stage follows.
+
+        :param predicate: Function that accepts the result of the previous
+            stage
+        :return: ``self``
+        """
+        self._stages.append((self._filter, (predicate,), False))
+        return self
+
+    def map(self, func, concurrency=4, ordered=False, retries=0,
+            rate_limit=None):
+        """
+        Add a stage that replaces the result of each item by the return value
+        of ``func``.
+
+        :param func: Function that accepts the result of the previous stage,
+            e.g. a :class:`kloudless.resources.base.Resource`
+        :param int concurrency: The maximum quantity of items processed at
+            the same time
+        :param bool ordered: Set to ``True`` to keep the order of the items,
+            or they are passed on as soon as completed
+        :param int retries: Times to retry an item on rate limiting, server
+            and connection errors
+        :param rate_limit: The maximum quantity of calls per second, or a
+            :class:`kloudless.concurrency.RateLimiter` instance
+
+        :return: ``self``
+        """
+        if concurrency < 1:
+            raise exceptions.InvalidParameter(
+                "concurrency must be a positive integer.")
+        rate_limiter = rate_limit
+        if rate_limit and not isinstance(rate_limit, RateLimiter):
+            rate_limiter = RateLimiter(rate_limit)
+        self._stages.append((self._map, (func, concurrency, ordered, retries,
+                                         rate_limiter), True))
+        return self
+
+    @staticmethod
+    def _filter(results, predicate):
+        try:
+            for result in results:
+                if result.error is None:
+                    try:
+                        if not predicate(result.result):
+                            continue
+                    except Exception as e:
+                        result = result._replace(result=None, error=e)
+                yield result
+        finally:
+            results.close()  # stop the previous stages
+
+    @staticmethod
+    def _map(results, func, concurrency, ordered, retries, rate_limiter):
+        def apply(result):
+            if result.error is not None:
+                return result
+            try:
+                value = call_with_retry(
+                    lambda: func(result.result), retries=retries,
+                    rate_limiter=rate_limiter)
+            except Exception as e:
+                return result._replace(result=None, error=e)
+            return result._replace(result=value)
+
+        mapped = bounded_map(apply, results, concurrency=concurrency,
+                             ordered=ordered)
+        try:
+            for _, result, _ in mapped:
+                yield result
+        finally:
+            mapped.close()
+            results.close()  # stop the previous stages
+
+    def __iter__(self):
+        """
+        Run the pipeline.
+
+        :return: generator that yields :class:`PipelineResult`
+        """
+        results = prefetch(
+            (PipelineResult(item, item, None) for item in self.source),
+            self.buffer_size)
+        for stage, args, threaded in self._stages:
+            results = stage(results, *args)
+            if threaded:
+                results = prefetch(results, self.buffer_size)
+        return iter(results)
+
+    def run(self, sink=None):
+        """
+        Run the pipeline and pass each :class:`PipelineResult` to ``sink``
+        in the calling thread.
+
+        :param sink: Function that accepts a :class:`PipelineResult`
+
+        :return: tuple of the quantity of succeeded and failed items
+        """
+        succeeded = failed = 0
+        for result in self:
+            if sink is not None:
+                sink(result)
+            if result.error is None:
+                succeeded += 1
+            else:
+                failed += 1
+        return succeeded, failed
@@ -13,3 +13,39 @@ download_file_patterns = re.compile(r'storage/files/.+?/contents'
                                     r'|meta/licenses/.+?/contents')
 
 primary_calendar_alias = re.compile('cal/calendars/primary/?$')
+
+
+def is_download_path(path):
+    """
+    Whether ``path`` matches :data:`download_file_patterns`. The substring
+    check avoids running the pattern for most paths.
+    """
+    return (('/contents' in path or '/thumbnail' in path)
+            and download_file_patterns.search(path) is not None)
+
+
+_account_urls = {}
+
+
+def get_account_url(url):
+    """
+    Returns the part of ``url`` that matches :data:`full_account_pattern`.
+    The results are cached since resources in a list share the same url.
+    """
+    try:
+        return _account_urls[url]
+    except KeyError:
+        pass
+    account_url = full_account_pattern.match(url).group(0)
+    if len(_account_urls) >= 1024:
+        _account_urls.clear()
+    _account_urls[url] = account_url
+    return account_url
+
+
+def is_primary_calendar_alias(url):
+    """
+    Equivalent to ``primary_calendar_alias.search(url)``.
+    """
+    return url.rstrip('/').endswith('cal/calendars/primary') and (
+        primary_calendar_alias.search(url) is not None)
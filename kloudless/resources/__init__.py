@@ -1 +1,2 @@
-from .base import ResourceList, Resource, Response, ResponseJson
+from .base import (ResourceList, Resource, Response, ResponseInfo,
+                   ResponseJson)
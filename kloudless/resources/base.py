@@ -1,11 +1,16 @@
 from __future__ import unicode_literals
 
+import requests
+import six
 from six.moves.urllib.parse import parse_qs, urlparse, urlunparse
 
 from .. import exceptions
-from ..re_patterns import (events_pattern, full_account_pattern,
-                           primary_calendar_alias)
-from ..util import url_join
+from ..paging import AdaptivePageSize
+from ..pipeline import Pipeline
+from ..re_patterns import (events_pattern, get_account_url,
+                           is_primary_calendar_alias)
+from ..streaming import BodyReader, copy_to
+from ..util import monotonic, url_join
 
 
 class Empty(object):
@@ -18,9 +23,100 @@ class Empty(object):
 
     __nonzero__ = __bool__
 
+    def __reduce__(self):
+        # Unpickle as the module level instance to keep `is empty` working
+        return 'empty'
+
 
 empty = Empty()  # create instance to make __bool__ take effect
 
+#: Keys of resource data kept regardless of the ``fields`` projection, since
+#: they are needed to construct the resource url.
+REQUIRED_FIELDS = ('id', 'href', 'api', 'type')
+
+
+def get_projection(fields):
+    """
+    :param fields: Iterable of the keys to keep in resource data, or
+        ``None`` to keep all keys
+    :return: tuple of ``fields`` plus :data:`REQUIRED_FIELDS`, or ``None``
+    """
+    if fields is None:
+        return None
+    fields = [field for field in fields if field not in REQUIRED_FIELDS]
+    return tuple(fields) + REQUIRED_FIELDS
+
+
+def project(data, fields):
+    """
+    Returns a new dict with only the ``fields`` keys of ``data``, or
+    ``data`` itself if ``fields`` is ``None``.
+
+    :param fields: Result of :func:`get_projection`
+    """
+    if fields is None:
+        return data
+    return {key: data[key] for key in fields if key in data}
+
+
+class RequestInfo(object):
+    """
+    The method, url and headers of a request, kept while pickling in place
+    of :class:`requests.PreparedRequest`. The ``Authorization`` header is
+    dropped since the client provides it.
+    """
+    def __init__(self, method, url, headers):
+        self.method = method
+        self.url = url
+        self.headers = headers
+
+    @classmethod
+    def from_request(cls, request):
+        headers = {k: v for k, v in request.headers.items()
+                   if k.lower() != 'authorization'}
+        return cls(request.method, request.url, headers)
+
+
+class ResponseInfo(object):
+    """
+    The metadata of a :class:`requests.Response` kept in place of it by
+    :func:`Response.release_response`, without the body and the connection.
+
+    **Instance attributes**
+
+    :ivar int status_code: HTTP status code
+    :ivar str reason: HTTP reason phrase
+    :ivar headers: Response headers
+    :ivar str url: Request url
+    :ivar elapsed: :class:`datetime.timedelta` between sending the request
+        and receiving the response headers
+    :ivar request: :class:`RequestInfo` of the request
+    """
+    def __init__(self, status_code, reason, headers, url, elapsed, request):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.url = url
+        self.elapsed = elapsed
+        self.request = request
+
+    @classmethod
+    def from_response(cls, response):
+        request = response.request
+        if isinstance(request, requests.PreparedRequest):
+            request = RequestInfo.from_request(request)
+        return cls(response.status_code, response.reason, response.headers,
+                   response.url, response.elapsed, request)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def __bool__(self):
+        return self.ok
+
+    __nonzero__ = __bool__
+
 
 class Response(object):
     """
@@ -40,19 +136,107 @@ class Response(object):
     """
     def __init__(self, client, url, response=None):
 
-        parse_result = urlparse(url)
-        # clean up the url to make url_join work
-        self.url = urlunparse(parse_result._replace(query=''))
-        self.query_params = parse_qs(parse_result.query)
+        if '?' in url or '#' in url:
+            parse_result = urlparse(url)
+            # clean up the url to make url_join work
+            self.url = urlunparse(parse_result._replace(query=''))
+            self.query_params = parse_qs(parse_result.query)
+        else:
+            self.url = url
+            self.query_params = {}
 
         self.client = client
         self.response = response
+        self._request_info = None
 
     def __getattr__(self, name):
-        if self.response:
-            return getattr(self.response, name)
+        # Look up self.__dict__ directly to avoid recursion while unpickling
+        response = self.__dict__.get('response')
+        if response:
+            return getattr(response, name)
         raise AttributeError(name)
 
+    def __getstate__(self):
+        """
+        Pickle without ``self.response``. The method, url and headers of the
+        request are kept for pagination and :func:`refresh`.
+        """
+        state = self.__dict__.copy()
+        state['response'] = None
+        state.pop('_body_reader', None)
+        state['_request_info'] = self.request_info
+        if isinstance(state['_request_info'], requests.PreparedRequest):
+            state['_request_info'] = RequestInfo.from_request(
+                state['_request_info'])
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    @property
+    def request_info(self):
+        """
+        The request of the response, which has ``method``, ``url`` and
+        ``headers`` attributes, or ``None`` if not available.
+        """
+        response = self.__dict__.get('response')
+        if response is not None:
+            return response.request
+        return self.__dict__.get('_request_info')
+
+    def release_response(self):
+        """
+        Replace ``self.response`` with a :class:`ResponseInfo` that keeps
+        the status, headers and request needed for pagination and
+        :func:`refresh`, so the body and connection of the response are
+        released while ``self`` is retained, e.g. in a cache. The body of a
+        streamed response could not be read afterwards.
+        """
+        response = self.__dict__.get('response')
+        if isinstance(response, requests.Response):
+            self.response = ResponseInfo.from_response(response)
+            self.__dict__.pop('_body_reader', None)
+            response.close()
+
+    def _get_body_reader(self):
+        reader = self.__dict__.get('_body_reader')
+        if reader is None:
+            reader = self._body_reader = BodyReader(self.response)
+        return reader
+
+    def readinto(self, buffer):
+        """
+        Read the body of a streamed response, e.g. file contents, into a
+        buffer provided by the caller. See
+        :class:`kloudless.streaming.BodyReader`.
+
+        :param buffer: Writable bytes-like object, e.g. :class:`bytearray`
+        :return: int, the quantity of bytes read. ``0`` at the end of the
+            body.
+        """
+        return self._get_body_reader().readinto(buffer)
+
+    def copy_to(self, target, buffer=None):
+        """
+        Copy the body of a streamed response into a file descriptor, socket
+        or file object through one reused buffer.
+
+        .. code:: python
+
+            response = account.files(file_id).contents.get()
+            with open(path, 'wb') as f:
+                response.copy_to(f.fileno())
+
+        See :func:`kloudless.streaming.copy_to` for the parameters.
+
+        :return: int, the quantity of bytes copied
+        """
+        return copy_to(self._get_body_reader(), target, buffer)
+
+    def _get_request_headers(self):
+        request = self.request_info
+        return request.headers if request is not None else None
+
     def _compose_url(self, path):
         return url_join(self.url, path)
 
@@ -101,15 +285,16 @@ class Response(object):
         """
         return self.client.delete(self._compose_url(path), **kwargs)
 
-    def _get_self(self):
+    def _get_self(self, **kwargs):
         """
         Performs GET request to self.url.
         """
-        if self.response and self.response.request.method == 'GET':
-            orig_request = self.response.request
-            response = self.get(orig_request.url, headers=orig_request.headers)
+        orig_request = self.request_info
+        if orig_request is not None and orig_request.method == 'GET':
+            response = self.get(orig_request.url, headers=orig_request.headers,
+                                **kwargs)
         else:
-            response = self.get(self.url)
+            response = self.get(self.url, **kwargs)
         return response
 
     def refresh(self):
@@ -129,12 +314,15 @@ class ResponseJson(Response):
     **Instance attributes**
 
     :ivar dict data: JSON data
+    :ivar tuple fields: Keys kept in the resource data, or ``None`` if not
+        projected. See :func:`kloudless.client.Client.request`.
     """
-    def __init__(self, data, **kwargs):
+    def __init__(self, data, fields=None, **kwargs):
 
         super(ResponseJson, self).__init__(**kwargs)
 
         self.data = data
+        self.fields = fields
 
     def refresh(self):
         """
@@ -142,9 +330,9 @@ class ResponseJson(Response):
         refresh ``self``. The original query parameters and headers would be
         reused if original request is http GET request.
         """
-        new = self._get_self()
-        self.__init__(client=new.client, data=new.data,
-                      url=new.url, response=new.response)
+        new = self._get_self(fields=self.fields)
+        self.__init__(client=new.client, data=new.data, url=new.url,
+                      response=new.response, fields=new.fields)
 
 
 class Resource(ResponseJson):
@@ -178,7 +366,7 @@ class Resource(ResponseJson):
         if href:
             return href
 
-        if primary_calendar_alias.search(url):
+        if is_primary_calendar_alias(url):
             return url
 
         object_api = data.get('api', None)
@@ -186,7 +374,7 @@ class Resource(ResponseJson):
         object_id = str(data.get('id', ''))
 
         if object_api == 'storage' and object_type in ('file', 'folder'):
-            account_url = full_account_pattern.match(url).group(0)
+            account_url = get_account_url(url)
             url = '{}/storage/{}s/{}'.format(account_url, object_type,
                                              object_id)
         else:
@@ -227,7 +415,7 @@ class ResourceList(ResponseJson):
         for object_data in self.data.get('objects', []):
             self.objects.append(
                 Resource(data=object_data, url=self.url,
-                         client=self.client)
+                         client=self.client, fields=self.fields)
             )
 
     def __iter__(self):
@@ -254,22 +442,25 @@ class ResourceList(ResponseJson):
 
         return None
 
-    def _get_event_next_page(self):
+    def _get_event_next_page(self, page_size=None, fields=None):
 
         if self.cursor is empty or str(self.cursor) == '-1' or not self.objects:
             raise exceptions.NoNextPage(cursor=self.cursor)
 
         params = self._get_query_params_for_pagination()
         params['cursor'] = self.cursor
+        if page_size:
+            params['page_size'] = page_size
 
         response = self.client.get(self.url, params=params,
-                                   headers=self.response.request.headers)
+                                   headers=self._get_request_headers(),
+                                   fields=fields)
         if not response.objects:
             raise exceptions.NoNextPage(cursor=self.cursor)
 
         return response
 
-    def _get_next_page(self):
+    def _get_next_page(self, page_size=None, fields=None):
 
         next_page = self._get_next_page_identifier()
         if next_page is None:
@@ -277,54 +468,347 @@ class ResourceList(ResponseJson):
 
         params = self._get_query_params_for_pagination()
         params['page'] = next_page
+        if page_size:
+            params['page_size'] = page_size
 
         try:
             response = self.client.get(self.url, params=params,
-                                       headers=self.response.request.headers)
+                                       headers=self._get_request_headers(),
+                                       fields=fields)
         except exceptions.NotFoundException:
             raise exceptions.NoNextPage()
 
         return response
 
-    def get_next_page(self):
+    def get_next_page(self, page_size=None, fields=None):
         """
         Get the resources of the next page, if any.
 
+        :param int page_size: Overwrite the ``page_size`` query parameter
+            for the next page
+        :param fields: Keys to keep in the resource data of the next page.
+            Defaults to ``self.fields``. See
+            :func:`kloudless.client.Client.request`.
+
         :return: :class:`kloudless.resources.base.ResourceList`
         :raise: :class:`kloudless.exceptions.NoNextPage`
         """
+        if fields is None:
+            fields = self.fields
         if self.is_retrieving_events:
-            return self._get_event_next_page()
+            return self._get_event_next_page(page_size=page_size,
+                                             fields=fields)
         else:
-            return self._get_next_page()
+            return self._get_next_page(page_size=page_size, fields=fields)
 
-    def get_paging_iterator(self, max_resources=None):
+    @property
+    def supports_page_size_change(self):
         """
-        Generator to iterate thorough all resources under ``self.objects`` and
-        all resources in the following page, if any.
+        Whether ``page_size`` could change between pages without skipping or
+        repeating resources. This is ``True`` for events and listings
+        paginated through opaque ``next_page`` tokens, but not for
+        ``next_page`` page numbers, whose offsets depend on ``page_size``.
+        """
+        if self.is_retrieving_events:
+            return True
+        next_page = self.next_page
+        if next_page is empty or next_page is None:
+            return False
+        if isinstance(next_page, six.integer_types):
+            return False
+        return not (isinstance(next_page, six.string_types)
+                    and next_page.isdigit())
+
+    def _get_next_page_adaptively(self, page_sizer, fields=None):
+
+        if not self.supports_page_size_change:
+            return self.get_next_page(fields=fields)
+
+        retries = 0
+        while True:
+            start = monotonic()
+            try:
+                resource_list = self.get_next_page(
+                    page_size=page_sizer.page_size, fields=fields)
+            except exceptions.NoNextPage:
+                raise
+            except Exception as e:
+                retries += 1
+                if (retries > page_sizer.max_retries
+                        or not page_sizer.record_error(e)):
+                    raise
+                continue
+
+            payload_bytes = resource_list.headers.get('Content-Length')
+            page_sizer.record(
+                monotonic() - start, len(resource_list.objects),
+                int(payload_bytes) if payload_bytes else None)
+            return resource_list
+
+    def get_page_iterator(self, adaptive_page_size=None, fields=None):
+        """
+        Generator to iterate thorough this page and the following pages, if
+        any. Pages that have been iterated are not referenced anymore, so
+        memory stays bounded by the page size.
 
-        If retrieving events, ``self.latest_cursor`` is available
-        after iterating thorough all events without ``max_resources``
-        specified.
+        If retrieving events, ``self.latest_cursor`` is available after
+        iterating thorough all pages.
 
-        :param max_resources: the maximum quantity of resources that would be
-            contained in the returned generator
+        :param adaptive_page_size: See :meth:`get_paging_iterator`
+        :param fields: See :meth:`get_paging_iterator`
 
-        :return: generator that yield :class:`kloudless.resources.base.Resource`
-            instance
+        :return: generator that yield
+            :class:`kloudless.resources.base.ResourceList` instance
         """
-        counter = 0
         resource_list = self
 
+        page_sizer = adaptive_page_size
+        if page_sizer is True:
+            page_sizer = AdaptivePageSize()
+        if page_sizer:
+            page_size = (self.query_params.get('page_size') or [None])[0]
+            if not page_size and self.supports_page_size_change:
+                # The first page is full, so its size is the default
+                # page_size of the API.
+                page_size = len(self.objects)
+            page_sizer.start(page_size)
+
         while resource_list:
-            for resource in resource_list:
-                yield resource
-                counter += 1
-                if max_resources is not None and counter == max_resources:
-                    return
+            yield resource_list
             try:
-                resource_list = resource_list.get_next_page()
+                if page_sizer:
+                    resource_list = resource_list._get_next_page_adaptively(
+                        page_sizer, fields=fields)
+                else:
+                    resource_list = resource_list.get_next_page(fields=fields)
             except exceptions.NoNextPage as e:
                 if self.is_retrieving_events:
                     self.latest_cursor = e.cursor
                 break
+
+    def get_paging_iterator(self, max_resources=None,
+                            adaptive_page_size=None, fields=None):
+        """
+        Iterator to iterate thorough all resources under ``self.objects`` and
+        all resources in the following page, if any.
+
+        If retrieving events, ``self.latest_cursor`` is available
+        after iterating thorough all events without ``max_resources``
+        specified.
+
+        The progress could be saved through
+        :func:`PagingIterator.checkpoint` and continued later with
+        :func:`resume`.
+
+        :param max_resources: the maximum quantity of resources that would be
+            contained in the returned iterator
+
+        :param adaptive_page_size: Set to ``True`` or a
+            :class:`kloudless.paging.AdaptivePageSize` instance to tune the
+            ``page_size`` of the following pages by their latency, payload
+            size and errors. See :class:`kloudless.paging.AdaptivePageSize`
+            for the limitation.
+
+        :param fields: Keys to keep in the resource data of the following
+            pages, e.g. ``['name', 'size']``. Defaults to ``self.fields``.
+            The resources of this page are not changed. See
+            :func:`kloudless.client.Client.request`.
+
+        :return: :class:`PagingIterator` that yield
+            :class:`kloudless.resources.base.Resource` instance
+        """
+        return PagingIterator(
+            self, self.get_page_iterator(adaptive_page_size, fields=fields),
+            max_resources=max_resources)
+
+    def pipeline(self, max_resources=None, adaptive_page_size=None,
+                 fields=None, **kwargs):
+        """
+        Stream the resources of this page and the following pages through a
+        :class:`kloudless.pipeline.Pipeline`, e.g. to send a request for
+        each resource with bounded concurrency. The following pages are
+        retrieved in the background while the resources are processed.
+
+        :param max_resources: See :meth:`get_paging_iterator`
+        :param adaptive_page_size: See :meth:`get_paging_iterator`
+        :param fields: See :meth:`get_paging_iterator`
+        :param kwargs: kwargs passed to :class:`kloudless.pipeline.Pipeline`,
+            e.g. ``buffer_size``
+
+        :return: :class:`kloudless.pipeline.Pipeline` to add stages to
+        """
+        return Pipeline(
+            self.get_paging_iterator(max_resources, adaptive_page_size,
+                                     fields=fields),
+            **kwargs)
+
+    def _get_page_identifier(self):
+        """
+        Returns the ``page`` or ``cursor`` query parameter this page was
+        requested with, if any.
+        """
+        key = 'cursor' if self.is_retrieving_events else 'page'
+        return (self.query_params.get(key) or [None])[0]
+
+    def _get_checkpoint(self, position, is_last_page=False):
+        """
+        Returns the state to continue iterating from the ``position``-th
+        resource of this page. See :func:`PagingIterator.checkpoint`.
+        """
+        identifier = self._get_page_identifier()
+        done = False
+        if position >= len(self.objects):
+            # Continue from the next page to avoid requesting this one again.
+            position = 0
+            if self.is_retrieving_events:
+                # An exhausted cursor still returns the events created later.
+                if (self.cursor is not empty and str(self.cursor) != '-1'
+                        and self.objects):
+                    identifier = self.cursor
+            else:
+                identifier = self._get_next_page_identifier()
+                done = is_last_page or identifier is None
+
+        request = self.request_info
+        headers = {}
+        if request is not None:
+            headers = {key: value for key, value in request.headers.items()
+                       if key.lower().startswith('x-kloudless-')}
+
+        return {
+            'url': self.url,
+            'params': self._get_query_params_for_pagination(),
+            'headers': headers,
+            'fields': list(self.fields) if self.fields is not None else None,
+            'is_retrieving_events': self.is_retrieving_events,
+            'cursor' if self.is_retrieving_events else 'page': identifier,
+            'position': position,
+            'done': done,
+        }
+
+    @classmethod
+    def resume(cls, client, checkpoint, max_resources=None,
+               adaptive_page_size=None):
+        """
+        Continue iterating from a checkpoint. The page the checkpoint was
+        taken in is requested again, and its resources before the checkpoint
+        are skipped.
+
+        :param client: :class:`kloudless.client.Client` or
+            :class:`kloudless.account.Account` to send the requests
+        :param dict checkpoint: Value returned from
+            :func:`PagingIterator.checkpoint`
+        :param max_resources: See :func:`get_paging_iterator`
+        :param adaptive_page_size: See :func:`get_paging_iterator`
+
+        :return: :class:`PagingIterator`
+        """
+        if checkpoint['done']:
+            return PagingIterator(None, iter(()), checkpoint=checkpoint)
+
+        params = dict(checkpoint['params'])
+        key = 'cursor' if checkpoint['is_retrieving_events'] else 'page'
+        if checkpoint[key] is not None:
+            params[key] = checkpoint[key]
+
+        try:
+            resource_list = client.get(checkpoint['url'], params=params,
+                                       headers=checkpoint['headers'],
+                                       fields=checkpoint['fields'])
+        except exceptions.NotFoundException:
+            if checkpoint['is_retrieving_events']:
+                raise
+            # Same as the end of pages in `_get_next_page`
+            return PagingIterator(None, iter(()),
+                                  checkpoint=dict(checkpoint, done=True))
+        if not isinstance(resource_list, cls):
+            raise exceptions.InvalidParameter(
+                "The checkpoint doesn't refer to a resource list.")
+        return PagingIterator(
+            resource_list, resource_list.get_page_iterator(adaptive_page_size),
+            max_resources=max_resources, position=checkpoint['position'])
+
+
+class PagingIterator(object):
+    """
+    Iterator returned by :func:`ResourceList.get_paging_iterator` and
+    :func:`ResourceList.resume`.
+
+    **Instance attributes**
+
+    :ivar resource_list: The :class:`ResourceList` the iteration started
+        from
+    :ivar int count: The quantity of resources yielded
+    """
+    def __init__(self, resource_list, pages, max_resources=None, position=0,
+                 checkpoint=None):
+        """
+        :param resource_list: :class:`ResourceList` the iteration starts from
+        :param pages: Iterator of :class:`ResourceList`, starting with
+            ``resource_list``
+        :param max_resources: See :func:`ResourceList.get_paging_iterator`
+        :param int position: Index of the first resource to yield in the
+            first page
+        :param dict checkpoint: Checkpoint to return if the iteration has
+            finished already
+        """
+        self.resource_list = resource_list
+        self.count = 0
+        self._pages = pages
+        self._max_resources = max_resources
+        self._page = None
+        self._position = position
+        self._checkpoint = checkpoint
+        self._finished = False
+        self._pages_exhausted = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._finished:
+            raise StopIteration
+        try:
+            while (self._page is None
+                   or self._position >= len(self._page.objects)):
+                is_first_page = self._page is None
+                self._page = next(self._pages)
+                if not is_first_page:
+                    self._position = 0
+        except StopIteration:
+            self._finished = True
+            self._pages_exhausted = True
+            raise
+
+        resource = self._page.objects[self._position]
+        self._position += 1
+        self.count += 1
+        if (self._max_resources is not None
+                and self.count == self._max_resources):
+            self._finished = True
+        return resource
+
+    next = __next__
+
+    def checkpoint(self):
+        """
+        Save the progress of the iteration. The returned dict could be
+        serialized as JSON and passed to :func:`ResourceList.resume` to
+        continue after the last yielded resource, e.g. in another process.
+
+        :return: dict with the following keys:
+
+            - ``url``, ``params`` and ``headers``: The request of the page
+              to continue from, excluding the ``page`` or ``cursor``
+              parameter
+            - ``page`` or ``cursor``: The ``page`` identifier or events
+              ``cursor`` of that page
+            - ``position``: Index of the next resource in that page
+            - ``done``: Whether all pages have been iterated
+        """
+        if self._page is None:
+            if self.resource_list is None:
+                return self._checkpoint
+            return self.resource_list._get_checkpoint(self._position)
+        return self._page._get_checkpoint(
+            self._position, is_last_page=self._pages_exhausted)
@@ -0,0 +1,119 @@
+from __future__ import unicode_literals
+
+import collections
+import heapq
+import itertools
+
+from . import exceptions
+from .concurrency import DEFAULT_PREFETCH_SIZE, merge_sorted
+from .util import logger, to_utc
+
+SearchResult = collections.namedtuple(
+    'SearchResult', ['account', 'rank', 'resource'])
+SearchResult.__doc__ = """
+A result yielded by :func:`federated_search`.
+
+:ivar account: :class:`kloudless.account.Account` the result was found in
+:ivar int rank: Position of the result in the results of its account,
+    starting from 0
+:ivar resource: :class:`kloudless.resources.base.Resource` of the file or
+    folder
+"""
+
+#: Orders of the results of :func:`federated_search`.
+ORDERS = ('relevance', 'modified')
+
+
+def _iter_results(account, query, params, max_results, errors):
+    params = dict(params, q=query)
+    try:
+        results = account.get('storage/search', params=params)
+        for rank, resource in enumerate(
+                results.get_paging_iterator(max_resources=max_results)):
+            yield SearchResult(account, rank, resource)
+    except Exception as e:
+        if errors is None:
+            raise
+        logger.debug("Search of {} failed: {}".format(account.url, e))
+        errors.append((account, e))
+
+
+def _take(results, k):
+    try:
+        # islice doesn't wait for a result after the k-th one
+        for result in itertools.islice(results, k):
+            yield result
+    finally:
+        results.close()  # stop retrieving the remaining pages
+
+
+def _get_modified_key(result):
+    return to_utc(result.resource.data.get('modified'))
+
+
+def _newest(results, k):
+    try:
+        if k is None:
+            newest = sorted(results, key=_get_modified_key, reverse=True)
+        else:
+            newest = heapq.nlargest(k, results, key=_get_modified_key)
+    finally:
+        results.close()
+    for result in newest:
+        yield result
+
+
+def federated_search(accounts, query, k=100, order='relevance',
+                     concurrency=8, page_size=None,
+                     buffer_size=DEFAULT_PREFETCH_SIZE, errors=None,
+                     **params):
+    """
+    Search the storage of several accounts at the same time and stream the
+    top ``k`` results.
+
+    The searches run in parallel, each through its pages retrieved lazily,
+    so the latency is that of the slowest account instead of the sum of
+    them.
+
+    - ``relevance``: The results of the accounts are interleaved by their
+      rank, since each account orders its results by relevance. A result is
+      yielded as soon as the results ranked above it in all accounts are, and
+      no more pages are retrieved once ``k`` results are yielded.
+    - ``modified``: The most recently modified results first. All results of
+      each account are retrieved before the first one is yielded, and only
+      ``k`` of them are kept in memory.
+
+    :param accounts: Iterable of :class:`kloudless.account.Account`
+    :param str query: Search query, the ``q`` query parameter
+    :param int k: The maximum quantity of results. Set to ``None`` for all
+        results.
+    :param str order: ``relevance`` or ``modified``
+    :param int concurrency: The maximum quantity of requests in progress at
+        the same time
+    :param int page_size: ``page_size`` of the search requests. Pages of
+        about ``k`` divided by the quantity of accounts avoid retrieving
+        results that are not yielded.
+    :param int buffer_size: Results retrieved per account ahead of the merge,
+        see :func:`kloudless.concurrency.prefetch`
+    :param list errors: List to append ``(account, exception)`` to if a
+        search fails, in which case the results of the other accounts are
+        still yielded. Errors are raised by default.
+    :param params: Additional query parameters, e.g. ``lang`` and ``parents``
+
+    :return: generator that yields :class:`SearchResult`
+    """
+    if order not in ORDERS:
+        raise exceptions.InvalidParameter(
+            "order must be one of {}.".format(', '.join(ORDERS)))
+    if page_size:
+        params['page_size'] = page_size
+
+    # Only the first k results of each account could be in the top k by rank
+    max_results = k if order == 'relevance' else None
+    streams = [_iter_results(account, query, params, max_results, errors)
+               for account in accounts]
+    results = merge_sorted(streams, key=lambda result: result.rank,
+                           concurrency=concurrency, buffer_size=buffer_size)
+    if order == 'relevance':
+        return _take(results, k)
+    return _newest(results, k)
@@ -0,0 +1,136 @@
+from __future__ import unicode_literals
+
+import os
+
+from urllib3.response import HTTPResponse
+
+#: Size of the buffer allocated by :func:`copy_to` if none is given.
+DEFAULT_BUFFER_SIZE = 256 * 1024
+
+
+class BodyReader(object):
+    """
+    Reads the body of a streamed :class:`requests.Response` into buffers
+    provided by the caller.
+
+    Bodies which are not content-encoded are read through the ``readinto``
+    of ``response.raw``. urllib3 implements it by reading a bytes object
+    and copying it into the buffer, so each read is copied once. Encoded
+    bodies received through urllib3 are decoded by
+    :func:`urllib3.response.HTTPResponse.read` and copied into the buffer,
+    and other encoded bodies through :func:`requests.Response.iter_content`.
+    urllib3 returns the connection to the pool at the end of the body.
+
+    The body should not be read through other methods of the response at
+    the same time.
+    """
+    def __init__(self, response):
+        """
+        :param response: :class:`requests.Response` requested with
+            ``stream=True``
+        """
+        self.response = response
+        self._read = None
+        self._readinto = None
+        self._chunks = None
+        self._pending = memoryview(b'')
+
+        raw = response.raw
+        encoding = response.headers.get('Content-Encoding', '')
+        if (encoding.strip().lower() in ('', 'identity')
+                and hasattr(raw, 'readinto')):
+            self._readinto = raw.readinto
+        elif isinstance(raw, HTTPResponse):
+            self._read = raw.read
+        else:
+            self._chunks = response.iter_content(DEFAULT_BUFFER_SIZE)
+
+    def _read_chunk(self, size):
+        raw = self.response.raw
+        data = self._read(size, decode_content=True)
+        # A decoder may hold back its output, so an empty read only ends
+        # the body once the response is closed.
+        while not data and not raw.closed:
+            data = self._read(size, decode_content=True)
+        return data
+
+    def readinto(self, buffer):
+        """
+        Read up to ``len(buffer)`` bytes of the body into ``buffer``.
+
+        :param buffer: Writable bytes-like object, e.g. :class:`bytearray`
+            or :class:`memoryview`
+        :return: int, the quantity of bytes read. ``0`` at the end of the
+            body.
+        """
+        if self._readinto is not None:
+            return self._readinto(buffer) or 0
+
+        view = memoryview(buffer)
+        if hasattr(view, 'cast'):
+            view = view.cast('B')  # Python 2 has no cast
+        if not len(view):
+            return 0
+        while not self._pending:
+            if self._read is not None:
+                # Decoded data may exceed the requested size with urllib3 1.x
+                data = self._read_chunk(len(view))
+                if not data:
+                    return 0
+                self._pending = memoryview(data)
+                continue
+            try:
+                self._pending = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+        size = min(len(view), len(self._pending))
+        view[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def _write_all(write, view):
+    """
+    Call ``write`` until all of ``view`` is written, for writers that may
+    write partially like :func:`os.write`.
+    """
+    while view:
+        written = write(view)
+        if written is None:  # e.g. buffered files in Python 2
+            return
+        view = view[written:]
+
+
+def copy_to(reader, target, buffer=None):
+    """
+    Copy the body into ``target`` through one reused buffer.
+
+    :param reader: :class:`BodyReader`
+    :param target: File descriptor, socket, or file object with ``write``.
+        Sockets are sent to through :func:`socket.socket.sendall`.
+    :param buffer: Writable bytes-like object to read into. A
+        :class:`bytearray` of :data:`DEFAULT_BUFFER_SIZE` bytes is allocated
+        if not given.
+
+    :return: int, the quantity of bytes copied
+    """
+    if buffer is None:
+        buffer = bytearray(DEFAULT_BUFFER_SIZE)
+    view = memoryview(buffer)
+
+    if isinstance(target, int):
+        def write(data):
+            _write_all(lambda chunk: os.write(target, chunk), data)
+    elif hasattr(target, 'sendall'):
+        write = target.sendall
+    else:
+        def write(data):
+            _write_all(target.write, data)
+
+    total = 0
+    size = reader.readinto(view)
+    while size:
+        write(view[:size])
+        total += size
+        size = reader.readinto(view)
+    return total
@@ -0,0 +1,352 @@
+from __future__ import unicode_literals
+
+import hashlib
+import io
+import os
+import threading
+
+from six.moves import queue
+
+from .bulk import SKIPPED, run_bulk
+from .concurrency import RATE_LIMIT_EXCEPTIONS
+from .dedup import HASH_NAME, LOCAL_ACCOUNT
+from .resources import Resource
+from .util import url_join
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+#: Bytes read from the download at a time.
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+#: Chunks buffered between the download and the upload of each file.
+DEFAULT_BUFFER_CHUNKS = 16
+
+
+class StreamPipe(object):
+    """
+    Bounded in-memory pipe from an iterable of byte chunks to a file-like
+    reader. A background thread pulls the chunks while at most
+    ``buffer_chunks`` of them wait to be read, so a slow reader blocks the
+    download instead of growing the memory.
+
+    The pipe is passed as the ``data`` of an upload request. Errors raised
+    while pulling the chunks are raised from :func:`read`.
+
+    If ``hash_name`` is given, the chunks are hashed by the background
+    thread as well, so hashing doesn't slow down the reader.
+    """
+    def __init__(self, chunks, buffer_chunks=DEFAULT_BUFFER_CHUNKS,
+                 length=None, hash_name=None):
+        """
+        :param chunks: Iterable of bytes, e.g.
+            :func:`requests.Response.iter_content`
+        :param int buffer_chunks: The maximum quantity of chunks buffered
+        :param int length: Total size of the chunks if known. Sent as the
+            ``Content-Length`` of the upload; otherwise the upload uses
+            chunked transfer encoding.
+        :param str hash_name: Name of the :mod:`hashlib` algorithm to hash
+            the chunks with, see :attr:`content_hash`
+        """
+        self.len = length
+        self._hash = hashlib.new(hash_name) if hash_name else None
+        self.bytes_read = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize=buffer_chunks)
+        self._closed = threading.Event()
+        self._buffer = b''
+        self._eof = False
+        self._thread = threading.Thread(target=self._produce, args=(chunks,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, chunks):
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if self._hash is not None:
+                    self._hash.update(chunk)
+                if not self._put(chunk):
+                    return
+        except Exception as e:
+            self._put(e)
+        else:
+            self._put(None)  # end of the chunks
+
+    @property
+    def content_hash(self):
+        """
+        Hex digest of all the chunks, or ``None`` if not hashed or the chunks
+        are not read to the end.
+        """
+        if self._hash is None or not self._eof or self.error is not None:
+            return None
+        return self._hash.hexdigest()
+
+    def _next_chunk(self):
+        if self._eof:
+            return b''
+        item = self._queue.get()
+        if item is None:
+            self._eof = True
+            return b''
+        if isinstance(item, Exception):
+            self._eof = True
+            self.error = item
+            raise item
+        self.bytes_read += len(item)
+        return item
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = [self._buffer]
+            self._buffer = b''
+            chunk = self._next_chunk()
+            while chunk:
+                chunks.append(chunk)
+                chunk = self._next_chunk()
+            return b''.join(chunks)
+
+        while len(self._buffer) < size:
+            chunk = self._next_chunk()
+            if not chunk:
+                break
+            self._buffer = self._buffer + chunk if self._buffer else chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def __iter__(self):
+        if self._buffer:
+            data, self._buffer = self._buffer, b''
+            yield data
+        chunk = self._next_chunk()
+        while chunk:
+            yield chunk
+            chunk = self._next_chunk()
+
+    def close(self):
+        """
+        Stop pulling the chunks and release the buffered ones.
+        """
+        self._closed.set()
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+
+def _upload(account, pipe, parent_id, name, overwrite):
+    metadata = {'parent_id': parent_id, 'name': name}
+    headers = {'X-Kloudless-Metadata': json.dumps(metadata),
+               'Content-Type': 'application/octet-stream'}
+    params = {'overwrite': 'true'} if overwrite else None
+    try:
+        return account.post(
+            'storage/files', headers=headers, params=params,
+            data=pipe if pipe.len is not None else iter(pipe))
+    except Exception:
+        if pipe.error is not None:
+            raise pipe.error  # reading the contents failed, not the upload
+        raise
+    finally:
+        pipe.close()
+
+
+def _record_upload(index, account_key, path, response, content_hash):
+    if content_hash is not None:
+        index.record(account_key, path, response.data.get('size'),
+                     response.data.get('modified'), content_hash)
+
+
+def transfer_file(source, destination, file_data, parent_id, overwrite=False,
+                  chunk_size=DEFAULT_CHUNK_SIZE,
+                  buffer_chunks=DEFAULT_BUFFER_CHUNKS, name=None,
+                  index=None):
+    """
+    Stream the contents of a file of ``source`` into a new file of
+    ``destination`` without writing to disk. At most
+    ``chunk_size * buffer_chunks`` bytes are held in memory.
+
+    :param source: :class:`kloudless.account.Account` to download from
+    :param destination: :class:`kloudless.account.Account` to upload to
+    :param dict file_data: Metadata of the source file, which contains
+        ``id`` and ``name``
+    :param str parent_id: ID of the destination folder
+    :param bool overwrite: Whether to overwrite a file with the same name
+    :param int chunk_size: Bytes read from the download at a time
+    :param int buffer_chunks: The maximum quantity of chunks buffered
+    :param str name: Name of the new file. Default to the source file name.
+    :param index: :class:`kloudless.dedup.ContentHashIndex` to skip the file
+        if the same content was uploaded to the destination already. The
+        contents are hashed while streaming.
+
+    :return: :class:`kloudless.resources.base.Resource` of the new file, or
+        :data:`kloudless.bulk.SKIPPED`
+    """
+    name = name or file_data['name']
+    if index is not None:
+        source_key = index.get_account_key(source)
+        source_path = file_data.get('path') or str(file_data['id'])
+        destination_key = index.get_account_key(destination)
+        destination_path = '{}/{}'.format(parent_id, name)
+        content_hash = index.get(source_key, source_path,
+                                 file_data.get('size'),
+                                 file_data.get('modified'))
+        if index.is_uploaded(content_hash, destination_key,
+                             destination_path):
+            return SKIPPED
+
+    download = source.get(
+        'storage/files/{}/contents'.format(file_data['id']), stream=True,
+        # Keep the body as is, so its Content-Length is the file size.
+        headers={'Accept-Encoding': 'identity'})
+    length = None
+    if not download.headers.get('Content-Encoding'):
+        length = download.headers.get('Content-Length')
+        length = int(length) if length else None
+
+    pipe = StreamPipe(download.iter_content(chunk_size),
+                      buffer_chunks=buffer_chunks, length=length,
+                      hash_name=HASH_NAME if index is not None else None)
+    try:
+        response = _upload(destination, pipe, parent_id, name, overwrite)
+    finally:
+        download.close()
+
+    if index is not None and pipe.content_hash is not None:
+        index.record(source_key, source_path, file_data.get('size'),
+                     file_data.get('modified'), pipe.content_hash)
+        _record_upload(index, destination_key, destination_path, response,
+                       pipe.content_hash)
+    return response
+
+
+def upload_file(account, path, parent_id, name=None, overwrite=False,
+                chunk_size=DEFAULT_CHUNK_SIZE,
+                buffer_chunks=DEFAULT_BUFFER_CHUNKS, index=None):
+    """
+    Upload a local file, reading it in chunks in a background thread.
+
+    :param account: :class:`kloudless.account.Account` to upload to
+    :param str path: Path of the local file
+    :param str parent_id: ID of the destination folder
+    :param str name: Name of the new file. Default to the local file name.
+    :param bool overwrite: Whether to overwrite a file with the same name
+    :param int chunk_size: See :func:`transfer_file`
+    :param int buffer_chunks: See :func:`transfer_file`
+    :param index: :class:`kloudless.dedup.ContentHashIndex` to skip the file
+        if its content was uploaded to the same destination already. The
+        hash of the local file is recorded while uploading and reused while
+        the size and modified time of the file stay the same.
+
+    :return: :class:`kloudless.resources.base.Resource` of the new file, or
+        :data:`kloudless.bulk.SKIPPED`
+    """
+    path = os.path.abspath(path)
+    name = name or os.path.basename(path)
+    stat = os.stat(path)
+    modified = repr(stat.st_mtime)
+
+    if index is not None:
+        account_key = index.get_account_key(account)
+        destination_path = '{}/{}'.format(parent_id, name)
+        content_hash = index.get(LOCAL_ACCOUNT, path, stat.st_size, modified)
+        if index.is_uploaded(content_hash, account_key, destination_path):
+            return SKIPPED
+
+    with io.open(path, 'rb') as f:
+        pipe = StreamPipe(iter(lambda: f.read(chunk_size), b''),
+                          buffer_chunks=buffer_chunks, length=stat.st_size,
+                          hash_name=HASH_NAME if index is not None else None)
+        response = _upload(account, pipe, parent_id, name, overwrite)
+
+    if index is not None and pipe.content_hash is not None:
+        index.record(LOCAL_ACCOUNT, path, stat.st_size, modified,
+                     pipe.content_hash)
+        _record_upload(index, account_key, destination_path, response,
+                       pipe.content_hash)
+    return response
+
+
+def transfer_files(source, destination, items, parent_id, overwrite=False,
+                   chunk_size=DEFAULT_CHUNK_SIZE,
+                   buffer_chunks=DEFAULT_BUFFER_CHUNKS, index=None,
+                   **kwargs):
+    """
+    Stream files from ``source`` to ``destination`` with bounded
+    concurrency. Each file is downloaded and uploaded at the same time
+    through a :class:`StreamPipe`, so memory stays bounded by
+    ``concurrency * chunk_size * buffer_chunks`` bytes. A file that fails
+    with a rate limiting error is transferred again from the start. Other
+    errors are not retried by default, since the upload might have been
+    stored and retrying it could create a duplicate. Pass
+    ``retry_exceptions=kloudless.concurrency.RETRY_EXCEPTIONS`` to retry
+    on server and connection errors as well.
+
+    :param source: :class:`kloudless.account.Account` to download from
+    :param destination: :class:`kloudless.account.Account` to upload to
+    :param items: Iterable of :class:`kloudless.resources.base.Resource`
+        instances or file IDs of ``source``. The metadata of each ID is
+        retrieved for the file name.
+    :param str parent_id: ID of the destination folder
+    :param bool overwrite: Whether to overwrite files with the same name
+    :param int chunk_size: See :func:`transfer_file`
+    :param int buffer_chunks: See :func:`transfer_file`
+    :param index: See :func:`transfer_file`. Skipped files have
+        ``skipped`` set in their result.
+    :param kwargs: kwargs passed to :func:`kloudless.bulk.run_bulk`, e.g.
+        ``concurrency``, ``rate_limit``, ``retries``, ``retry_exceptions``,
+        ``progress`` and ``journal``
+
+    :return: list of :class:`kloudless.bulk.BulkResult` whose ``response``
+        is the uploaded file
+    """
+    # Metadata of the items given as resources, looked up by their url to
+    # avoid retrieving it again. Entries are dropped once the item is done.
+    known_files = {}
+    known_urls = {}
+
+    def remember(items):
+        for item in items:
+            if isinstance(item, Resource):
+                known_files[item.url] = item.data
+                known_urls[str(item.data['id'])] = item.url
+            yield item
+
+    def transfer(url):
+        try:
+            file_data = known_files.get(url)
+            if file_data is None:
+                file_data = source.get(url).data
+            return transfer_file(source, destination, file_data, parent_id,
+                                 overwrite=overwrite, chunk_size=chunk_size,
+                                 buffer_chunks=buffer_chunks, index=index)
+        finally:
+            known_files.pop(url, None)
+
+    progress = kwargs.pop('progress', None)
+
+    def forget(count, result):
+        # Items skipped through the journal are never transferred
+        known_files.pop(known_urls.pop(result.id, None), None)
+        if progress is not None:
+            progress(count, result)
+
+    kwargs.setdefault('retry_exceptions', RATE_LIMIT_EXCEPTIONS)
+    op = 'transfer:{}:{}'.format(
+        url_join(destination.url, 'storage/folders'), parent_id)
+    return run_bulk(source, op, remember(items), transfer,
+                    resource_type='file', progress=forget, **kwargs)
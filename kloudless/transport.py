@@ -0,0 +1,462 @@
+from __future__ import unicode_literals
+
+import base64
+import collections
+import io
+import threading
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import (DEFAULT_CA_BUNDLE_PATH,
+                            get_encoding_from_headers)
+
+from . import exceptions
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+__all__ = ['BaseTransport', 'HTTPAdapter', 'Urllib3Transport',
+           'HTTPXTransport', 'RecordingTransport', 'ReplayTransport']
+
+
+def reset_transport(transport):
+    """
+    Drop the connections of ``transport`` without closing them, after
+    ``fork``. Transports without :func:`BaseTransport.reset` are left as is,
+    except :class:`requests.adapters.HTTPAdapter`, whose pools are created
+    again with its own settings the way it does when unpickled.
+    """
+    reset = getattr(transport, 'reset', None)
+    if reset is not None:
+        reset()
+    elif isinstance(transport, HTTPAdapter):
+        transport.__setstate__(transport.__getstate__())
+
+
+def _split_timeout(timeout):
+    if isinstance(timeout, tuple):
+        return timeout
+    return timeout, timeout
+
+
+class BaseTransport(BaseAdapter):
+    """
+    Base class of transports. A transport sends a prepared request and
+    returns a :class:`requests.Response`.
+
+    Transports are `transport adapters <https://requests.readthedocs.io/en/
+    latest/user/advanced/#transport-adapters>`_ of ``requests``, so any
+    :class:`requests.adapters.BaseAdapter`, including the default
+    :class:`requests.adapters.HTTPAdapter`, could be used as a transport.
+    :class:`kloudless.client.Session` mounts the transport for both
+    ``http://`` and ``https://`` urls.
+    """
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        """
+        Send ``request``.
+
+        :param request: :class:`requests.PreparedRequest`
+        :param bool stream: Whether the response body should be streamed
+        :param timeout: Seconds to wait, or a ``(connect, read)`` tuple
+        :param verify: Whether to verify TLS certificates, or the path of a
+            CA bundle
+        :param cert: Client certificate
+        :param dict proxies: Proxies, if supported by the transport
+
+        :return: :class:`requests.Response`
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def reset(self):
+        """
+        Drop the connections without closing them. Called in a child
+        process after ``fork``, since connections inherited from the parent
+        must not be used.
+        """
+
+    def build_response(self, request, status_code, headers, raw, reason=None):
+        """
+        Build a :class:`requests.Response` whose body is read from ``raw``.
+
+        :param raw: File-like object of the response body
+        """
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = raw
+        response.reason = reason
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+
+class Urllib3Transport(BaseTransport):
+    """
+    Sends requests through a :class:`urllib3.PoolManager` directly, skipping
+    the proxy and certificate handling of
+    :class:`requests.adapters.HTTPAdapter`. ``proxies`` are not supported.
+    """
+    def __init__(self, num_pools=10, maxsize=10, **pool_kwargs):
+        """
+        :param int num_pools: The quantity of connection pools to cache
+        :param int maxsize: The quantity of connections kept per pool
+        :param pool_kwargs: kwargs passed to :class:`urllib3.PoolManager`
+        """
+        super(Urllib3Transport, self).__init__()
+        self._pool_kwargs = dict(pool_kwargs, num_pools=num_pools,
+                                 maxsize=maxsize)
+        self.reset()
+
+    def __getstate__(self):
+        return {'pool_kwargs': self._pool_kwargs}
+
+    def __setstate__(self, state):
+        self.__init__(**state['pool_kwargs'])
+
+    def reset(self):
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self, verify, cert):
+        import urllib3
+
+        key = (verify, cert)
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    kwargs = dict(self._pool_kwargs)
+                    if verify is False:
+                        kwargs['cert_reqs'] = 'CERT_NONE'
+                    else:
+                        kwargs['cert_reqs'] = 'CERT_REQUIRED'
+                        if verify is not True:
+                            kwargs['ca_certs'] = verify
+                        else:
+                            kwargs['ca_certs'] = DEFAULT_CA_BUNDLE_PATH
+                    if cert:
+                        if isinstance(cert, tuple):
+                            kwargs['cert_file'], kwargs['key_file'] = cert
+                        else:
+                            kwargs['cert_file'] = cert
+                    pool = urllib3.PoolManager(**kwargs)
+                    self._pools[key] = pool
+        return pool
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        import urllib3
+        from urllib3 import exceptions as urllib3_exceptions
+
+        connect, read = _split_timeout(timeout)
+        try:
+            response = self._get_pool(verify, cert).urlopen(
+                request.method, request.url, body=request.body,
+                headers=request.headers, redirect=False, retries=False,
+                preload_content=False, decode_content=False,
+                timeout=urllib3.Timeout(connect=connect, read=read),
+                chunked='Transfer-Encoding' in request.headers,
+            )
+        except urllib3_exceptions.ConnectTimeoutError as e:
+            raise requests.exceptions.ConnectTimeout(e, request=request)
+        except urllib3_exceptions.ReadTimeoutError as e:
+            raise requests.exceptions.ReadTimeout(e, request=request)
+        except urllib3_exceptions.SSLError as e:
+            raise requests.exceptions.SSLError(e, request=request)
+        except urllib3_exceptions.HTTPError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+
+        return self.build_response(request, response.status,
+                                   response.headers, response,
+                                   reason=response.reason)
+
+    def close(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.clear()
+            self._pools.clear()
+
+
+class _IteratorReader(io.RawIOBase):
+    """
+    File-like object reading from an iterator of bytes.
+    """
+    def __init__(self, iterator, on_close=None):
+        self._iterator = iterator
+        self._buffer = b''
+        self._on_close = on_close
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._iterator)
+            except StopIteration:
+                return 0
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self):
+        if not self.closed and self._on_close is not None:
+            self._on_close()
+        super(_IteratorReader, self).close()
+
+    def release_conn(self):
+        self.close()
+
+
+class HTTPXTransport(BaseTransport):
+    """
+    Sends requests through `httpx <https://www.python-httpx.org>`_, which
+    supports HTTP/2. Requires ``httpx`` to be installed, and ``h2`` for
+    HTTP/2. ``proxies`` are not supported per request.
+
+    The response body is decoded by ``httpx``.
+    """
+    def __init__(self, http2=True, **client_kwargs):
+        """
+        :param bool http2: Whether to negotiate HTTP/2
+        :param client_kwargs: kwargs passed to :class:`httpx.Client`
+        """
+        super(HTTPXTransport, self).__init__()
+        try:
+            import httpx  # noqa: F401
+        except ImportError:
+            raise exceptions.InvalidParameter(
+                "httpx must be installed to use HTTPXTransport.")
+        self._client_kwargs = dict(client_kwargs, http2=http2)
+        self.reset()
+
+    def __getstate__(self):
+        return {'client_kwargs': self._client_kwargs}
+
+    def __setstate__(self, state):
+        self.__init__(**state['client_kwargs'])
+
+    def reset(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _get_client(self, verify, cert):
+        import httpx
+
+        key = (verify, cert)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = httpx.Client(verify=verify, cert=cert,
+                                          **self._client_kwargs)
+                    self._clients[key] = client
+        return client
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        import httpx
+
+        connect, read = _split_timeout(timeout)
+        client = self._get_client(verify, cert)
+        body = request.body
+        if body is not None and not isinstance(body, bytes):
+            body = body.encode('utf-8') if hasattr(body, 'encode') else body
+
+        httpx_request = client.build_request(
+            request.method, request.url, headers=dict(request.headers),
+            content=body, timeout=httpx.Timeout(read, connect=connect))
+        try:
+            response = client.send(httpx_request, stream=True)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+
+        headers = CaseInsensitiveDict()
+        for name, value in response.headers.multi_items():
+            if name in headers:
+                value = '{}, {}'.format(headers[name], value)
+            headers[name] = value
+        # The body is decoded by httpx already.
+        headers.pop('Content-Encoding', None)
+
+        raw = _IteratorReader(response.iter_bytes(), on_close=response.close)
+        return self.build_response(request, response.status_code, headers,
+                                   raw, reason=response.reason_phrase)
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+def _strip_headers(headers, excluded=('Authorization',)):
+    return {k: v for k, v in headers.items() if k not in excluded}
+
+
+def _decoded_headers(headers, body):
+    # Bodies are stored decoded, so the encoding headers of the original
+    # response don't apply to them.
+    excluded = ('content-encoding', 'transfer-encoding', 'content-length')
+    headers = {k: v for k, v in headers.items()
+               if k.lower() not in excluded}
+    headers['Content-Length'] = str(len(body))
+    return headers
+
+
+def _encode_body(body):
+    if body is None:
+        return None
+    if not isinstance(body, bytes):
+        body = body.encode('utf-8')
+    return base64.b64encode(body).decode('ascii')
+
+
+class RecordingTransport(BaseTransport):
+    """
+    Records the requests sent through another transport and their responses
+    into a JSON file, which could be played back by
+    :class:`ReplayTransport`. The ``Authorization`` header is not recorded.
+
+    Response bodies are read entirely while recording, so streaming is not
+    preserved. Call :func:`save` or :func:`close` to write the file.
+    """
+    def __init__(self, path, transport=None):
+        """
+        :param str path: Path of the JSON file to write
+        :param transport: The transport sending the requests. Default to
+            :class:`requests.adapters.HTTPAdapter`.
+        """
+        super(RecordingTransport, self).__init__()
+        self.path = path
+        self.transport = transport or HTTPAdapter()
+        self.interactions = []
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        self._lock = threading.Lock()
+        reset_transport(self.transport)
+
+    def send(self, request, **kwargs):
+        response = self.transport.send(request, **kwargs)
+        body = response.content
+        interaction = {
+            'request': {
+                'method': request.method,
+                'url': request.url,
+                'headers': _strip_headers(request.headers),
+                'body': _encode_body(request.body)
+                if isinstance(request.body, (bytes, type(''))) else None,
+            },
+            'response': {
+                'status_code': response.status_code,
+                'reason': response.reason,
+                'headers': _decoded_headers(response.headers, body),
+                'body': _encode_body(body),
+            },
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+        return response
+
+    def save(self):
+        with self._lock:
+            with io.open(self.path, 'w', encoding='utf8') as f:
+                f.write(json.dumps({'interactions': self.interactions},
+                                   indent=2, ensure_ascii=False))
+
+    def close(self):
+        self.save()
+        self.transport.close()
+
+
+class ReplayTransport(BaseTransport):
+    """
+    Plays back the responses recorded by :class:`RecordingTransport`
+    without network access. Requests are matched by method and url; the
+    recorded responses for the same request are returned in order.
+    """
+    def __init__(self, path, match_body=False, repeat=False):
+        """
+        :param str path: Path of the JSON file written by
+            :class:`RecordingTransport`
+        :param bool match_body: Set to ``True`` to match request bodies as
+            well
+        :param bool repeat: Set to ``True`` to return the last matched
+            response again once recorded responses of a request run out
+        """
+        super(ReplayTransport, self).__init__()
+        self.match_body = match_body
+        self.repeat = repeat
+        self._responses = collections.defaultdict(collections.deque)
+        self._last = {}
+        self.reset()
+
+        with io.open(path, 'r', encoding='utf8') as f:
+            interactions = json.loads(f.read())['interactions']
+        for interaction in interactions:
+            recorded = interaction['request']
+            key = self._key(recorded['method'], recorded['url'],
+                            recorded.get('body'))
+            self._responses[key].append(interaction['response'])
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.reset()
+
+    def reset(self):
+        self._lock = threading.Lock()
+
+    def _key(self, method, url, body):
+        return (method.upper(), url, body if self.match_body else None)
+
+    def send(self, request, stream=False, **kwargs):
+        key = self._key(request.method, request.url,
+                        _encode_body(request.body)
+                        if isinstance(request.body, (bytes, type('')))
+                        else None)
+        with self._lock:
+            responses = self._responses.get(key)
+            if responses:
+                recorded = responses.popleft()
+                self._last[key] = recorded
+            elif self.repeat and key in self._last:
+                recorded = self._last[key]
+            else:
+                raise exceptions.NoRecordedResponse(
+                    "No recorded response for {} {}".format(
+                        request.method, request.url))
+
+        body = base64.b64decode(recorded['body'] or '')
+        return self.build_response(
+            request, recorded['status_code'],
+            _decoded_headers(recorded['headers'], body),
+            io.BytesIO(body), reason=recorded.get('reason'))
@@ -1,11 +1,13 @@
 from __future__ import unicode_literals
 
 import logging
+import time
 from datetime import datetime
 
 import six
-from dateutil import parser
+from dateutil import parser, tz
 
+from . import exceptions
 from .config import configuration
 
 if six.PY2:
@@ -16,22 +18,182 @@ elif six.PY3:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Python 2 doesn't have a monotonic clock in the standard library.
+monotonic = getattr(time, 'monotonic', time.time)
+
+
+#: Fields of storage objects and events converted by
+#: :func:`get_datetimes` by default.
+TIMESTAMP_FIELDS = ('created', 'modified')
+
+_UTC = tz.tzutc()
+_tz_offsets = {}
+_datetimes = {}
+_DATETIME_CACHE_SIZE = 4096
+
+
+def _get_tz_offset(sign, offset):
+    """
+    Returns the tzinfo of an offset like ``05:30``, shared between
+    datetimes.
+    """
+    key = sign + offset
+    tzinfo = _tz_offsets.get(key)
+    if tzinfo is None:
+        seconds = int(offset[:2]) * 3600 + int(offset[3:]) * 60
+        if not seconds:
+            tzinfo = _UTC
+        else:
+            tzinfo = tz.tzoffset(None, -seconds if sign == '-' else seconds)
+        _tz_offsets[key] = tzinfo
+    return tzinfo
+
+
+def _parse_iso8601(timestamp):
+    """
+    Parses the timestamps returned by the API, i.e.
+    ``YYYY-MM-DDTHH:MM:SS[.ffffff][Z|+HH:MM|-HH:MM]``, without dateutil.
+
+    :return: datetime, or ``None`` if ``timestamp`` is in other formats
+    """
+    length = len(timestamp)
+    if (length < 19 or timestamp[4] != '-' or timestamp[7] != '-'
+            or timestamp[10] not in 'Tt ' or timestamp[13] != ':'
+            or timestamp[16] != ':'):
+        return None
+    if not (timestamp[:4] + timestamp[5:7] + timestamp[8:10]
+            + timestamp[11:13] + timestamp[14:16]
+            + timestamp[17:19]).isdigit():
+        return None
+
+    pos = 19
+    microsecond = 0
+    if pos < length and timestamp[pos] in '.,':
+        end = pos + 1
+        while end < length and timestamp[end].isdigit():
+            end += 1
+        digits = timestamp[pos + 1:end]
+        if not 0 < len(digits) <= 6:
+            return None
+        microsecond = int(digits) * 10 ** (6 - len(digits))
+        pos = end
+
+    suffix = timestamp[pos:]
+    if not suffix:
+        tzinfo = None
+    elif suffix in ('Z', 'z'):
+        tzinfo = _UTC
+    elif (len(suffix) == 6 and suffix[0] in '+-' and suffix[3] == ':'
+            and (suffix[1:3] + suffix[4:]).isdigit()):
+        tzinfo = _get_tz_offset(suffix[0], suffix[1:])
+    else:
+        return None
+
+    try:
+        return datetime(
+            int(timestamp[:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+            int(timestamp[11:13]), int(timestamp[14:16]),
+            int(timestamp[17:19]), microsecond, tzinfo)
+    except ValueError:
+        return None
+
 
 def to_datetime(timestamp):
     """
     Converts ISO 8601 timestamp to datetime object.
+
+    The formats returned by the API are parsed directly, and dateutil is
+    used for the others. Results are cached, since timestamps repeat often
+    between resources.
     """
-    if isinstance(timestamp, datetime) or timestamp is None:
+    if timestamp is None or isinstance(timestamp, datetime):
         return timestamp
 
-    return parser.parse(timestamp)
+    try:
+        return _datetimes[timestamp]
+    except KeyError:
+        pass
+
+    value = _parse_iso8601(timestamp)
+    if value is None:
+        value = parser.parse(timestamp)
+    if len(_datetimes) >= _DATETIME_CACHE_SIZE:
+        _datetimes.clear()
+    _datetimes[timestamp] = value
+    return value
+
+
+def to_utc(timestamp):
+    """
+    Converts ISO 8601 timestamp to naive datetime object in UTC, e.g. to
+    compare timestamps of different time zones. Timestamps without time
+    zone are assumed to be in UTC, and ``None`` is converted to
+    ``datetime.min``.
+    """
+    if not timestamp:
+        return datetime.min
+    value = to_datetime(timestamp)
+    if value.tzinfo is not None:
+        value = value.astimezone(_UTC).replace(tzinfo=None)
+    return value
+
+
+def to_datetimes(timestamps, as_numpy=False):
+    """
+    Converts a sequence of ISO 8601 timestamps at once.
+
+    :param timestamps: Iterable of timestamps, datetime objects or ``None``
+    :param bool as_numpy: Return a ``numpy.ndarray`` of ``datetime64[us]``
+        in UTC instead, with ``NaT`` for ``None``. Requires ``numpy`` to be
+        installed. Timestamps without time zone are assumed to be in UTC.
+
+    :return: list of datetime objects, or ``numpy.ndarray``
+    """
+    values = [to_datetime(timestamp) for timestamp in timestamps]
+    if not as_numpy:
+        return values
+
+    try:
+        import numpy
+    except ImportError:
+        raise exceptions.InvalidParameter(
+            "numpy must be installed to convert timestamps to arrays.")
+    return numpy.array(
+        [value.astimezone(_UTC).replace(tzinfo=None)
+         if value is not None and value.tzinfo is not None else value
+         for value in values],
+        dtype='datetime64[us]')
+
+
+def get_datetimes(resources, fields=TIMESTAMP_FIELDS, as_numpy=False):
+    """
+    Converts the timestamp fields of a page of resources at once.
+
+    :param resources: Iterable of :class:`kloudless.resources.base.Resource`
+        or dicts of resource data, e.g. a
+        :class:`kloudless.resources.base.ResourceList`
+    :param fields: Names of the timestamp fields
+    :param bool as_numpy: See :func:`to_datetimes`
+
+    :return: dict mapping each field to the list or ``numpy.ndarray`` of its
+        values, ``None`` where a resource doesn't have the field
+    """
+    datas = [getattr(resource, 'data', resource) for resource in resources]
+    return {field: to_datetimes([data.get(field) for data in datas],
+                                as_numpy=as_numpy)
+            for field in fields}
 
 
 def to_iso(obj):
     """
     Converts datetime object to an ISO 8601 timestamp.
     """
-    if isinstance(obj, six.string_types) or obj is None:
+    if type(obj) is datetime:
+        # Equivalent to the checks below, without inspecting the string.
+        if obj.tzinfo is None and not obj.microsecond:
+            return obj.isoformat() + 'Z'  # UTC
+        return obj.isoformat()
+    elif isinstance(obj, six.string_types) or obj is None:
         return obj
     elif isinstance(obj, datetime):
         timestamp = obj.isoformat()
@@ -52,6 +214,20 @@ def get_config(name, overwrite=None):
     return configuration.get(name)
 
 
+def _is_plain_path(path):
+    """
+    Whether ``urljoin`` would simply append ``path`` to a base url, i.e.
+    ``path`` has neither a scheme nor dot segments.
+    """
+    end = len(path)
+    for delimiter in '?#':
+        index = path.find(delimiter)
+        if index != -1 and index < end:
+            end = index
+    head = path[:end]
+    return ':' not in head.split('/', 1)[0] and '/.' not in '/' + head
+
+
 def url_join(prefix, suffix):
 
     if not suffix:
@@ -59,8 +235,29 @@ def url_join(prefix, suffix):
     # when suffix is complete url endpoint, used in resources.base.Response
     if suffix.startswith(prefix):
         return suffix
-    # Always adding trailing slash to prefix to stack path
-    return urljoin('{}/'.format(prefix), suffix.lstrip('/'))
+    # Always adding one trailing slash to prefix to stack path
+    base = prefix.rstrip('/')
+    suffix = suffix.lstrip('/')
+    if '?' not in prefix and '#' not in prefix and _is_plain_path(suffix):
+        return '{}/{}'.format(base, suffix)
+    return urljoin('{}/'.format(base), suffix)
+
+
+def replace_api_version(url, api_version):
+    """
+    Replace the version segment, e.g. ``v1``, in the path of ``url`` with
+    ``api_version``.
+    """
+    start = url.find('://')
+    index = url.find('/', start + 3 if start != -1 else 0)
+    while index != -1:
+        end = index + 2
+        while end < len(url) and url[end].isdigit():
+            end += 1
+        if url.startswith('/v', index) and end > index + 2:
+            return '{}/v{}{}'.format(url[:index], api_version, url[end:])
+        index = url.find('/', index + 1)
+    return url
 
 
 def construct_kloudless_endpoint(path='', base_url=None, api_version=None):
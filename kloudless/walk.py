@@ -0,0 +1,157 @@
+from __future__ import unicode_literals
+
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+from . import exceptions
+
+FOLDER_CONTENTS_PATH = 'storage/folders/{}/contents'
+
+
+class TreeWalker(object):
+    """
+    Iterable that traverses a folder tree breadth-first and yields
+    ``(path, resource)`` tuples, where ``resource`` is a
+    :class:`kloudless.resources.base.Resource` instance of a file or folder.
+
+    Up to ``concurrency`` folders are listed at the same time. The contents
+    of each folder are yielded in the order the API returns them, and folders
+    are visited in breadth-first order.
+
+    The progress could be saved through :func:`checkpoint` at any time and
+    passed to a new instance with the ``checkpoint`` parameter to continue
+    from there. Resources yielded after the checkpoint was taken would be
+    yielded again.
+    """
+    def __init__(self, account, folder_id='root', path='', max_depth=None,
+                 filter=None, concurrency=4, params=None, on_error=None,
+                 checkpoint=None):
+        """
+        :param account: :class:`kloudless.account.Account` instance
+
+        :param str folder_id: ID of the folder to start with
+
+        :param str path: Path prefix of the resources under ``folder_id``
+
+        :param int max_depth: The maximum depth to descend to. ``1`` only
+            yields the contents of ``folder_id``. Unlimited by default.
+
+        :param filter: Function that accepts ``(path, resource)`` and returns
+            ``False`` to skip the resource. A skipped folder is not descended.
+
+        :param int concurrency: The maximum quantity of folders listed at the
+            same time
+
+        :param dict params: Query parameters for the folder contents
+            requests, e.g. ``{'page_size': 1000}``
+
+        :param on_error: Function that accepts ``(path, exception)``, called
+            when listing a folder failed. The folder would be skipped. The
+            exception is raised if this is not specified.
+
+        :param dict checkpoint: Value returned from :func:`checkpoint` to
+            resume a previous traversal
+        """
+        if concurrency < 1:
+            raise exceptions.InvalidParameter(
+                "concurrency must be a positive integer.")
+
+        self.account = account
+        self.max_depth = max_depth
+        self.filter = filter
+        self.concurrency = concurrency
+        self.params = params or {}
+        self.on_error = on_error
+
+        if checkpoint:
+            folders = checkpoint['folders']
+        else:
+            folders = [{'id': folder_id, 'path': path, 'depth': 0, 'skip': 0}]
+
+        self._pending = collections.deque(dict(f) for f in folders)
+        self._in_flight = collections.deque()
+        self._current = None
+
+    @property
+    def current_folder_id(self):
+        """
+        ID of the folder whose contents are being yielded, i.e. the parent of
+        the last yielded resource, or ``None`` outside of the iteration.
+        """
+        return None if self._current is None else str(self._current['id'])
+
+    def checkpoint(self):
+        """
+        Get the JSON-serializable state of the traversal.
+
+        :return: (dict) the value for the ``checkpoint`` parameter
+        """
+        folders = [] if self._current is None else [dict(self._current)]
+        folders.extend(dict(folder) for folder, _ in self._in_flight)
+        folders.extend(dict(folder) for folder in self._pending)
+        return {'folders': folders}
+
+    def _list_folder(self, folder):
+        # Only the first page is retrieved in the worker thread; the
+        # following pages are retrieved as the resources are yielded.
+        return self.account.get(
+            FOLDER_CONTENTS_PATH.format(folder['id']),
+            params=dict(self.params))
+
+    def _iter_folder(self, folder, future):
+        """
+        Yield the resources of ``folder`` after the first ``folder['skip']``
+        ones, lazily through their pages, and count them in
+        ``folder['skip']`` as they are yielded.
+        """
+        try:
+            resources = iter(future.result().get_paging_iterator())
+            for index, resource in enumerate(resources):
+                if index < folder['skip']:
+                    continue
+                folder['skip'] = index + 1
+                yield resource
+        except Exception as e:
+            if self.on_error is None:
+                raise
+            self.on_error(folder['path'], e)
+
+    def _submit(self, executor):
+        while self._pending and len(self._in_flight) < self.concurrency:
+            folder = self._pending.popleft()
+            self._in_flight.append(
+                (folder, executor.submit(self._list_folder, folder)))
+
+    def _should_descend(self, depth):
+        return self.max_depth is None or depth < self.max_depth
+
+    def __iter__(self):
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            self._submit(executor)
+            while self._in_flight:
+                folder, future = self._in_flight.popleft()
+                self._current = folder
+
+                depth = folder['depth'] + 1
+                for resource in self._iter_folder(folder, future):
+                    path = '{}/{}'.format(folder['path'],
+                                          resource.data.get('name', ''))
+                    if self.filter and not self.filter(path, resource):
+                        continue
+
+                    if (resource.data.get('type') == 'folder'
+                            and self._should_descend(depth)):
+                        self._pending.append({
+                            'id': resource.data['id'], 'path': path,
+                            'depth': depth, 'skip': 0,
+                        })
+                        self._submit(executor)
+                    yield path, resource
+
+                self._current = None
+                self._submit(executor)
+        finally:
+            for _, future in self._in_flight:
+                future.cancel()
+            executor.shutdown(wait=False)
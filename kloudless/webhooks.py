@@ -0,0 +1,343 @@
+from __future__ import unicode_literals
+
+import base64
+import hashlib
+import heapq
+import hmac
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import six
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+from six.moves.urllib.parse import parse_qs
+
+from . import exceptions
+from .account import Account
+from .concurrency import call_with_retry
+from .resources.base import empty
+from .util import logger, monotonic
+
+#: Seconds notifications of an account are coalesced before the events are
+#: retrieved.
+DEFAULT_WINDOW = 1.0
+
+#: The maximum size of a notification body in bytes.
+MAX_BODY_SIZE = 64 * 1024
+
+SIGNATURE_HEADER = 'X-Kloudless-Signature'
+
+
+def get_signature(api_key, body):
+    """
+    :param str api_key: API key of the application
+    :param bytes body: Body of the notification request
+
+    :return: str, the base64 encoded HMAC-SHA256 digest of ``body``
+    """
+    digest = hmac.new(api_key.encode('utf8'), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def verify_signature(api_key, body, signature):
+    """
+    Whether ``signature`` is the ``X-Kloudless-Signature`` header of a
+    notification with ``body`` sent to the application of ``api_key``.
+    """
+    if not signature:
+        return False
+    if isinstance(signature, six.binary_type):
+        signature = signature.decode('ascii', 'replace')
+    return hmac.compare_digest(get_signature(api_key, body), signature)
+
+
+class WebhookReceiver(object):
+    """
+    Coalesces webhook notifications per account and retrieves the new events
+    of each notified account from the Events API.
+
+    A notification schedules a retrieval ``window`` seconds later. Further
+    notifications of the account before then are dropped, and notifications
+    received while its events are being retrieved schedule one more
+    retrieval afterwards, so a burst of notifications results in one or two
+    retrievals instead of one per notification. At most ``concurrency``
+    accounts are retrieved at the same time, and at most one retrieval of
+    each account is in progress.
+
+    The events are passed to ``handle_events`` page by page, and the cursor
+    of each page is stored in ``cursors`` after it's handled, so a failed
+    retrieval continues from the last handled page. Rate limiting, server
+    and connection errors are retried; other errors are logged and retried
+    by the next notification of the account.
+
+    Activity monitoring must be enabled for the application.
+    """
+    def __init__(self, app_id, api_key, handle_events, get_account=None,
+                 cursors=None, window=DEFAULT_WINDOW, concurrency=4,
+                 retries=3, page_size=None):
+        """
+        :param str app_id: Application ID, which is the response body of
+            notifications
+        :param str api_key: API key of the application to verify signatures
+            with
+        :param handle_events: Function that accepts an account ID and a list
+            of :class:`kloudless.resources.base.Resource` of events. Called
+            from the worker threads, but not concurrently for the same
+            account.
+        :param get_account: Function that accepts an account ID and returns
+            the :class:`kloudless.account.Account` to retrieve the events
+            with. Defaults to an account authenticated with ``api_key``,
+            created once per account ID so its connections are reused.
+        :param cursors: Dict-like mapping of account IDs to the events cursor
+            to retrieve from, e.g. a :mod:`shelve`. The events of accounts
+            without a cursor are retrieved from the earliest available one.
+            Defaults to a new dict.
+        :param float window: Seconds to coalesce notifications of an account
+        :param int concurrency: The maximum quantity of accounts whose events
+            are retrieved at the same time
+        :param int retries: See :func:`kloudless.concurrency.call_with_retry`
+        :param int page_size: ``page_size`` of the events requests
+        """
+        if concurrency < 1:
+            raise exceptions.InvalidParameter(
+                "concurrency must be a positive integer.")
+
+        self.app_id = app_id
+        self.api_key = api_key
+        self.handle_events = handle_events
+        self.get_account = get_account or self._get_account
+        self.cursors = cursors if cursors is not None else {}
+        self.window = window
+        self.retries = retries
+        self.page_size = page_size
+
+        self.notification_count = 0
+        self.fetch_count = 0
+        self.error_count = 0
+
+        self._condition = threading.Condition()
+        self._cursor_lock = threading.Lock()
+        self._accounts = {}
+        self._accounts_lock = threading.Lock()
+        self._schedule = []  # heap of (deadline, account_id)
+        self._pending = set()
+        self._running = set()
+        self._dirty = set()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        self._scheduler = threading.Thread(target=self._run_scheduler)
+        self._scheduler.daemon = True
+        self._scheduler.start()
+
+    def _get_account(self, account_id):
+        with self._accounts_lock:
+            account = self._accounts.get(account_id)
+            if account is None:
+                account = Account(api_key=self.api_key, account_id=account_id)
+                self._accounts[account_id] = account
+            return account
+
+    def verify(self, body, signature):
+        """
+        See :func:`verify_signature`.
+        """
+        return verify_signature(self.api_key, body, signature)
+
+    def _add(self, account_id):
+        # Must be called with self._condition held
+        self._pending.add(account_id)
+        heapq.heappush(self._schedule,
+                       (monotonic() + self.window, account_id))
+        self._condition.notify()
+
+    def notify(self, account_id):
+        """
+        Schedule a retrieval of the events of ``account_id`` unless one is
+        scheduled already. Returns immediately.
+
+        :return: bool, whether a new retrieval was scheduled
+        """
+        account_id = str(account_id)
+        with self._condition:
+            if self._closed:
+                raise exceptions.KloudlessException(
+                    "The webhook receiver is closed.")
+            self.notification_count += 1
+            if account_id in self._pending:
+                return False
+            if account_id in self._running:
+                self._dirty.add(account_id)
+                return False
+            self._add(account_id)
+            return True
+
+    def _run_scheduler(self):
+        with self._condition:
+            while not self._closed:
+                if not self._schedule:
+                    self._condition.wait()
+                    continue
+                deadline, account_id = self._schedule[0]
+                delay = deadline - monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._schedule)
+                self._pending.discard(account_id)
+                self._running.add(account_id)
+                self._executor.submit(self._fetch, account_id)
+
+    def _get_cursor(self, account_id):
+        with self._cursor_lock:
+            return self.cursors.get(account_id)
+
+    def _set_cursor(self, account_id, cursor):
+        with self._cursor_lock:
+            self.cursors[account_id] = cursor
+
+    def fetch_events(self, account_id):
+        """
+        Retrieve the events of ``account_id`` since the stored cursor and
+        pass them to ``handle_events``. Called by the worker threads.
+
+        :return: int, the quantity of events handled
+        """
+        params = {}
+        cursor = self._get_cursor(account_id)
+        if cursor is not None:
+            params['cursor'] = cursor
+        if self.page_size:
+            params['page_size'] = self.page_size
+
+        account = self.get_account(account_id)
+        events = account.get('events', params=params)
+        count = 0
+        for page in events.get_page_iterator():
+            if page.objects:
+                self.handle_events(account_id, page.objects)
+                count += len(page.objects)
+            if (page.cursor is not empty and page.cursor is not None
+                    and str(page.cursor) != '-1' and page.cursor != cursor):
+                cursor = page.cursor
+                self._set_cursor(account_id, cursor)
+        return count
+
+    def _fetch(self, account_id):
+        try:
+            with self._condition:
+                self.fetch_count += 1
+            count = call_with_retry(lambda: self.fetch_events(account_id),
+                                    retries=self.retries)
+            logger.debug("Handled {} events of account {}".format(
+                count, account_id))
+        except Exception:
+            with self._condition:
+                self.error_count += 1
+            logger.exception(
+                "Failed to retrieve events of account {}".format(account_id))
+        finally:
+            with self._condition:
+                self._running.discard(account_id)
+                if account_id in self._dirty:
+                    self._dirty.discard(account_id)
+                    if not self._closed:
+                        self._add(account_id)
+
+    def close(self, wait=True):
+        """
+        Stop scheduling retrievals. Scheduled retrievals that have not
+        started are dropped.
+
+        :param bool wait: Whether to wait for the retrievals in progress
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._scheduler.join()
+        self._executor.shutdown(wait=wait)
+        if wait:
+            with self._accounts_lock:
+                accounts = list(self._accounts.values())
+                self._accounts.clear()
+            for account in accounts:
+                account.close()
+
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    """
+    Acknowledges notifications with the application ID once their signature
+    is verified, and leaves the rest to :class:`WebhookReceiver`.
+    """
+    # Keep connections open between notifications, and send each response
+    # in one write so it isn't delayed by Nagle's algorithm.
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def _respond(self, status, body=b''):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        receiver = self.server.receiver
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_SIZE:
+            self.close_connection = True
+            self._respond(413)
+            return
+
+        body = self.rfile.read(length)
+        if not receiver.verify(body, self.headers.get(SIGNATURE_HEADER)):
+            self._respond(403)
+            return
+
+        params = parse_qs(body.decode('utf8', 'replace'))
+        for account_id in params.get('account', []):
+            receiver.notify(account_id)
+        self._respond(200, receiver.app_id.encode('utf8'))
+
+    def log_message(self, format, *args):
+        logger.debug("Webhook server: " + format % args)
+
+
+class WebhookServer(ThreadingMixIn, HTTPServer):
+    """
+    HTTP server that receives webhook notifications in a thread per
+    connection. See :class:`WebhookReceiver`.
+    """
+    daemon_threads = True
+
+    def __init__(self, server_address, receiver,
+                 handler_class=WebhookRequestHandler):
+        """
+        :param tuple server_address: ``(host, port)`` to listen on
+        :param receiver: :class:`WebhookReceiver`
+        :param handler_class: Subclass of :class:`WebhookRequestHandler`
+        """
+        self.receiver = receiver
+        HTTPServer.__init__(self, server_address, handler_class)
+
+
+def serve_webhooks(app_id, api_key, handle_events, host='', port=8080,
+                   **kwargs):
+    """
+    Receive webhook notifications on ``host:port`` until interrupted.
+
+    :param host: Host to listen on. Defaults to all interfaces.
+    :param int port: Port to listen on
+    :param kwargs: kwargs passed to :class:`WebhookReceiver`, see it for the
+        other parameters
+    """
+    receiver = WebhookReceiver(app_id, api_key, handle_events, **kwargs)
+    server = WebhookServer((host, port), receiver)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        receiver.close()
@@ -30,7 +30,8 @@ def long_description():
 install_requires = [
     'requests>=1.0',
     'python-dateutil',
-    'six'
+    'six',
+    'futures; python_version < "3"',
 ]
 
 if __name__ == '__main__':
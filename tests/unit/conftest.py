@@ -0,0 +1,75 @@
+from __future__ import unicode_literals
+
+import io
+import json
+import threading
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from six.moves.urllib.parse import parse_qsl, urlparse
+
+from kloudless.config import configuration
+
+
+class FakeAdapter(BaseAdapter):
+    """
+    Transport that answers requests with ``handler``, which accepts the
+    method, path, query parameters and :class:`requests.PreparedRequest` and
+    returns ``(status_code, body, headers)``. Bodies that aren't bytes are
+    sent as JSON.
+    """
+    def __init__(self, handler):
+        super(FakeAdapter, self).__init__()
+        self.handler = handler
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        with self._lock:
+            self.requests.append(request)
+        url = urlparse(request.url)
+        status_code, body, headers = self.handler(
+            request.method, url.path, dict(parse_qsl(url.query)), request)
+        headers = CaseInsensitiveDict(headers or {})
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf8')
+            headers.setdefault('Content-Type', 'application/json')
+        headers.setdefault('Content-Length', str(len(body)))
+
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers = headers
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.encoding = 'utf-8'
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """
+    Route the requests of all sessions to a :class:`FakeAdapter`. Call the
+    fixture with the handler to install it.
+    """
+    def install(handler):
+        adapter = FakeAdapter(handler)
+        monkeypatch.setattr(requests.Session, 'get_adapter',
+                            lambda self, url: adapter)
+        return adapter
+    return install
+
+
+@pytest.fixture(autouse=True)
+def restore_configuration():
+    saved = dict(configuration)
+    yield configuration
+    configuration.clear()
+    configuration.update(saved)
@@ -0,0 +1,143 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from kloudless import application
+from kloudless.application import Application, TokenCache
+from kloudless.exceptions import (AuthorizationException,
+                                  TokenVerificationFailed)
+
+APP_ID = 'app-id'
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(application, 'monotonic', clock)
+    return clock
+
+
+class FakeOAuth(object):
+    """
+    Serves token information of the tokens in ``self.tokens``, and ``401``
+    for the others and for account requests with revoked tokens.
+    """
+    def __init__(self):
+        self.tokens = {'token-1': APP_ID, 'token-2': APP_ID,
+                       'other-app-token': 'other-app-id'}
+        self.token_requests = 0
+
+    def __call__(self, method, path, params, request):
+        token = request.headers['Authorization'].split(' ', 1)[1]
+        if token not in self.tokens:
+            return 401, {'message': 'Unauthorized'}, None
+        if path.endswith('/oauth/token'):
+            self.token_requests += 1
+            return 200, {'client_id': self.tokens[token],
+                         'account_id': 123, 'scope': ['storage']}, None
+        return 200, {'id': 123, 'api': 'account', 'type': 'account'}, None
+
+
+@pytest.fixture
+def oauth(fake_api):
+    oauth = FakeOAuth()
+    fake_api(oauth)
+    return oauth
+
+
+def test_token_cache_ttl(clock):
+    cache = TokenCache(ttl=10)
+    cache.set('token', {'account_id': 1})
+    clock.now += 9
+    assert cache.get('token') == {'account_id': 1}
+    clock.now += 1
+    assert cache.get('token') is None
+
+
+def test_token_cache_lru(clock):
+    cache = TokenCache(maxsize=2)
+    cache.set('a', {'id': 'a'})
+    cache.set('b', {'id': 'b'})
+    cache.get('a')
+    cache.set('c', {'id': 'c'})
+    assert cache.get('a') == {'id': 'a'}
+    assert cache.get('b') is None
+    assert cache.get('c') == {'id': 'c'}
+
+
+def test_token_cache_invalidate_and_clear(clock):
+    cache = TokenCache()
+    cache.set('a', {'id': 'a'})
+    cache.set('b', {'id': 'b'})
+    cache.invalidate('a')
+    assert cache.get('a') is None
+    assert cache.get('b') == {'id': 'b'}
+    cache.clear()
+    assert cache.get('b') is None
+
+
+def test_token_cache_returns_copies(clock):
+    cache = TokenCache()
+    data = {'scope': ['storage']}
+    cache.set('token', data)
+    data['scope'].append('calendar')
+
+    first = cache.get('token')
+    first['scope'].append('admin')
+    first['account_id'] = 456
+    assert cache.get('token') == {'scope': ['storage']}
+
+
+def test_verify_token_is_cached(oauth, clock):
+    app = Application(APP_ID)
+    data = app.verify_token('token-1')
+    data['account_id'] = 456
+    assert app.verify_token('token-1')['account_id'] == 123
+    assert oauth.token_requests == 1
+
+    assert app.verify_token('token-1', use_cache=False)['account_id'] == 123
+    assert oauth.token_requests == 2
+
+    clock.now += app.token_cache.ttl
+    app.verify_token('token-1')
+    assert oauth.token_requests == 3
+
+
+def test_verify_token_of_other_application(oauth, clock):
+    app = Application(APP_ID)
+    with pytest.raises(TokenVerificationFailed):
+        app.verify_token('other-app-token')
+    assert app.token_cache.get('other-app-token') is None
+
+
+def test_unauthorized_token_is_invalidated(oauth, clock):
+    app = Application(APP_ID)
+    app.verify_token('token-1')
+    del oauth.tokens['token-1']
+
+    with pytest.raises(AuthorizationException):
+        app.verify_token('token-1', use_cache=False)
+    assert app.token_cache.get('token-1') is None
+
+
+def test_account_invalidates_token_on_401(oauth, clock):
+    app = Application(APP_ID)
+    account = app.get_account('token-1')
+    other = app.get_account('token-2')
+    assert app.token_cache.get('token-1') is not None
+
+    del oauth.tokens['token-1']
+    with pytest.raises(AuthorizationException):
+        account.get('')
+    assert app.token_cache.get('token-1') is None
+
+    other.get('')
+    assert app.token_cache.get('token-2') is not None
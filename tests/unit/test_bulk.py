@@ -0,0 +1,59 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from kloudless import exceptions
+from kloudless.account import Account
+from kloudless.concurrency import RETRY_EXCEPTIONS
+
+
+@pytest.fixture
+def account(monkeypatch):
+    monkeypatch.setattr('kloudless.concurrency.time.sleep', lambda _: None)
+    return Account(token='token')
+
+
+def make_handler(statuses):
+    """
+    Handler that responds to each request with the next status code of
+    ``statuses``, then with ``200``.
+    """
+    statuses = list(statuses)
+
+    def handler(method, path, params, request):
+        status_code = statuses.pop(0) if statuses else 200
+        headers = {'Retry-After': '0'} if status_code == 429 else None
+        if status_code != 200:
+            return status_code, {'message': 'error'}, headers
+        return 200, {'id': 'copy', 'type': 'file', 'api': 'storage'}, None
+    return handler
+
+
+def test_copy_is_retried_on_rate_limiting(fake_api, account):
+    adapter = fake_api(make_handler([429]))
+    results = account.bulk_copy(['abc'], 'root', retries=3)
+    assert results[0].ok
+    assert len(adapter.requests) == 2
+
+
+def test_copy_is_not_retried_on_server_errors(fake_api, account):
+    adapter = fake_api(make_handler([500]))
+    results = account.bulk_copy(['abc'], 'root', retries=3)
+    assert not results[0].ok
+    assert isinstance(results[0].error, exceptions.ServerException)
+    assert len(adapter.requests) == 1
+
+
+def test_copy_retries_opt_in(fake_api, account):
+    adapter = fake_api(make_handler([500]))
+    results = account.bulk_copy(['abc'], 'root', retries=3,
+                                retry_exceptions=RETRY_EXCEPTIONS)
+    assert results[0].ok
+    assert len(adapter.requests) == 2
+
+
+def test_delete_is_retried_on_server_errors(fake_api, account):
+    adapter = fake_api(make_handler([500, 502]))
+    results = account.bulk_delete(['abc'], retries=3)
+    assert results[0].ok
+    assert len(adapter.requests) == 3
@@ -0,0 +1,157 @@
+from __future__ import unicode_literals
+
+import os
+import time
+
+import pytest
+
+from kloudless.account import Account
+from kloudless.cache import ContentCache
+from kloudless.client import Client
+from kloudless.exceptions import InvalidParameter
+from kloudless.resources.base import Resource
+
+# Bearer token -> account ID
+TOKENS = {'token-1': 1, 'token-2': 2, 'token-1b': 1}
+
+
+class FakeStorage(object):
+    """
+    Serves the account of each token and file contents that differ per
+    account.
+    """
+    def __init__(self):
+        self.downloads = 0
+        self.account_requests = 0
+
+    def __call__(self, method, path, params, request):
+        token = request.headers['Authorization'].split(' ', 1)[1]
+        account_id = TOKENS.get(token)
+        if path.endswith('/accounts/me'):
+            self.account_requests += 1
+            return 200, {'id': account_id, 'api': 'account',
+                         'type': 'account'}, None
+        if path.endswith('/contents') or path.endswith('/thumbnail'):
+            self.downloads += 1
+            body = 'contents of {} for account {}'.format(
+                path, account_id).encode('utf8')
+            return 200, body, {'Content-Type': 'application/octet-stream'}
+        file_id = path.rsplit('/', 1)[1]
+        return 200, {'id': file_id, 'name': file_id, 'type': 'file',
+                     'api': 'storage'}, None
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return ContentCache(str(tmpdir.join('cache')))
+
+
+@pytest.fixture
+def storage(fake_api):
+    storage = FakeStorage()
+    fake_api(storage)
+    return storage
+
+
+def test_get_put(cache):
+    assert cache.get('key', 'v1') is None
+    content = cache.put('key', 'v1', [b'abc', b'def'])
+    assert content[:] == b'abcdef'
+    assert cache.get('key', 'v1')[:] == b'abcdef'
+    assert cache.get('key', 'v2') is None
+    assert cache.get('other', 'v1') is None
+
+    assert cache.put('empty', 'v1', []) == b''
+    assert cache.get('empty', 'v1') == b''
+
+
+def test_evict_least_recently_used(tmpdir):
+    cache = ContentCache(str(tmpdir.join('cache')), max_size=100)
+    cache.put('a', 1, [b'a' * 40])
+    cache.put('b', 1, [b'b' * 40])
+    # Make the recency of the entries distinguishable
+    for key, age in (('a', 20), ('b', 10)):
+        path = cache._get_path(key, 1)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+    cache.get('a', 1)
+
+    cache.put('c', 1, [b'c' * 40])
+    assert cache.get('a', 1) is not None
+    assert cache.get('b', 1) is None
+    assert cache.get('c', 1) is not None
+
+
+def test_clear(cache):
+    cache.put('a', 1, [b'a'])
+    cache.clear()
+    assert cache.get('a', 1) is None
+
+
+def test_size_is_restored(cache):
+    cache.put('a', 1, [b'a' * 30])
+    assert ContentCache(cache.directory)._size == 30
+
+
+def test_fetch(cache, storage):
+    account = Account(token='token-1')
+    path = 'storage/files/abc/contents'
+    content = cache.fetch(account, path, 'v1')
+    assert content[:] == b'contents of /v1/accounts/me/' + path.encode(
+        'ascii') + b' for account 1'
+    assert cache.fetch(account, path, 'v1')[:] == content[:]
+    assert storage.downloads == 1
+    assert storage.account_requests == 1
+
+    cache.fetch(account, path, 'v2')
+    cache.fetch(account, 'storage/files/abc/thumbnail', 'v1',
+                params={'size': 64})
+    assert storage.downloads == 3
+
+
+def test_fetch_is_keyed_by_account(cache, storage):
+    path = 'storage/files/abc/contents'
+    content = cache.fetch(Account(token='token-1'), path, 'v1')[:]
+
+    other = cache.fetch(Account(token='token-2'), path, 'v1')[:]
+    assert other != content
+    assert other.endswith(b'account 2')
+
+    # Another token of the same account shares the entry
+    same = cache.fetch(Account(token='token-1b'), path, 'v1')[:]
+    assert same == content
+    assert storage.downloads == 2
+
+
+def test_fetch_of_client_is_keyed_by_credential(cache, storage):
+    path = 'meta/licenses/abc/contents'
+    cache.fetch(Client(token='token-1'), path, 'v1')
+    cache.fetch(Client(token='token-1'), path, 'v1')
+    cache.fetch(Client(token='token-2'), path, 'v1')
+    assert storage.downloads == 2
+    assert storage.account_requests == 0
+
+
+def test_fetch_rejects_other_urls(cache):
+    with pytest.raises(InvalidParameter):
+        cache.fetch(Account(token='token-1'), 'storage/files/abc', 'v1')
+
+
+def test_fetch_file(cache, storage):
+    account = Account(token='token-1')
+    resource = Resource(
+        data={'id': 'abc', 'name': 'abc', 'type': 'file', 'api': 'storage',
+              'modified': '2020-01-01T00:00:00Z'},
+        url=account._compose_url('storage/files/abc'), client=account)
+    content = cache.fetch_file(account, resource)[:]
+    assert cache.fetch_file(account, resource)[:] == content
+    assert storage.downloads == 1
+
+
+def test_fetch_file_without_modified_is_not_cached(cache, storage):
+    account = Account(token='token-1')
+    content = cache.fetch_file(account, 'abc')
+    assert content.endswith(b'account 1')
+    assert cache.fetch_file(account, 'abc') == content
+    assert storage.downloads == 2
+    assert list(cache._scan()) == []
@@ -0,0 +1,156 @@
+from __future__ import unicode_literals
+
+import datetime
+import threading
+import time
+
+import pytest
+
+from kloudless.account import Account
+from kloudless.calendars import get_start_key, merge_calendar_events
+from kloudless.concurrency import merge_sorted
+from kloudless.exceptions import NotFoundException
+
+START = datetime.datetime(2020, 1, 1)
+END = datetime.datetime(2020, 2, 1)
+
+# Bearer token -> calendar ID -> start times of its events, in order
+CALENDARS = {
+    'token-1': {
+        'primary': ['2020-01-01', '2020-01-02T09:00:00Z',
+                    '2020-01-05T10:00:00+02:00', '2020-01-09T00:00:00Z'],
+        'work': ['2020-01-02T08:00:00Z', '2020-01-05T09:00:00Z'],
+    },
+    'token-2': {
+        'primary': ['2020-01-03T00:00:00Z', '2020-01-05T08:30:00Z'],
+    },
+}
+
+
+class FakeCalendars(object):
+    """
+    Serves the calendars and events of ``CALENDARS``, two events per page,
+    and records the query parameters of the events requests.
+    """
+    def __init__(self):
+        self.params = []
+
+    def __call__(self, method, path, params, request):
+        token = request.headers['Authorization'].split(' ', 1)[1]
+        calendars = CALENDARS[token]
+        page = int(params.get('page', 1))
+        if path.endswith('/cal/calendars'):
+            objects = [{'id': calendar_id, 'type': 'calendar',
+                        'api': 'calendar'}
+                       for calendar_id in sorted(calendars)]
+            return 200, {'type': 'object_list', 'api': 'calendar',
+                         'objects': objects, 'page': 1,
+                         'next_page': None}, None
+
+        calendar_id = path.split('/')[-2]
+        if calendar_id not in calendars:
+            return 404, {'message': 'Not found'}, None
+        self.params.append(params)
+        starts = calendars[calendar_id]
+        objects = [
+            {'id': '{}/{}/{}'.format(token, calendar_id, index),
+             'type': 'event', 'api': 'calendar', 'start': starts[index]}
+            for index in range((page - 1) * 2, min(page * 2, len(starts)))]
+        return 200, {'type': 'object_list', 'api': 'calendar',
+                     'objects': objects, 'page': page,
+                     'next_page': page + 1 if page * 2 < len(starts)
+                     else None}, None
+
+
+@pytest.fixture
+def calendars(fake_api):
+    calendars = FakeCalendars()
+    fake_api(calendars)
+    return calendars
+
+
+def event_ids(events):
+    return [item.event.data['id'] for item in events]
+
+
+def test_merge_calendars_of_accounts(calendars):
+    first, second = Account(token='token-1'), Account(token='token-2')
+    events = list(merge_calendar_events([first, second], START, END))
+    assert event_ids(events) == [
+        'token-1/primary/0',
+        'token-1/work/0',
+        'token-1/primary/1',
+        'token-2/primary/0',
+        'token-1/primary/2',
+        'token-2/primary/1',
+        'token-1/work/1',
+        'token-1/primary/3',
+    ]
+    assert events[0].account is first
+    assert events[0].calendar_id == 'primary'
+    assert all(params['start'] == '2020-01-01T00:00:00Z'
+               and params['end'] == '2020-02-01T00:00:00Z'
+               for params in calendars.params)
+
+
+def test_merge_given_calendars(calendars):
+    first, second = Account(token='token-1'), Account(token='token-2')
+    events = merge_calendar_events(
+        [(first, 'work'), (second, 'primary'), (first, 'work')],
+        '2020-01-01T00:00:00Z', '2020-02-01T00:00:00Z', page_size=2,
+        concurrency=1)
+    assert event_ids(events) == [
+        'token-1/work/0', 'token-2/primary/0', 'token-2/primary/1',
+        'token-1/work/1']
+    assert all(params['page_size'] == '2' for params in calendars.params)
+
+
+def test_get_calendar_events(calendars):
+    account = Account(token='token-1')
+    assert len(list(account.get_calendar_events(START, END))) == 6
+    assert event_ids(account.get_calendar_events(
+        START, END, calendar_ids=['work'])) == [
+        'token-1/work/0', 'token-1/work/1']
+
+
+def test_errors_are_raised(calendars):
+    account = Account(token='token-1')
+    with pytest.raises(NotFoundException):
+        list(account.get_calendar_events(
+            START, END, calendar_ids=['primary', 'missing']))
+
+
+def test_get_start_key():
+    assert get_start_key({}) == datetime.datetime.min
+    assert get_start_key({'start': '2020-01-05T10:00:00+02:00'}) == (
+        datetime.datetime(2020, 1, 5, 8))
+    assert get_start_key({'start': '2020-01-05'}) == (
+        datetime.datetime(2020, 1, 5))
+
+
+def test_merge_sorted():
+    merged = merge_sorted([[1, 4, 7], [2, 5], [], [3, 4]])
+    assert list(merged) == [1, 2, 3, 4, 4, 5, 7]
+
+    merged = merge_sorted([['b1'], ['a2', 'b2'], ['a3']],
+                          key=lambda item: item[1])
+    assert list(merged) == ['b1', 'a2', 'b2', 'a3']
+
+
+def test_merge_sorted_concurrency():
+    lock = threading.Lock()
+    state = {'active': 0, 'max': 0}
+
+    def produce(values):
+        for value in values:
+            with lock:
+                state['active'] += 1
+                state['max'] = max(state['max'], state['active'])
+            time.sleep(0.01)
+            with lock:
+                state['active'] -= 1
+            yield value
+
+    iterables = [produce(range(index, 20, 4)) for index in range(4)]
+    assert list(merge_sorted(iterables, concurrency=2)) == list(range(20))
+    assert state['max'] <= 2
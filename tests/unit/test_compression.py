@@ -0,0 +1,121 @@
+from __future__ import unicode_literals
+
+import gzip
+import io
+import json
+
+import pytest
+
+from kloudless.account import Account
+from kloudless.compression import accepts_gzip, gzip_compress
+
+LARGE = {'name': 'x' * 2000}
+SMALL = {'name': 'x'}
+
+
+def gzip_decompress(data):
+    with gzip.GzipFile(fileobj=io.BytesIO(data), mode='rb') as f:
+        return f.read()
+
+
+class FakeAPI(object):
+    """
+    Echoes JSON request bodies, decompressing gzip encoded ones, and
+    advertises gzip support of request bodies if ``accept_gzip`` is set.
+    """
+    def __init__(self, accept_gzip=True):
+        self.accept_gzip = accept_gzip
+        self.encodings = []
+
+    def __call__(self, method, path, params, request):
+        encoding = request.headers.get('Content-Encoding')
+        self.encodings.append(encoding)
+        body = request.body or b'{}'
+        if encoding == 'gzip':
+            body = gzip_decompress(body)
+        headers = {'Accept-Encoding': 'gzip'} if self.accept_gzip else None
+        return 200, json.loads(body.decode('utf8')), headers
+
+
+@pytest.fixture
+def api(fake_api):
+    api = FakeAPI()
+    fake_api(api)
+    return api
+
+
+def test_compression_after_gzip_support_is_advertised(api):
+    account = Account(token='token')
+    assert account.post('storage/files', json=LARGE).data == LARGE
+    assert account.post('storage/files', json=LARGE).data == LARGE
+    assert account.post('storage/files', json=SMALL).data == SMALL
+    assert api.encodings == [None, 'gzip', None]
+
+
+def test_no_compression_without_gzip_support(fake_api):
+    api = FakeAPI(accept_gzip=False)
+    fake_api(api)
+    account = Account(token='token')
+    account.post('storage/files', json=LARGE)
+    account.post('storage/files', json=LARGE)
+    assert api.encodings == [None, None]
+
+
+@pytest.mark.parametrize('compress_requests, encodings', [
+    (True, ['gzip', 'gzip']),
+    (False, [None, None]),
+])
+def test_compress_requests(api, compress_requests, encodings):
+    account = Account(token='token', compress_requests=compress_requests)
+    assert account.post('storage/files', json=LARGE).data == LARGE
+    assert account.post('storage/files', json=LARGE).data == LARGE
+    assert api.encodings == encodings
+
+
+def test_compression_min_size(api):
+    body = json.dumps(LARGE).encode('utf8')
+    account = Account(token='token', compress_requests=True,
+                      compression_min_size=len(body) + 1)
+    account.post('storage/files', json=LARGE)
+    account.compression_min_size = len(body)
+    account.post('storage/files', json=LARGE)
+    assert api.encodings == [None, 'gzip']
+
+
+def test_data_bodies_are_not_compressed(api):
+    account = Account(token='token', compress_requests=True)
+    account.post('storage/files', data=json.dumps(LARGE).encode('utf8'))
+    assert api.encodings == [None]
+
+
+def test_compression_stats(api):
+    account = Account(token='token', compress_requests=True)
+    account.post('storage/files', json=LARGE)
+    stats = account.compression_stats
+    size = len(json.dumps(LARGE).encode('utf8'))
+    assert stats.request_bytes == size
+    assert 0 < stats.request_bytes_sent < size
+    assert stats.request_bytes_saved == size - stats.request_bytes_sent
+    assert stats.response_bytes == stats.response_bytes_received > 0
+
+    stats.reset()
+    assert stats.request_bytes == stats.response_bytes == 0
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, False),
+    ('', False),
+    ('gzip', True),
+    ('identity, GZIP', True),
+    ('gzip;q=0.5', True),
+    ('gzip;q=0', False),
+    ('deflate, br', False),
+])
+def test_accepts_gzip(value, expected):
+    headers = {'Accept-Encoding': value} if value is not None else {}
+    assert accepts_gzip(headers) is expected
+
+
+def test_gzip_compress():
+    data = b'data' * 1000
+    assert gzip_decompress(gzip_compress(data)) == data
@@ -0,0 +1,153 @@
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import os
+
+import pytest
+
+from kloudless.account import Account
+from kloudless.bulk import SKIPPED
+from kloudless.dedup import LOCAL_ACCOUNT, ContentHashIndex
+from kloudless.transfer import upload_file
+
+# Bearer token -> account ID
+TOKENS = {'source': 1, 'destination': 2}
+
+
+def read_body(body):
+    if body is None or isinstance(body, bytes):
+        return body or b''
+    if hasattr(body, 'read'):
+        return body.read()
+    return b''.join(body)
+
+
+class FakeStorage(object):
+    """
+    Serves the files in ``self.files`` and stores uploads.
+    """
+    def __init__(self):
+        self.files = {'a': b'contents of a', 'b': b'contents of b'}
+        self.uploads = []
+        self.account_requests = 0
+
+    def __call__(self, method, path, params, request):
+        token = request.headers['Authorization'].split(' ', 1)[1]
+        if path.endswith('/accounts/me'):
+            self.account_requests += 1
+            return 200, {'id': TOKENS[token], 'api': 'account',
+                         'type': 'account'}, None
+        if method == 'GET' and path.endswith('/contents'):
+            file_id = path.split('/')[-2]
+            return 200, self.files[file_id], {
+                'Content-Type': 'application/octet-stream'}
+        if method == 'GET':
+            file_id = path.rsplit('/', 1)[1]
+            return 200, self.get_metadata(file_id), None
+
+        body = read_body(request.body)
+        metadata = json.loads(request.headers['X-Kloudless-Metadata'])
+        self.uploads.append((metadata['name'], body))
+        return 201, {'id': 'new-{}'.format(len(self.uploads)),
+                     'name': metadata['name'], 'type': 'file',
+                     'api': 'storage', 'size': len(body),
+                     'modified': '2020-01-01T00:00:00Z'}, None
+
+    def get_metadata(self, file_id):
+        return {'id': file_id, 'name': file_id + '.txt', 'type': 'file',
+                'api': 'storage', 'size': len(self.files[file_id]),
+                'modified': '2020-01-01T00:00:00Z'}
+
+
+@pytest.fixture
+def storage(fake_api):
+    storage = FakeStorage()
+    fake_api(storage)
+    return storage
+
+
+@pytest.fixture
+def index():
+    index = ContentHashIndex()
+    yield index
+    index.close()
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_get_and_record(index):
+    assert index.get('1', 'a') is None
+    index.record('1', 'a', 10, 'm1', 'hash')
+    assert index.get('1', 'a') == 'hash'
+    assert index.get('1', 'a', 10, 'm1') == 'hash'
+    assert index.get('1', 'a', 11, 'm1') is None
+    assert index.get('1', 'a', 10, 'm2') is None
+    assert index.get('2', 'a') is None
+
+    assert index.is_uploaded('hash', '1', 'a')
+    assert not index.is_uploaded('other', '1', 'a')
+    assert not index.is_uploaded(None, '1', 'b')
+
+
+def test_persistence(tmpdir):
+    path = str(tmpdir.join('index.db'))
+    index = ContentHashIndex(path)
+    index.record('1', 'a', 10, 'm1', 'hash')
+    index.close()
+
+    index = ContentHashIndex(path)
+    assert index.get('1', 'a', 10, 'm1') == 'hash'
+    index.close()
+
+
+def test_account_key(storage, index):
+    assert index.get_account_key(Account(token='source', account_id=5)) == '5'
+    account = Account(token='source')
+    assert index.get_account_key(account) == '1'
+    assert index.get_account_key(account) == '1'
+    assert index.get_account_key(Account(token='destination')) == '2'
+    assert storage.account_requests == 2
+
+
+def test_transfer_skips_unchanged_contents(storage, index):
+    source = Account(token='source')
+    destination = Account(token='destination')
+    results = source.bulk_transfer(['a', 'b'], destination, 'root',
+                                   index=index)
+    assert not any(result.skipped for result in results)
+    assert len(storage.uploads) == 2
+    assert index.get('1', 'a') == sha256(storage.files['a'])
+    assert index.get('2', 'root/a.txt') == sha256(storage.files['a'])
+
+    storage.files['b'] = b'changed contents of b'
+    results = source.bulk_transfer(['a', 'b'], destination, 'root',
+                                   index=index)
+    assert [result.skipped for result in results] == [True, False]
+    assert storage.uploads[2] == ('b.txt', storage.files['b'])
+
+    # Another destination folder
+    results = source.bulk_transfer(['a'], destination, 'other', index=index)
+    assert not results[0].skipped
+    assert len(storage.uploads) == 4
+
+
+def test_upload_file_skips_unchanged_contents(storage, index, tmpdir):
+    account = Account(token='destination')
+    path = str(tmpdir.join('report.txt'))
+    with open(path, 'wb') as f:
+        f.write(b'report')
+
+    assert upload_file(account, path, 'root', index=index) is not SKIPPED
+    assert upload_file(account, path, 'root', index=index) is SKIPPED
+    assert index.get(LOCAL_ACCOUNT, path) == sha256(b'report')
+    assert len(storage.uploads) == 1
+
+    with open(path, 'wb') as f:
+        f.write(b'changed report')
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert upload_file(account, path, 'root', index=index) is not SKIPPED
+    assert storage.uploads[1] == ('report.txt', b'changed report')
@@ -0,0 +1,143 @@
+from __future__ import unicode_literals
+
+import datetime
+import io
+import json
+
+import pytest
+
+from kloudless import export
+from kloudless.account import Account
+
+
+def make_file(index):
+    return {'id': 'file-{}'.format(index), 'name': '{}.txt'.format(index),
+            'type': 'file', 'api': 'storage', 'size': index,
+            'modified': '2020-01-01T02:00:00+02:00',
+            'parent': {'id': 'root'}, 'downloadable': True}
+
+
+FILES = [make_file(index) for index in range(5)]
+# Files of each page
+PAGES = {1: FILES[:2], 2: FILES[2:4], 3: FILES[4:]}
+EVENTS = [
+    {'id': 'event-1', 'type': 'add', 'account': 123,
+     'modified': '2020-01-01T00:00:00Z', 'metadata': make_file(1)},
+    {'id': 'event-2', 'type': 'delete', 'account': 123,
+     'modified': '2020-01-02T00:00:00Z', 'metadata': {'id': 'file-2'}},
+]
+
+
+class FakeStorage(object):
+    """
+    Serves ``PAGES`` as the contents of the root folder, and ``EVENTS`` one
+    per page.
+    """
+    def __init__(self):
+        self.pages = []
+
+    def __call__(self, method, path, params, request):
+        if path.endswith('/events'):
+            index = int(params.get('cursor', 0))
+            objects = EVENTS[index:index + 1]
+            return 200, {'type': 'object_list', 'api': 'events',
+                         'objects': objects, 'cursor': index + 1,
+                         'count': len(objects)}, None
+        page = int(params.get('page', 1))
+        self.pages.append(page)
+        return 200, {'type': 'object_list', 'api': 'storage', 'page': page,
+                     'next_page': page + 1 if page < len(PAGES) else None,
+                     'objects': PAGES[page]}, None
+
+
+@pytest.fixture
+def storage(fake_api):
+    storage = FakeStorage()
+    fake_api(storage)
+    return storage
+
+
+@pytest.fixture
+def account():
+    return Account(token='token')
+
+
+def get_contents(account):
+    return account.get('storage/folders/root/contents')
+
+
+def test_iter_objects(storage, account):
+    assert list(export.iter_objects(get_contents(account))) == FILES
+    assert [data['id'] for data in export.iter_objects(
+        get_contents(account), max_resources=3)] == [
+        'file-0', 'file-1', 'file-2']
+    # Pages after the limit are not retrieved
+    assert storage.pages == [1, 2, 3, 1, 2]
+
+
+def test_export_ndjson(storage, account, tmpdir):
+    out = io.StringIO()
+    assert export.export_ndjson(get_contents(account), out) == 5
+    lines = out.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == FILES
+
+    path = str(tmpdir.join('export.ndjson'))
+    assert export.export_ndjson(get_contents(account), path,
+                                max_resources=2) == 2
+    with io.open(path, encoding='utf8') as f:
+        assert [json.loads(line) for line in f] == FILES[:2]
+
+
+def test_record_batches(storage, account):
+    pytest.importorskip('pyarrow')
+    batches = list(export.iter_record_batches(get_contents(account),
+                                              batch_size=2))
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+
+    rows = [row for batch in batches for row in batch.to_pylist()]
+    assert [row['id'] for row in rows] == [data['id'] for data in FILES]
+    assert rows[1]['size'] == 1
+    assert rows[1]['parent_id'] == 'root'
+    assert rows[1]['downloadable'] is True
+    assert rows[1]['owner_id'] is None
+    assert rows[1]['modified'].replace(tzinfo=None) == datetime.datetime(
+        2020, 1, 1, 0, 0)
+
+
+def test_event_columns(storage, account):
+    pytest.importorskip('pyarrow')
+    events = account.get('events', params={'cursor': 0})
+    assert export.get_default_columns(events) == export.EVENT_COLUMNS
+    rows = [row for batch in export.iter_record_batches(events)
+            for row in batch.to_pylist()]
+    assert [row['id'] for row in rows] == ['event-1', 'event-2']
+    assert rows[0]['account'] == '123'
+    assert rows[0]['metadata_parent_id'] == 'root'
+    assert rows[1]['metadata_id'] == 'file-2'
+    assert rows[1]['metadata_name'] is None
+
+
+def test_export_arrow(storage, account):
+    pa = pytest.importorskip('pyarrow')
+    sink = io.BytesIO()
+    columns = [export.Column('id', 'string', ('id',)),
+               export.Column('size', 'int64', ('size',))]
+    assert export.export_arrow(get_contents(account), sink,
+                               columns=columns) == 5
+
+    table = pa.ipc.open_stream(sink.getvalue()).read_all()
+    assert table.column_names == ['id', 'size']
+    assert table.column('size').to_pylist() == [0, 1, 2, 3, 4]
+
+
+def test_export_parquet(storage, account, tmpdir):
+    pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmpdir.join('export.parquet'))
+    assert export.export_parquet(get_contents(account), path,
+                                 batch_size=2) == 5
+
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.num_row_groups == 3
+    assert parquet_file.read().column('id').to_pylist() == [
+        data['id'] for data in FILES]
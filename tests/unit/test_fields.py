@@ -0,0 +1,106 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from kloudless.account import Account
+from kloudless.resources.base import ResponseInfo
+
+KEPT = {'id', 'api', 'type', 'name'}
+
+
+def make_file(file_id):
+    return {'id': file_id, 'name': file_id + '.txt', 'type': 'file',
+            'api': 'storage', 'size': 10, 'raw': {'large': 'x' * 100},
+            'parent': {'id': 'root'}}
+
+
+class FakeStorage(object):
+    """
+    Serves a file, and the root folder contents in two pages.
+    """
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, method, path, params, request):
+        self.requests.append((path, params))
+        if '/files/' in path:
+            return 200, make_file(path.rsplit('/', 1)[1]), None
+        page = int(params.get('page', 1))
+        return 200, {'type': 'object_list', 'api': 'storage', 'page': page,
+                     'next_page': 2 if page == 1 else None,
+                     'objects': [make_file('{}-{}'.format(page, index))
+                                 for index in range(2)]}, None
+
+
+@pytest.fixture
+def storage(fake_api):
+    storage = FakeStorage()
+    fake_api(storage)
+    return storage
+
+
+@pytest.fixture
+def account():
+    return Account(token='token')
+
+
+@pytest.fixture(params=[False, True], ids=['default', 'lean'])
+def lean_responses(request, restore_configuration):
+    restore_configuration['lean_responses'] = request.param
+    return request.param
+
+
+def test_resource_fields(storage, account, lean_responses):
+    resource = account.get('storage/files/abc', fields=['name'])
+    assert set(resource.data) == KEPT
+    assert set(resource.fields) == KEPT | {'href'}
+    assert isinstance(resource.response, ResponseInfo) == lean_responses
+    assert resource.status_code == 200
+
+    resource.refresh()
+    assert set(resource.data) == KEPT
+    assert isinstance(resource.response, ResponseInfo) == lean_responses
+
+    assert 'size' in account.get('storage/files/abc').data
+
+
+def test_listing_fields(storage, account, lean_responses):
+    contents = account.get('storage/folders/root/contents', fields=['name'])
+    assert all(set(resource.data) == KEPT for resource in contents)
+    assert isinstance(contents.response, ResponseInfo) == lean_responses
+
+    next_page = contents.get_next_page()
+    assert [resource.data['id'] for resource in next_page] == ['2-0', '2-1']
+    assert all(set(resource.data) == KEPT for resource in next_page)
+
+
+def test_paging_iterator_fields(storage, account, lean_responses):
+    contents = account.get('storage/folders/root/contents')
+    resources = list(contents.get_paging_iterator(fields=['size']))
+    assert len(resources) == 4
+    # The first page is not projected again
+    assert 'raw' in resources[0].data
+    assert set(resources[2].data) == {'id', 'api', 'type', 'size'}
+
+
+def test_fields_query_param(storage, account, restore_configuration):
+    account.get('storage/files/abc', fields=['name', 'size'])
+    assert storage.requests[-1][1] == {}
+
+    restore_configuration['fields_query_param'] = 'fields'
+    contents = account.get('storage/folders/root/contents',
+                           fields=['name', 'size'])
+    contents.get_next_page()
+    fields = 'name,size,id,href,api,type'
+    assert storage.requests[-2][1] == {'fields': fields}
+    assert storage.requests[-1][1] == {'fields': fields, 'page': '2'}
+
+
+def test_release_response(storage, account):
+    resource = account.get('storage/files/abc')
+    raw_response = resource.response
+    resource.release_response()
+    assert isinstance(resource.response, ResponseInfo)
+    assert resource.headers['Content-Type'] == 'application/json'
+    assert resource.request_info.url == raw_response.request.url
+    assert 'Authorization' not in resource.request_info.headers
@@ -0,0 +1,54 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from kloudless import application
+from kloudless.account import Account, get_verified_account
+from kloudless.exceptions import TokenVerificationFailed
+from kloudless.resources.base import ResponseInfo
+
+APP_ID = 'app-id'
+TOKEN = 'token'
+
+
+def handle_oauth(method, path, params, request):
+    if path.endswith('/oauth/token') and method == 'GET':
+        return 200, {'client_id': APP_ID, 'account_id': 123}, None
+    if path.endswith('/oauth/token') and method == 'POST':
+        return 200, {'access_token': TOKEN, 'token_type': 'Bearer'}, None
+    return 404, {'message': 'Not found'}, None
+
+
+@pytest.fixture(autouse=True)
+def lean_responses(restore_configuration, fake_api):
+    restore_configuration['lean_responses'] = True
+    fake_api(handle_oauth)
+
+
+def test_verify_token():
+    data = application.verify_token(APP_ID, TOKEN)
+    assert data['account_id'] == 123
+
+
+def test_verify_token_of_other_application():
+    with pytest.raises(TokenVerificationFailed):
+        application.verify_token('other-app-id', TOKEN)
+
+
+def test_get_verified_account():
+    account = get_verified_account(APP_ID, TOKEN)
+    assert isinstance(account, Account)
+
+
+def test_get_token_from_code():
+    token = application.get_token_from_code(
+        APP_ID, 'api-key', 'state', 'https://example.com/callback',
+        state='state', code='code')
+    assert token == TOKEN
+
+
+def test_response_is_released():
+    account = Account(token=TOKEN)
+    response = account.get('oauth/token', api_version=1)
+    assert isinstance(response.response, ResponseInfo)
+    assert response.data['client_id'] == APP_ID
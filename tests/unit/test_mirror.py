@@ -0,0 +1,157 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from kloudless.account import Account
+from kloudless.exceptions import InvalidParameter
+from kloudless.mirror import MirrorIndex
+
+ROOT_ID = 'real-root'
+
+
+def make_resource(id, name, parent_id, type='file', size=None,
+                  modified='2020-01-01T00:00:00Z'):
+    data = {'id': id, 'name': name, 'type': type, 'api': 'storage',
+            'parent': {'id': parent_id}, 'modified': modified}
+    if type == 'file':
+        data['size'] = size
+    return data
+
+
+# The "root" alias has the ID ROOT_ID in the parent of its contents. Both
+# folders are named "docs", and a file name contains '/'.
+TREE = {
+    'root': [
+        make_resource('docs-1', 'docs', ROOT_ID, 'folder'),
+        make_resource('docs-2', 'docs', ROOT_ID, 'folder'),
+        make_resource('slash', 'a/b.txt', ROOT_ID, size=1),
+    ],
+    'docs-1': [make_resource('f1', 'one.txt', 'docs-1', size=10)],
+    'docs-2': [
+        make_resource('f2', 'two.txt', 'docs-2', size=100),
+        make_resource('sub', 'sub', 'docs-2', 'folder'),
+    ],
+    'sub': [make_resource('f3', 'three.txt', 'sub', size=1000)],
+}
+
+
+class FakeAccount(object):
+    """
+    Handler serving ``TREE`` and the events in ``self.events``.
+    """
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, method, path, params, request):
+        if path.endswith('/events/latest'):
+            return 200, {'cursor': 'c0'}, None
+        if path.endswith('/events'):
+            objects = self.events if params['cursor'] == 'c0' else []
+            return 200, {'type': 'object_list', 'api': 'events',
+                         'objects': objects, 'cursor': 'c1',
+                         'count': len(objects)}, None
+        folder_id = path.split('/folders/')[1].split('/')[0]
+        return 200, {'type': 'object_list', 'api': 'storage',
+                     'objects': TREE[folder_id], 'page': 1,
+                     'next_page': None}, None
+
+
+@pytest.fixture
+def handler(fake_api):
+    handler = FakeAccount()
+    fake_api(handler)
+    return handler
+
+
+@pytest.fixture
+def index(handler):
+    index = MirrorIndex(Account(token='token'))
+    yield index
+    index.close()
+
+
+def get_parent_id(index, resource_id):
+    return index.query('SELECT parent_id FROM resources WHERE id = ?',
+                       (resource_id,))[0]['parent_id']
+
+
+def test_build(index):
+    assert index.build() == 7
+    assert index.root_id == 'root'
+    assert index.cursor == 'c0'
+
+    # Siblings with the same name keep their own children
+    assert get_parent_id(index, 'f1') == 'docs-1'
+    assert get_parent_id(index, 'f2') == 'docs-2'
+    assert get_parent_id(index, 'f3') == 'sub'
+    assert get_parent_id(index, 'slash') == 'root'
+    assert index.get('slash')['name'] == 'a/b.txt'
+    assert index.get_by_path('/docs/sub/three.txt')['id'] == 'f3'
+
+
+def test_total_size(index):
+    index.build()
+    assert index.total_size() == 1111
+    assert index.total_size('docs-1') == 10
+    assert index.total_size('docs-2') == 1100
+    assert index.total_size('sub') == 1000
+
+
+def test_apply_event(index):
+    index.build()
+
+    # Created in the root, through the ID of the alias
+    index.apply_event({'type': 'add', 'metadata': make_resource(
+        'new', 'new.txt', ROOT_ID, size=5)})
+    assert index.get_by_path('/new.txt')['id'] == 'new'
+    assert index.total_size() == 1116
+
+    # A moved and renamed folder moves its descendants
+    index.apply_event({'type': 'move', 'metadata': make_resource(
+        'sub', 'moved', 'docs-1', 'folder')})
+    assert index.get_by_path('/docs/moved/three.txt')['id'] == 'f3'
+    assert index.total_size('docs-1') == 1010
+
+    # Moved out of the indexed tree
+    index.apply_event({'type': 'move', 'metadata': make_resource(
+        'f2', 'two.txt', 'elsewhere', size=100)})
+    assert index.get('f2') is None
+
+    # A deleted folder deletes its descendants
+    index.apply_event({'type': 'delete', 'metadata': {'id': 'docs-1'}})
+    assert index.get('docs-1') is None
+    assert index.get('f3') is None
+    assert index.total_size() == 6
+
+    # Events of other APIs are ignored
+    index.apply_event({'type': 'add', 'metadata': {
+        'id': 'event', 'api': 'calendar', 'type': 'event'}})
+    assert index.get('event') is None
+
+
+def test_sync(index, handler):
+    index.build()
+    handler.events = [
+        {'type': 'add', 'metadata': make_resource(
+            'new', 'new.txt', 'docs-2', size=5)},
+        {'type': 'delete', 'metadata': {'id': 'slash'}},
+    ]
+    assert index.sync() == 2
+    assert index.cursor == 'c1'
+    assert index.get_by_path('/docs/new.txt')['id'] == 'new'
+    assert index.get('slash') is None
+    assert index.total_size() == 1115
+
+
+def test_sync_before_build(index):
+    with pytest.raises(InvalidParameter):
+        index.sync()
+
+
+def test_modified_since(index):
+    index.build()
+    index.apply_event({'type': 'add', 'metadata': make_resource(
+        'new', 'new.txt', ROOT_ID, size=5,
+        modified='2021-06-01T02:00:00+02:00')})
+    assert [data['id'] for data in index.modified_since(
+        '2021-06-01T00:00:00Z', type='file')] == ['new']
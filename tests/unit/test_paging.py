@@ -0,0 +1,58 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from kloudless.account import Account
+from kloudless.paging import AdaptivePageSize
+
+
+def make_listing(next_pages, default_page_size=20):
+    """
+    Handler of a listing whose pages link to each other through the
+    ``next_page`` values in ``next_pages``.
+    """
+    pages = {None: 0}
+    pages.update((str(token), index + 1)
+                 for index, token in enumerate(next_pages))
+
+    def handler(method, path, params, request):
+        index = pages[params.get('page')]
+        page_size = int(params.get('page_size') or default_page_size)
+        return 200, {
+            'type': 'object_list',
+            'api': 'storage',
+            'objects': [{'id': '{}-{}'.format(index, i), 'type': 'file',
+                         'api': 'storage'} for i in range(page_size)],
+            'next_page': (next_pages[index] if index < len(next_pages)
+                          else None),
+        }, None
+    return handler
+
+
+def get_page_sizes(adapter):
+    return [request.url.split('page_size=')[1].split('&')[0]
+            if 'page_size=' in request.url else None
+            for request in adapter.requests]
+
+
+@pytest.mark.parametrize('next_pages', [[2, 3, 4], ['2', '3', '4']])
+def test_page_numbers_keep_page_size(fake_api, next_pages):
+    adapter = fake_api(make_listing(next_pages))
+    listing = Account(token='token').get('storage/folders/root/contents')
+    assert not listing.supports_page_size_change
+
+    pages = list(listing.get_page_iterator(adaptive_page_size=True))
+    assert len(pages) == 4
+    assert get_page_sizes(adapter) == [None] * 4
+
+
+def test_tokens_adapt_from_first_page_size(fake_api):
+    adapter = fake_api(make_listing(['a1', 'b2', 'c3']))
+    listing = Account(token='token').get('storage/folders/root/contents')
+    assert listing.supports_page_size_change
+
+    page_sizer = AdaptivePageSize(initial=100, min_size=10, growth_factor=2)
+    pages = list(listing.get_page_iterator(adaptive_page_size=page_sizer))
+    assert len(pages) == 4
+    # Starts from the 20 resources of the first page, not from ``initial``
+    assert get_page_sizes(adapter) == [None, '20', '40', '80']
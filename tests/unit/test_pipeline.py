@@ -0,0 +1,135 @@
+from __future__ import unicode_literals
+
+import random
+import threading
+import time
+
+import pytest
+
+from kloudless.account import Account
+from kloudless.pipeline import Pipeline
+
+
+def slow_double(value):
+    time.sleep(random.random() * 0.01)
+    return value * 2
+
+
+def fail_on_odd(value):
+    if value % 2:
+        raise ValueError(value)
+    return value
+
+
+def test_ordered_map():
+    results = list(Pipeline(range(50)).map(slow_double, concurrency=8,
+                                           ordered=True))
+    assert [result.item for result in results] == list(range(50))
+    assert [result.result for result in results] == [
+        value * 2 for value in range(50)]
+
+
+def test_unordered_map_yields_all_items():
+    results = list(Pipeline(range(50)).map(slow_double, concurrency=8))
+    assert sorted(result.result for result in results) == [
+        value * 2 for value in range(50)]
+
+
+def test_errors_are_captured_per_item():
+    calls = []
+
+    def record(value):
+        calls.append(value)
+        return value
+
+    pipeline = Pipeline(range(6)).map(fail_on_odd, ordered=True).map(
+        record, ordered=True)
+    results = list(pipeline)
+    assert [result.result for result in results] == [0, None, 2, None, 4,
+                                                     None]
+    assert [result.error.args[0] for result in results
+            if result.error is not None] == [1, 3, 5]
+    # Failed items skip the following stages
+    assert sorted(calls) == [0, 2, 4]
+
+
+def test_filter():
+    pipeline = Pipeline(range(10)).filter(lambda value: value % 3 == 0)
+    assert [result.result for result in pipeline] == [0, 3, 6, 9]
+
+    pipeline = Pipeline(range(4)).filter(lambda value: 1 / value)
+    results = list(pipeline)
+    assert isinstance(results[0].error, ZeroDivisionError)
+    assert [result.item for result in results] == [0, 1, 2, 3]
+
+
+def test_filter_runs_in_the_pulling_thread():
+    threads = []
+
+    def predicate(value):
+        threads.append(threading.current_thread())
+        return True
+
+    list(Pipeline(range(3)).filter(predicate))
+    assert set(threads) == {threading.current_thread()}
+
+    del threads[:]
+    list(Pipeline(range(3)).filter(predicate).map(slow_double))
+    assert threading.current_thread() not in threads
+
+
+def test_source_errors_are_raised():
+    def source():
+        yield 1
+        raise ValueError('source')
+
+    pipeline = Pipeline(source()).map(slow_double)
+    with pytest.raises(ValueError):
+        list(pipeline)
+
+
+def test_run():
+    seen = []
+    succeeded, failed = Pipeline(range(5)).map(fail_on_odd).run(seen.append)
+    assert (succeeded, failed) == (3, 2)
+    assert len(seen) == 5
+
+
+def test_early_close_stops_the_source():
+    produced = []
+    closed = threading.Event()
+
+    def source():
+        try:
+            for value in range(10000):
+                produced.append(value)
+                yield value
+        finally:
+            closed.set()
+
+    results = iter(Pipeline(source(), buffer_size=2).map(
+        slow_double, concurrency=2))
+    for _ in range(3):
+        next(results)
+    results.close()
+
+    assert closed.wait(5)
+    assert len(produced) < 20
+
+
+def test_resource_list_pipeline(fake_api):
+    def handler(method, path, params, request):
+        page = int(params.get('page', 1))
+        return 200, {
+            'type': 'object_list', 'api': 'storage', 'page': page,
+            'next_page': page + 1 if page < 3 else None,
+            'objects': [{'id': '{}-{}'.format(page, index), 'type': 'file',
+                         'api': 'storage'} for index in range(2)],
+        }, None
+    fake_api(handler)
+
+    listing = Account(token='token').get('storage/folders/root/contents')
+    pipeline = listing.pipeline().map(lambda resource: resource.data['id'],
+                                      ordered=True)
+    assert [result.result for result in pipeline] == [
+        '1-0', '1-1', '2-0', '2-1', '3-0', '3-1']
@@ -0,0 +1,154 @@
+from __future__ import unicode_literals
+
+import io
+import threading
+
+import pytest
+import requests
+
+from kloudless.account import Account
+from kloudless.exceptions import NotFoundException
+from kloudless.resources.base import Response
+
+BODY = b'upstream body' * 1000
+
+
+def read_body(body):
+    if body is None or isinstance(body, bytes):
+        return body or b''
+    if hasattr(body, 'read'):
+        return body.read()
+    return b''.join(body)
+
+
+class FakeRaw(object):
+    """
+    Echoes the pass-through method, URI and body of the requests, and
+    serves ``BODY`` for ``/download``. ``/missing`` responds ``404`` and
+    ``/flaky`` responds ``500`` the first time.
+    """
+    def __init__(self):
+        self.requests = []
+        self.flaky_failed = False
+        self._lock = threading.Lock()
+
+    def __call__(self, method, path, params, request):
+        raw_method = request.headers['X-Kloudless-Raw-Method']
+        raw_uri = request.headers['X-Kloudless-Raw-URI']
+        body = read_body(request.body)
+        with self._lock:
+            self.requests.append((raw_method, raw_uri, body, request.headers))
+            if raw_uri == '/flaky' and not self.flaky_failed:
+                self.flaky_failed = True
+                return 500, {'message': 'error'}, None
+        if raw_uri == '/missing':
+            return 404, {'message': 'Not found'}, None
+        if raw_uri == '/download':
+            return 200, BODY, {'Content-Type': 'application/octet-stream'}
+        return 200, '{} {} {}'.format(raw_method, raw_uri, len(body)).encode(
+            'utf8'), {'Content-Type': 'text/plain'}
+
+
+@pytest.fixture
+def api(fake_api, monkeypatch):
+    monkeypatch.setattr('kloudless.concurrency.time.sleep', lambda _: None)
+    api = FakeRaw()
+    fake_api(api)
+    return api
+
+
+@pytest.fixture
+def account():
+    return Account(token='token')
+
+
+def test_raw(api, account):
+    response = account.raw('POST', '/echo', data=b'abc')
+    assert response.content == b'POST /echo 3'
+    assert api.requests[0][:3] == ('POST', '/echo', b'abc')
+
+
+def test_raw_stream_response(api, account):
+    response = account.raw_stream('GET', '/download')
+    assert isinstance(response, Response)
+    # The body is not read until asked for
+    assert response.raw.tell() == 0
+
+    out = io.BytesIO()
+    assert response.copy_to(out, bytearray(1000)) == len(BODY)
+    assert out.getvalue() == BODY
+
+
+def test_raw_stream_request_body(api, account):
+    chunks = [b'a' * 10, b'b' * 10]
+    response = account.raw_stream('PUT', '/upload', data=iter(chunks))
+    assert response.content == b'PUT /upload 20'
+    headers = api.requests[0][3]
+    assert headers['Transfer-Encoding'] == 'chunked'
+
+    response = account.raw_stream('PUT', '/upload',
+                                  data=io.BytesIO(b'c' * 30))
+    assert response.content == b'PUT /upload 30'
+    assert api.requests[1][3]['Content-Length'] == '30'
+
+
+def test_raw_stream_errors(api, account):
+    with pytest.raises(NotFoundException):
+        account.raw_stream('GET', '/missing')
+
+
+def test_raw_batch(api, account):
+    calls = [('GET', '/first'), ('POST', '/second', {'data': b'abcd'}),
+             ('GET', '/missing')]
+    results = list(account.raw_batch(calls, ordered=True))
+    assert [call for call, _, _ in results] == calls
+    assert results[0][1].content == b'GET /first 0'
+    assert results[1][1].content == b'POST /second 4'
+    assert results[2][1] is None
+    assert isinstance(results[2][2], NotFoundException)
+
+
+def test_raw_batch_handler(api, account, monkeypatch):
+    threads = set()
+    responses = []
+    closed = []
+    close = requests.Response.close
+
+    def spy(self):
+        closed.append(self)
+        close(self)
+    monkeypatch.setattr(requests.Response, 'close', spy)
+
+    def handler(response):
+        threads.add(threading.current_thread())
+        responses.append(response)
+        out = io.BytesIO()
+        for chunk in response.iter_content(1000):
+            out.write(chunk)
+        return len(out.getvalue())
+
+    calls = [('GET', '/download')] * 4
+    results = list(account.raw_batch(calls, handler=handler, concurrency=2))
+    assert [result for _, result, _ in results] == [len(BODY)] * 4
+    assert threading.current_thread() not in threads
+    assert all(response in closed for response in responses)
+
+
+def test_raw_batch_retries(api, account):
+    results = list(account.raw_batch([('GET', '/flaky')], retries=1))
+    assert results[0][1].content == b'GET /flaky 0'
+    assert len(api.requests) == 2
+
+
+def test_raw_batch_consumes_calls_lazily(api, account):
+    consumed = []
+
+    def calls():
+        for index in range(100):
+            consumed.append(index)
+            yield 'GET', '/{}'.format(index)
+
+    results = account.raw_batch(calls(), concurrency=2, ordered=True)
+    assert next(results)[1].content == b'GET /0 0'
+    results.close()
+    assert len(consumed) <= 3
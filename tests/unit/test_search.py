@@ -0,0 +1,118 @@
+from __future__ import unicode_literals
+
+import threading
+
+import pytest
+
+from kloudless.account import Account
+from kloudless.exceptions import InvalidParameter, ServerException
+from kloudless.search import federated_search
+
+PAGES = 10
+PAGE_SIZE = 2
+
+
+class FakeSearch(object):
+    """
+    Serves ``PAGES`` pages of search results for each token, and ``500`` for
+    the ``failing`` token. Records the pages requested per token.
+    """
+    def __init__(self):
+        self.pages = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, method, path, params, request):
+        token = request.headers['Authorization'].split(' ', 1)[1]
+        if token == 'failing':
+            return 500, {'message': 'error'}, None
+        page = int(params.get('page', 1))
+        with self._lock:
+            self.pages.setdefault(token, []).append(page)
+        objects = []
+        for index in range((page - 1) * PAGE_SIZE, page * PAGE_SIZE):
+            # Older results in later pages, except the oldest result of b
+            day = 1 if index == 5 and token == 'b' else 28 - index
+            objects.append({
+                'id': '{}{}'.format(token, index), 'type': 'file',
+                'api': 'storage', 'name': params['q'],
+                'modified': '2020-01-{:02d}T00:00:00Z'.format(day)})
+        return 200, {'type': 'object_list', 'api': 'storage', 'page': page,
+                     'next_page': page + 1 if page < PAGES else None,
+                     'objects': objects}, None
+
+
+@pytest.fixture
+def search(fake_api):
+    search = FakeSearch()
+    fake_api(search)
+    return search
+
+
+def result_ids(results):
+    return [result.resource.data['id'] for result in results]
+
+
+def test_relevance_stops_at_k(search):
+    accounts = [Account(token='a'), Account(token='b')]
+    results = list(federated_search(accounts, 'query', k=5))
+    assert result_ids(results) == ['a0', 'b0', 'a1', 'b1', 'a2']
+    assert [result.rank for result in results] == [0, 0, 1, 1, 2]
+    assert results[0].account is accounts[0]
+    assert results[0].resource.data['name'] == 'query'
+
+    # Only the pages holding the first k results of each account
+    assert sorted(search.pages['a']) == [1, 2, 3]
+    assert sorted(search.pages['b']) == [1, 2, 3]
+
+
+def test_relevance_closed_early(search):
+    results = federated_search([Account(token='a')], 'query', k=None,
+                               buffer_size=1)
+    assert result_ids([next(results)]) == ['a0']
+    results.close()
+    assert len(search.pages['a']) < PAGES
+
+
+def test_all_results(search):
+    results = list(federated_search(
+        [Account(token='a'), Account(token='b')], 'query', k=None))
+    assert len(results) == 2 * PAGES * PAGE_SIZE
+
+
+def test_modified_order(search):
+    results = list(federated_search(
+        [Account(token='a'), Account(token='b')], 'query', k=3,
+        order='modified'))
+    assert result_ids(results) == ['a0', 'b0', 'a1']
+    assert len(search.pages['a']) == PAGES
+
+    results = federated_search([Account(token='b')], 'query', k=None,
+                               order='modified')
+    assert result_ids(results)[-1] == 'b5'
+
+
+def test_page_size(search, fake_api):
+    adapter = fake_api(search)
+    list(federated_search([Account(token='a')], 'query', k=2, page_size=2,
+                          lang='keyword'))
+    url = adapter.requests[0].url
+    assert 'page_size=2' in url
+    assert 'lang=keyword' in url
+    assert 'q=query' in url
+
+
+def test_errors(search):
+    accounts = [Account(token='failing'), Account(token='a')]
+    with pytest.raises(ServerException):
+        list(federated_search(accounts, 'query', k=3))
+
+    errors = []
+    results = list(federated_search(accounts, 'query', k=3, errors=errors))
+    assert result_ids(results) == ['a0', 'a1', 'a2']
+    assert errors[0][0] is accounts[0]
+    assert isinstance(errors[0][1], ServerException)
+
+
+def test_invalid_order():
+    with pytest.raises(InvalidParameter):
+        federated_search([], 'query', order='name')
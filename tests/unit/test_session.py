@@ -0,0 +1,122 @@
+from __future__ import unicode_literals
+
+import pickle
+
+from requests.adapters import HTTPAdapter
+
+from kloudless import client as client_module
+from kloudless.account import Account
+from kloudless.client import Session
+from kloudless.transport import BaseTransport
+
+
+class FakeStorage(object):
+    """
+    Serves a folder listing of two pages and records the requests.
+    """
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, method, path, params, request):
+        self.requests.append((path, params, request.headers.get(
+            'Authorization')))
+        page = int(params.get('page', 1))
+        return 200, {
+            'type': 'object_list', 'api': 'storage', 'page': page,
+            'next_page': 2 if page == 1 else None,
+            'objects': [{'id': 'file-{}'.format(page), 'type': 'file',
+                         'api': 'storage'}],
+        }, None
+
+
+class ResettableTransport(BaseTransport):
+    def __init__(self):
+        super(ResettableTransport, self).__init__()
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+
+def test_pickle_session():
+    session = Session(compress_requests=True, thread_safe=True,
+                      pool_maxsize=5)
+    session.headers['X-Custom'] = 'value'
+
+    restored = pickle.loads(pickle.dumps(session))
+    assert restored.headers['X-Custom'] == 'value'
+    assert restored.compress_requests is True
+    assert restored.thread_safe is True
+    assert restored.transport is not session.transport
+    assert restored.transport.poolmanager.connection_pool_kw['maxsize'] == 5
+
+
+def test_pickle_account(fake_api):
+    storage = FakeStorage()
+    fake_api(storage)
+    account = pickle.loads(pickle.dumps(Account(token='token',
+                                                account_id=123)))
+    assert account.account_id == 123
+    account.get('storage/folders/root/contents')
+    path, _, authorization = storage.requests[0]
+    assert path == '/v1/accounts/123/storage/folders/root/contents'
+    assert authorization == 'Bearer token'
+
+
+def test_pickle_response(fake_api):
+    storage = FakeStorage()
+    fake_api(storage)
+    account = Account(token='token')
+    first = account.get('storage/folders/root/contents')
+
+    restored = pickle.loads(pickle.dumps(first))
+    assert restored.response is None
+    assert [resource.data['id'] for resource in restored] == ['file-1']
+    assert 'Authorization' not in restored.request_info.headers
+
+    second = restored.get_next_page()
+    assert [resource.data['id'] for resource in second] == ['file-2']
+    path, params, authorization = storage.requests[-1]
+    assert path == '/v1/accounts/me/storage/folders/root/contents'
+    assert params['page'] == '2'
+    assert authorization == 'Bearer token'
+
+
+def test_reset_after_fork(fake_api, monkeypatch):
+    fake_api(FakeStorage())
+    account = Account(token='token', pool_maxsize=5)
+    default_adapter = account.transport
+    other_adapter = HTTPAdapter(pool_maxsize=3)
+    transport = ResettableTransport()
+    account.mount('http://other/', other_adapter)
+    account.mount('http://transport/', transport)
+    poolmanagers = [default_adapter.poolmanager, other_adapter.poolmanager]
+
+    account.get('storage/folders/root/contents')
+    assert default_adapter.poolmanager is poolmanagers[0]
+    assert transport.resets == 0
+
+    pid = client_module.os.getpid() + 1
+    monkeypatch.setattr(client_module.os, 'getpid', lambda: pid)
+    account.get('storage/folders/root/contents')
+    account.get('storage/folders/root/contents')
+    assert account._pid == pid
+    assert transport.resets == 1
+    assert default_adapter.poolmanager is not poolmanagers[0]
+    assert other_adapter.poolmanager is not poolmanagers[1]
+    assert default_adapter.poolmanager.connection_pool_kw['maxsize'] == 5
+    assert other_adapter.poolmanager.connection_pool_kw['maxsize'] == 3
+
+
+def test_reset_after_fork_with_default_pool_size(fake_api, monkeypatch):
+    fake_api(FakeStorage())
+    account = Account(token='token')
+    adapters = set(account.adapters.values())
+    poolmanagers = set(adapter.poolmanager for adapter in adapters)
+
+    pid = client_module.os.getpid() + 1
+    monkeypatch.setattr(client_module.os, 'getpid', lambda: pid)
+    account.get('storage/folders/root/contents')
+    assert set(account.adapters.values()) == adapters
+    assert not poolmanagers & set(adapter.poolmanager
+                                  for adapter in adapters)
@@ -0,0 +1,148 @@
+from __future__ import unicode_literals
+
+import gzip
+import io
+import os
+import threading
+
+import pytest
+from urllib3.response import HTTPResponse
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+
+from kloudless.account import Account
+
+DATA = os.urandom(1024 * 1024 + 7)
+CHUNK_SIZE = 64 * 1024
+
+
+def gzip_compress(data):
+    out = io.BytesIO()
+    with gzip.GzipFile(fileobj=out, mode='wb') as f:
+        f.write(data)
+    return out.getvalue()
+
+
+class ContentsServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ContentsHandler(BaseHTTPRequestHandler):
+    """
+    Serves ``DATA`` as the contents of the files ``length``, ``chunked`` and
+    ``gzip``, and records the connections used.
+    """
+    protocol_version = 'HTTP/1.1'
+    connections = set()
+
+    def do_GET(self):
+        self.connections.add(self.client_address)
+        kind = self.path.split('/')[-2]
+        body = gzip_compress(DATA) if kind == 'gzip' else DATA
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        if kind == 'gzip':
+            self.send_header('Content-Encoding', 'gzip')
+        if kind == 'chunked':
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for start in range(0, len(body), CHUNK_SIZE):
+                chunk = body[start:start + CHUNK_SIZE]
+                self.wfile.write(
+                    '{:x}\r\n'.format(len(chunk)).encode('ascii') + chunk
+                    + b'\r\n')
+            self.wfile.write(b'0\r\n\r\n')
+        else:
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = ContentsServer(('127.0.0.1', 0), ContentsHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def account(restore_configuration, server):
+    restore_configuration['base_url'] = 'http://127.0.0.1:{}'.format(
+        server.server_port)
+    ContentsHandler.connections.clear()
+    return Account(token='token')
+
+
+@pytest.mark.parametrize('kind', ['length', 'chunked', 'gzip'])
+def test_readinto(account, kind):
+    response = account.get('storage/files/{}/contents'.format(kind))
+    buffer = bytearray(10000)
+    out = io.BytesIO()
+    size = response.readinto(buffer)
+    while size:
+        out.write(buffer[:size])
+        size = response.readinto(buffer)
+    assert out.getvalue() == DATA
+
+
+@pytest.mark.parametrize('kind', ['length', 'chunked', 'gzip'])
+def test_copy_to_reuses_connection(account, kind):
+    for _ in range(3):
+        out = io.BytesIO()
+        response = account.get('storage/files/{}/contents'.format(kind))
+        assert response.copy_to(out) == len(DATA)
+        assert out.getvalue() == DATA
+    assert len(ContentsHandler.connections) == 1
+
+
+@pytest.mark.parametrize('kind, readinto_used', [
+    ('length', True), ('chunked', True), ('gzip', False),
+])
+def test_unencoded_bodies_use_readinto(account, monkeypatch, kind,
+                                       readinto_used):
+    calls = []
+    readinto = HTTPResponse.readinto
+
+    def spy(self, buffer):
+        calls.append(len(buffer))
+        return readinto(self, buffer)
+    monkeypatch.setattr(HTTPResponse, 'readinto', spy)
+
+    response = account.get('storage/files/{}/contents'.format(kind))
+    assert response.copy_to(io.BytesIO()) == len(DATA)
+    assert bool(calls) == readinto_used
+
+
+def test_relay_with_identity_encoding(account):
+    response = account.get('storage/files/length/contents',
+                           headers={'Accept-Encoding': 'identity'})
+    out = io.BytesIO()
+    assert response.copy_to(out) == int(response.headers['Content-Length'])
+
+
+def test_copy_to_file_descriptor(account, tmpdir):
+    path = str(tmpdir.join('contents'))
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+    try:
+        response = account.get('storage/files/chunked/contents')
+        assert response.copy_to(fd) == len(DATA)
+    finally:
+        os.close(fd)
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_file_object_body(fake_api):
+    fake_api(lambda method, path, params, request: (
+        200, DATA, {'Content-Type': 'application/octet-stream'}))
+    response = Account(token='token').get('storage/files/abc/contents')
+    out = io.BytesIO()
+    assert response.copy_to(out, bytearray(1000)) == len(DATA)
+    assert out.getvalue() == DATA
@@ -0,0 +1,140 @@
+from __future__ import unicode_literals
+
+import gzip
+import io
+import json
+
+import pytest
+import requests
+
+from kloudless.account import Account
+from kloudless.exceptions import NotFoundException
+from kloudless.resources.base import Resource, ResourceList
+
+
+class FakeAPI(object):
+    """
+    Echoes the query parameters and JSON body of each request, and responds
+    ``404`` for the ``missing`` file.
+    """
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, method, path, params, request):
+        self.requests.append(request)
+        if path.endswith('/missing'):
+            return 404, {'message': 'Not found'}, None
+        if path.endswith('/events'):
+            return 200, {'type': 'object_list', 'api': 'events',
+                         'objects': [], 'cursor': params.get('cursor'),
+                         'count': 0}, None
+        body = request.body
+        if request.headers.get('Content-Encoding') == 'gzip':
+            with gzip.GzipFile(fileobj=io.BytesIO(body), mode='rb') as f:
+                body = f.read()
+        return 200, {'id': path.rsplit('/', 1)[1], 'type': 'file',
+                     'api': 'storage', 'params': params,
+                     'body': json.loads(body.decode('utf8')) if body
+                     else None}, None
+
+
+@pytest.fixture
+def api(fake_api):
+    api = FakeAPI()
+    fake_api(api)
+    return api
+
+
+@pytest.fixture
+def account():
+    return Account(token='token')
+
+
+def test_send_repeatedly(api, account):
+    template = account.prepare('GET', 'events', params={'page_size': 10},
+                               raw_headers={'X-Upstream': 'value'})
+    url = template.prepared.url
+    first = template.send(params={'cursor': 'a'})
+    second = template.send(params={'cursor': 'b'})
+    assert isinstance(first, ResourceList)
+    assert first.data['cursor'] == 'a'
+    assert second.data['cursor'] == 'b'
+    assert template.prepared.url == url
+
+    for request in api.requests:
+        assert request.url.startswith(
+            account._compose_url('events') + '?page_size=10')
+        assert request.headers['Authorization'] == 'Bearer token'
+        assert json.loads(request.headers['X-Kloudless-Raw-Headers']) == {
+            'X-Upstream': 'value'}
+
+
+def test_send_headers_are_not_kept(api, account):
+    template = account.prepare('GET', 'storage/files/abc')
+    template.send(headers={'X-Kloudless-As-User': 'user'})
+    template.send()
+    assert api.requests[0].headers['X-Kloudless-As-User'] == 'user'
+    assert 'X-Kloudless-As-User' not in api.requests[1].headers
+    assert 'X-Kloudless-As-User' not in template.prepared.headers
+
+
+def test_send_bodies(api, account):
+    template = account.prepare('PATCH', 'storage/files/abc')
+    assert template.send(json={'name': 'a'}).data['body'] == {'name': 'a'}
+    assert template.send(json={'name': 'b'}).data['body'] == {'name': 'b'}
+    assert template.send(
+        data=json.dumps({'name': 'c'}).encode('utf8'),
+        headers={'Content-Type': 'application/json'},
+    ).data['body'] == {'name': 'c'}
+    assert template.prepared.body is None
+
+
+def test_send_compressed_bodies(api):
+    account = Account(token='token', compress_requests=True,
+                      compression_min_size=10)
+    template = account.prepare('PATCH', 'storage/files/abc')
+    body = {'name': 'x' * 100}
+    assert template.send(json=body).data['body'] == body
+    assert api.requests[0].headers['Content-Encoding'] == 'gzip'
+    assert account.compression_stats.request_bytes > 0
+
+
+def test_response_objects(api, account):
+    template = account.prepare('GET', 'storage/files/abc')
+    resource = template.send()
+    assert isinstance(resource, Resource)
+    assert resource.data['id'] == 'abc'
+
+    template = account.prepare('GET', 'storage/files/abc',
+                               get_raw_response=True)
+    assert isinstance(template.send(), requests.Response)
+
+
+def test_fields(api, account, restore_configuration):
+    template = account.prepare('GET', 'storage/files/abc',
+                               fields=['params'])
+    assert set(template.send().data) == {'id', 'api', 'type', 'params'}
+    assert '?' not in api.requests[0].url
+
+    restore_configuration['fields_query_param'] = 'fields'
+    template = account.prepare('GET', 'storage/files/abc',
+                               fields=['params'])
+    template.send(params={'other': 'value'})
+    assert set(template.send().data) == {'id', 'api', 'type', 'params'}
+    for request in api.requests[1:]:
+        assert 'fields=params' in request.url
+
+
+def test_errors_are_raised(api, account):
+    template = account.prepare('GET', 'storage/files/missing')
+    with pytest.raises(NotFoundException):
+        template.send()
+
+
+def test_endpoint_prepare(api, account):
+    template = account.files('abc').prepare()
+    assert template.send().data['id'] == 'abc'
+    assert api.requests[0].url == account._compose_url('storage/files/abc')
+
+    template = account.files('abc').contents.prepare()
+    assert template.send_kwargs['stream'] is True
@@ -0,0 +1,89 @@
+from __future__ import unicode_literals
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+
+from kloudless.account import Account
+from kloudless.config import configuration
+from kloudless.transport import Urllib3Transport
+
+THREADS = 32
+REQUESTS = 2000
+
+
+class EchoServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """
+    Responds with the ID in the path and the headers of the request, and
+    sets a cookie to check it isn't stored.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({
+            'id': self.path.split('?')[0].rsplit('/', 1)[-1],
+            'as_user': self.headers.get('X-Kloudless-As-User'),
+            'custom': self.headers.get('X-Custom'),
+            'cookie': self.headers.get('Cookie'),
+        }).encode('utf8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Set-Cookie', 'session=abc')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server_url():
+    server = EchoServer(('127.0.0.1', 0), EchoHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def base_url(server_url):
+    saved = configuration['base_url']
+    configuration['base_url'] = server_url
+    yield server_url
+    configuration['base_url'] = saved
+
+
+@pytest.mark.parametrize('session_kwargs', [
+    {'pool_maxsize': THREADS},
+    {'transport': Urllib3Transport(maxsize=THREADS)},
+], ids=['HTTPAdapter', 'Urllib3Transport'])
+def test_shared_account(base_url, session_kwargs):
+    account = Account(token='token', thread_safe=True, **session_kwargs)
+    headers = {'X-Custom': 'shared'}
+
+    def get(index):
+        response = account.get('storage/files/{}'.format(index),
+                               headers=headers,
+                               impersonate_user_id='user-{}'.format(index))
+        return index, response.data
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        results = list(executor.map(get, range(REQUESTS)))
+
+    assert len(results) == REQUESTS
+    for index, data in results:
+        assert data == {'id': str(index), 'as_user': 'user-{}'.format(index),
+                        'custom': 'shared', 'cookie': None}
+    assert headers == {'X-Custom': 'shared'}
+    assert len(account.cookies) == 0
@@ -0,0 +1,126 @@
+from __future__ import unicode_literals
+
+import json
+
+import pytest
+
+from kloudless.account import Account
+from kloudless.concurrency import RETRY_EXCEPTIONS
+from kloudless.resources.base import Resource
+
+CONTENTS = b'contents' * 1000
+
+
+def read_body(body):
+    if body is None or isinstance(body, bytes):
+        return body or b''
+    if hasattr(body, 'read'):
+        return body.read()
+    return b''.join(body)
+
+
+class FakeStorage(object):
+    """
+    Serves the contents of any file and stores uploads, failing the first
+    uploads with the given status codes.
+    """
+    def __init__(self, upload_statuses=()):
+        self.upload_statuses = list(upload_statuses)
+        self.uploads = []
+        self.metadata_requests = 0
+
+    def __call__(self, method, path, params, request):
+        if method == 'GET' and path.endswith('/contents'):
+            return 200, CONTENTS, {'Content-Type': 'application/octet-stream'}
+        if method == 'GET':
+            self.metadata_requests += 1
+            file_id = path.rsplit('/', 1)[1]
+            return 200, {'id': file_id, 'name': file_id + '.txt',
+                         'type': 'file', 'api': 'storage'}, None
+
+        body = read_body(request.body)
+        status_code = (self.upload_statuses.pop(0) if self.upload_statuses
+                       else 201)
+        if status_code != 201:
+            headers = {'Retry-After': '0'} if status_code == 429 else None
+            return status_code, {'message': 'error'}, headers
+        metadata = json.loads(request.headers['X-Kloudless-Metadata'])
+        self.uploads.append((metadata['name'], body))
+        return 201, {'id': 'new-{}'.format(len(self.uploads)),
+                     'name': metadata['name'], 'type': 'file',
+                     'api': 'storage'}, None
+
+
+@pytest.fixture
+def accounts(monkeypatch):
+    monkeypatch.setattr('kloudless.concurrency.time.sleep', lambda _: None)
+    return Account(token='source'), Account(token='destination')
+
+
+def test_transfer_ids(fake_api, accounts):
+    storage = FakeStorage()
+    fake_api(storage)
+    source, destination = accounts
+    results = source.bulk_transfer(['a', 'b'], destination, 'root')
+    assert all(result.ok for result in results)
+    assert sorted(storage.uploads) == [('a.txt', CONTENTS),
+                                       ('b.txt', CONTENTS)]
+    assert storage.metadata_requests == 2
+
+
+def test_transfer_resources_without_metadata_requests(fake_api, accounts):
+    storage = FakeStorage()
+    fake_api(storage)
+    source, destination = accounts
+    resource = Resource(
+        data={'id': 'a', 'name': 'a.txt', 'type': 'file', 'api': 'storage'},
+        url=source._compose_url('storage/files/a'), client=source)
+    results = source.bulk_transfer([resource], destination, 'root')
+    assert results[0].ok
+    assert storage.metadata_requests == 0
+
+
+def test_upload_is_retried_on_rate_limiting(fake_api, accounts):
+    storage = FakeStorage([429])
+    fake_api(storage)
+    source, destination = accounts
+    results = source.bulk_transfer(['a'], destination, 'root', retries=3)
+    assert results[0].ok
+    assert storage.uploads == [('a.txt', CONTENTS)]
+
+
+def test_upload_is_not_retried_on_server_errors(fake_api, accounts):
+    storage = FakeStorage([500])
+    fake_api(storage)
+    source, destination = accounts
+    results = source.bulk_transfer(['a'], destination, 'root', retries=3)
+    assert not results[0].ok
+    assert storage.upload_statuses == []
+    assert storage.uploads == []
+
+
+def test_upload_retries_opt_in(fake_api, accounts):
+    storage = FakeStorage([500])
+    fake_api(storage)
+    source, destination = accounts
+    results = source.bulk_transfer(['a'], destination, 'root', retries=3,
+                                   retry_exceptions=RETRY_EXCEPTIONS)
+    assert results[0].ok
+    assert storage.uploads == [('a.txt', CONTENTS)]
+
+
+def test_progress_and_journal(fake_api, accounts, tmpdir):
+    storage = FakeStorage()
+    fake_api(storage)
+    source, destination = accounts
+    journal = str(tmpdir.join('transfer.journal'))
+    source.bulk_transfer(['a'], destination, 'root', journal=journal)
+
+    progress = []
+    results = source.bulk_transfer(
+        ['a', 'b'], destination, 'root', journal=journal, concurrency=1,
+        progress=lambda count, result: progress.append(
+            (count, result.id, result.skipped)))
+    assert all(result.ok for result in results)
+    assert progress == [(1, 'a', True), (2, 'b', False)]
+    assert [name for name, _ in storage.uploads] == ['a.txt', 'b.txt']
@@ -0,0 +1,176 @@
+from __future__ import unicode_literals
+
+import gzip
+import io
+import json
+import threading
+
+import pytest
+from requests.adapters import HTTPAdapter
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+
+from kloudless.account import Account
+from kloudless.exceptions import NoRecordedResponse, NotFoundException
+from kloudless.transport import (RecordingTransport, ReplayTransport,
+                                 Urllib3Transport)
+
+# Large enough for the gzip encoded body to be much shorter
+DATA = {'id': 'abc', 'name': 'x' * 10000, 'type': 'file', 'api': 'storage'}
+
+
+def gzip_compress(data):
+    out = io.BytesIO()
+    with gzip.GzipFile(fileobj=out, mode='wb') as f:
+        f.write(data)
+    return out.getvalue()
+
+
+class APIServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    """
+    Serves ``DATA`` gzip encoded with the number of the request, and
+    ``404`` for the ``missing`` file.
+    """
+    protocol_version = 'HTTP/1.1'
+    count = 0
+
+    def do_GET(self):
+        if self.path.endswith('/missing'):
+            self.respond(404, {'message': 'Not found'})
+        else:
+            APIHandler.count += 1
+            self.respond(200, dict(DATA, count=APIHandler.count))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.respond(200, json.loads(body.decode('utf8')))
+
+    def respond(self, status_code, data):
+        body = gzip_compress(json.dumps(data).encode('utf8'))
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = APIServer(('127.0.0.1', 0), APIHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def base_url(restore_configuration, server):
+    APIHandler.count = 0
+    restore_configuration['base_url'] = 'http://127.0.0.1:{}'.format(
+        server.server_port)
+
+
+@pytest.fixture
+def recording(base_url, tmpdir):
+    """
+    Record two requests of the same file, a ``404`` and a ``POST`` request,
+    and return the path of the recording.
+    """
+    path = str(tmpdir.join('recording.json'))
+    recorder = RecordingTransport(path)
+    account = Account(token='token', transport=recorder)
+    account.get('storage/files/abc')
+    account.get('storage/files/abc')
+    with pytest.raises(NotFoundException):
+        account.get('storage/files/missing')
+    account.post('storage/files', json={'name': 'new'})
+    recorder.close()
+    return path
+
+
+@pytest.mark.parametrize('transport', [HTTPAdapter, Urllib3Transport])
+def test_transport(base_url, transport):
+    account = Account(token='token', transport=transport())
+    assert account.get('storage/files/abc').data['name'] == DATA['name']
+    assert account.post('storage/files',
+                        json={'name': 'new'}).data == {'name': 'new'}
+
+
+def test_recording_is_decoded(recording):
+    with io.open(recording, 'r', encoding='utf8') as f:
+        interactions = json.loads(f.read())['interactions']
+    assert len(interactions) == 4
+    assert 'Authorization' not in interactions[0]['request']['headers']
+
+    headers = {k.lower(): v for k, v
+               in interactions[0]['response']['headers'].items()}
+    assert 'content-encoding' not in headers
+    assert int(headers['content-length']) > len(DATA['name'])
+
+
+def test_replay(recording):
+    account = Account(token='token', transport=ReplayTransport(recording))
+    first = account.get('storage/files/abc')
+    assert first.data['count'] == 1
+    assert first.data['name'] == DATA['name']
+    assert first.headers['Content-Length'] == str(len(first.content))
+    assert account.get('storage/files/abc').data['count'] == 2
+
+    with pytest.raises(NotFoundException) as e:
+        account.get('storage/files/missing')
+    assert e.value.status == 404
+    assert account.post('storage/files',
+                        json={'name': 'new'}).data == {'name': 'new'}
+
+    with pytest.raises(NoRecordedResponse):
+        account.get('storage/files/abc')
+
+
+def test_replay_repeat(recording):
+    account = Account(token='token',
+                      transport=ReplayTransport(recording, repeat=True))
+    counts = [account.get('storage/files/abc').data['count']
+              for _ in range(3)]
+    assert counts == [1, 2, 2]
+
+
+def test_replay_match_body(recording):
+    account = Account(token='token',
+                      transport=ReplayTransport(recording, match_body=True))
+    with pytest.raises(NoRecordedResponse):
+        account.post('storage/files', json={'name': 'other'})
+    assert account.post('storage/files',
+                        json={'name': 'new'}).data == {'name': 'new'}
+
+    account = Account(token='token', transport=ReplayTransport(recording))
+    assert account.post('storage/files',
+                        json={'name': 'other'}).data == {'name': 'new'}
+
+
+def test_recording_reset_resets_http_adapter(tmpdir):
+    adapter = HTTPAdapter(pool_maxsize=3)
+    poolmanager = adapter.poolmanager
+    recorder = RecordingTransport(str(tmpdir.join('recording.json')),
+                                  transport=adapter)
+    recorder.reset()
+    assert adapter.poolmanager is not poolmanager
+    assert adapter.poolmanager.connection_pool_kw['maxsize'] == 3
+
+
+def test_recording_reset_calls_transport_reset(tmpdir):
+    transport = Urllib3Transport()
+    transport._pools['key'] = object()
+    recorder = RecordingTransport(str(tmpdir.join('recording.json')),
+                                  transport=transport)
+    recorder.reset()
+    assert transport._pools == {}
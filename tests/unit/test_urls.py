@@ -0,0 +1,48 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from kloudless.account import Account
+from kloudless.resources.base import Resource
+from kloudless.util import construct_kloudless_endpoint, url_join
+
+ACCOUNT_URL = 'https://api.kloudless.com/v1/accounts/123'
+
+
+@pytest.mark.parametrize('prefix, suffix, expected', [
+    ('https://api.kloudless.com/v1', 'accounts',
+     'https://api.kloudless.com/v1/accounts'),
+    ('https://api.kloudless.com/v1/', 'accounts',
+     'https://api.kloudless.com/v1/accounts'),
+    ('https://api.kloudless.com/v1/', '/accounts',
+     'https://api.kloudless.com/v1/accounts'),
+    ('https://api.kloudless.com/v1/accounts/123/', '../456',
+     'https://api.kloudless.com/v1/accounts/456'),
+    ('https://api.kloudless.com/v1', '',
+     'https://api.kloudless.com/v1'),
+    (ACCOUNT_URL, ACCOUNT_URL + '/storage/files/abc',
+     ACCOUNT_URL + '/storage/files/abc'),
+])
+def test_url_join(prefix, suffix, expected):
+    assert url_join(prefix, suffix) == expected
+
+
+@pytest.mark.parametrize('url', [
+    ACCOUNT_URL + '/cal/calendars',
+    ACCOUNT_URL + '/cal/calendars/',
+])
+def test_construct_url_of_listed_resource(url):
+    data = {'api': 'calendar', 'type': 'calendar', 'id': 'abc'}
+    assert (Resource._construct_url(data, url)
+            == ACCOUNT_URL + '/cal/calendars/abc')
+
+
+def test_base_url_with_trailing_slash(restore_configuration):
+    restore_configuration['base_url'] = 'https://api.kloudless.com/'
+    assert (construct_kloudless_endpoint('accounts')
+            == 'https://api.kloudless.com/v1/accounts')
+
+    account = Account(token='token')
+    assert account.url == 'https://api.kloudless.com/v1/accounts/me'
+    assert (account._compose_url('storage/files/abc')
+            == 'https://api.kloudless.com/v1/accounts/me/storage/files/abc')
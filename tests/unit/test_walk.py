@@ -0,0 +1,81 @@
+from __future__ import unicode_literals
+
+import json
+
+import pytest
+
+from kloudless.account import Account
+from kloudless.walk import TreeWalker
+
+PAGE_SIZE = 2
+
+# Folder ID -> names of its contents. Names starting with 'd' are folders.
+TREE = {
+    'root': ['a', 'b', 'c', 'd1', 'e'],
+    'd1': ['f', 'g', 'h'],
+}
+
+
+def handle_contents(method, path, params, request):
+    folder_id = path.split('/folders/')[1].split('/')[0]
+    page = int(params.get('page') or 1)
+    names = TREE[folder_id]
+    start = (page - 1) * PAGE_SIZE
+    objects = [{'id': name, 'name': name, 'api': 'storage',
+                'type': 'folder' if name.startswith('d') else 'file'}
+               for name in names[start:start + PAGE_SIZE]]
+    return 200, {
+        'type': 'object_list', 'api': 'storage', 'objects': objects,
+        'page': page,
+        'next_page': page + 1 if start + PAGE_SIZE < len(names) else None,
+    }, None
+
+
+@pytest.fixture
+def account():
+    return Account(token='token')
+
+
+def test_walk(fake_api, account):
+    fake_api(handle_contents)
+    paths = [path for path, _ in TreeWalker(account, concurrency=2)]
+    assert paths == ['/a', '/b', '/c', '/d1', '/e',
+                     '/d1/f', '/d1/g', '/d1/h']
+
+
+def test_pages_are_retrieved_lazily(fake_api, account):
+    adapter = fake_api(handle_contents)
+    walker = iter(TreeWalker(account, max_depth=1))
+    assert next(walker)[0] == '/a'
+    assert len(adapter.requests) == 1
+    assert [next(walker)[0] for _ in range(2)] == ['/b', '/c']
+    assert len(adapter.requests) == 2
+    walker.close()
+
+
+def test_resume_from_checkpoint(fake_api, account):
+    fake_api(handle_contents)
+    walker = TreeWalker(account)
+    iterator = iter(walker)
+    paths = [next(iterator)[0] for _ in range(3)]
+    checkpoint = json.loads(json.dumps(walker.checkpoint()))
+    iterator.close()
+    assert checkpoint['folders'][0]['skip'] == 3
+
+    resumed = TreeWalker(account, checkpoint=checkpoint)
+    paths.extend(path for path, _ in resumed)
+    assert paths == ['/a', '/b', '/c', '/d1', '/e',
+                     '/d1/f', '/d1/g', '/d1/h']
+
+
+def test_error_of_a_later_page(fake_api, account):
+    def handler(method, path, params, request):
+        if params.get('page') == '2':
+            return 500, {'message': 'error'}, None
+        return handle_contents(method, path, params, request)
+    fake_api(handler)
+
+    errors = []
+    walker = TreeWalker(account, on_error=lambda path, e: errors.append(path))
+    assert [path for path, _ in walker] == ['/a', '/b']
+    assert errors == ['']
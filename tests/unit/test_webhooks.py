@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from kloudless.webhooks import WebhookReceiver, get_signature, verify_signature
+
+
+def handle_events(method, path, params, request):
+    cursor = int(params.get('cursor') or 0)
+    objects = [{'id': str(cursor), 'type': 'add', 'api': 'events'}]
+    if cursor >= 2:
+        objects = []
+    return 200, {'type': 'object_list', 'api': 'events', 'objects': objects,
+                 'cursor': cursor + len(objects), 'count': len(objects)}, None
+
+
+@pytest.fixture
+def receiver():
+    handled = []
+    receiver = WebhookReceiver(
+        'app-id', 'api-key',
+        lambda account_id, events: handled.extend(events), window=0)
+    receiver.handled = handled
+    yield receiver
+    receiver.close()
+
+
+def test_verify_signature():
+    body = b'account=123'
+    signature = get_signature('api-key', body)
+    assert verify_signature('api-key', body, signature)
+    assert verify_signature('api-key', body, signature.encode('ascii'))
+    assert not verify_signature('other-key', body, signature)
+    assert not verify_signature('api-key', body, None)
+
+
+def test_account_is_reused_between_fetches(fake_api, receiver):
+    adapter = fake_api(handle_events)
+    account = receiver.get_account('123')
+    assert receiver.get_account('123') is account
+    assert receiver.get_account('456') is not account
+
+    assert receiver.fetch_events('123') == 2
+    assert receiver.fetch_events('123') == 0
+    assert receiver.get_account('123') is account
+    assert receiver.cursors == {'123': 2}
+    assert [event.data['id'] for event in receiver.handled] == ['0', '1']
+    assert all('/accounts/123/events' in request.url
+               for request in adapter.requests)